@@ -14,7 +14,15 @@ sys.path.append(os.getcwd())
 from app.core.config import settings
 from app.db.session import Base
 from app.modules.auth.models import User
-from app.modules.investments.models import Ativo, Transacao, Passivo
+from app.modules.investments.models import (
+    Ativo,
+    Transacao,
+    Passivo,
+    Lote,
+    Cotacao,
+    TaxaReferencia,
+    SerieIndicador,
+)
 from app.modules.history.models import Snapshot
 
 # ----------------------------------
@@ -0,0 +1,37 @@
+"""add_lotes_table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # O livro é preenchido sob demanda (replay completo) na primeira
+    # atualização de saldo de cada ativo.
+    op.create_table(
+        "lotes",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("ativo_id", sa.String(), sa.ForeignKey("ativos.id")),
+        sa.Column("transacao_id", sa.String(), sa.ForeignKey("transacoes.id")),
+        sa.Column("data", sa.DateTime(), nullable=True),
+        sa.Column("principal_restante", sa.Float(), default=0.0),
+        sa.Column("fator", sa.Float(), default=1.0),
+    )
+    op.create_index("ix_lotes_ativo_id", "lotes", ["ativo_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lotes_ativo_id", table_name="lotes")
+    op.drop_table("lotes")
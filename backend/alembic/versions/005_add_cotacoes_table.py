@@ -0,0 +1,31 @@
+"""add_cotacoes_table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cotacoes",
+        sa.Column("provedor", sa.String(), primary_key=True),
+        sa.Column("ticker", sa.String(), primary_key=True),
+        sa.Column("preco", sa.Float(), nullable=False),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cotacoes")
@@ -0,0 +1,31 @@
+"""add_taxas_referencia_table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "taxas_referencia",
+        sa.Column("indicador", sa.String(), primary_key=True),
+        sa.Column("valor", sa.Float(), nullable=False),
+        sa.Column("data_referencia", sa.Date(), nullable=True),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("taxas_referencia")
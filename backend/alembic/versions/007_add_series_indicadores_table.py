@@ -0,0 +1,30 @@
+"""add_series_indicadores_table
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "series_indicadores",
+        sa.Column("indicador", sa.String(), primary_key=True),
+        sa.Column("data", sa.Date(), primary_key=True),
+        sa.Column("valor", sa.Float(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("series_indicadores")
@@ -0,0 +1,74 @@
+"""add_position_columns
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("ativos", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("quantidade_atual", sa.Float(), nullable=True, default=0.0)
+        )
+        batch_op.add_column(
+            sa.Column("preco_medio", sa.Float(), nullable=True, default=0.0)
+        )
+
+    # Backfill da Renda Variável: replay das transações de cada ativo em ordem
+    # cronológica (mesma regra de service.aplicar_movimento)
+    conn = op.get_bind()
+    transacoes = conn.execute(
+        sa.text(
+            "SELECT t.ativo_id, t.tipo, t.valor, t.quantidade FROM transacoes t "
+            "JOIN ativos a ON a.id = t.ativo_id "
+            "WHERE a.tipo_indexador IN ('B3', 'CRYPTO', 'USA') "
+            "ORDER BY t.ativo_id, t.timestamp"
+        )
+    )
+    posicoes = {}
+    for ativo_id, tipo, valor, cotas in transacoes:
+        quantidade, preco_medio = posicoes.get(ativo_id, (0.0, 0.0))
+        cotas = cotas or 0.0
+        if tipo == "Aporte":
+            posicao = max(quantidade, 0.0)
+            if posicao + cotas > 0:
+                preco_medio = (posicao * preco_medio + (valor or 0.0)) / (
+                    posicao + cotas
+                )
+            quantidade += cotas
+        elif tipo == "Saque":
+            quantidade -= cotas
+            if quantidade <= 0:
+                preco_medio = 0.0
+        posicoes[ativo_id] = (quantidade, preco_medio)
+
+    conn.execute(sa.text("UPDATE ativos SET quantidade_atual = 0, preco_medio = 0"))
+    if posicoes:
+        conn.execute(
+            sa.text(
+                "UPDATE ativos SET quantidade_atual = :quantidade, "
+                "preco_medio = :preco_medio WHERE id = :id"
+            ),
+            [
+                {"id": ativo_id, "quantidade": q, "preco_medio": pm}
+                for ativo_id, (q, pm) in posicoes.items()
+            ],
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ativos", schema=None) as batch_op:
+        batch_op.drop_column("preco_medio")
+        batch_op.drop_column("quantidade_atual")
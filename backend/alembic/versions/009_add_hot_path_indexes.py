@@ -0,0 +1,35 @@
+"""add_hot_path_indexes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transacoes_ativo_id_timestamp", "transacoes", ["ativo_id", "timestamp"]
+    )
+    op.create_index("ix_ativos_owner_id", "ativos", ["owner_id"])
+    op.create_index(
+        "ix_snapshots_owner_id_timestamp", "snapshots", ["owner_id", "timestamp"]
+    )
+    op.create_index("ix_passivos_owner_id", "passivos", ["owner_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_passivos_owner_id", table_name="passivos")
+    op.drop_index("ix_snapshots_owner_id_timestamp", table_name="snapshots")
+    op.drop_index("ix_ativos_owner_id", table_name="ativos")
+    op.drop_index("ix_transacoes_ativo_id_timestamp", table_name="transacoes")
@@ -0,0 +1,116 @@
+"""
+Calendário de dias úteis (feriados nacionais do calendário ANBIMA/B3).
+
+Os dias úteis do intervalo configurado são pré-computados em um array de
+contagem acumulada, então a quantidade de dias úteis entre duas datas é a
+diferença de duas entradas (O(1), vetorizada para arrays de datas).
+"""
+
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_FIXOS = [
+    (1, 1),  # Confraternização Universal
+    (4, 21),  # Tiradentes
+    (5, 1),  # Dia do Trabalho
+    (9, 7),  # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),  # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+]
+
+# Dia Nacional de Zumbi e da Consciência Negra (feriado nacional desde 2024)
+INICIO_CONSCIENCIA_NEGRA = 2024
+
+
+def pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados(ano: int) -> List[date]:
+    """Feriados do ano que não são dias úteis."""
+    dias = [date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS]
+    if ano >= INICIO_CONSCIENCIA_NEGRA:
+        dias.append(date(ano, 11, 20))
+
+    domingo_pascoa = pascoa(ano)
+    dias += [
+        domingo_pascoa - timedelta(days=48),  # Carnaval (segunda)
+        domingo_pascoa - timedelta(days=47),  # Carnaval (terça)
+        domingo_pascoa - timedelta(days=2),  # Sexta-feira Santa
+        domingo_pascoa + timedelta(days=60),  # Corpus Christi
+    ]
+    return sorted(dias)
+
+
+def _feriados_array(ano_inicio: int, ano_fim: int) -> np.ndarray:
+    return np.array(
+        [d for ano in range(ano_inicio, ano_fim + 1) for d in feriados(ano)],
+        dtype="datetime64[D]",
+    )
+
+
+class CalendarioDiasUteis:
+    def __init__(self, inicio: date, fim: date):
+        self.inicio = np.datetime64(inicio, "D")
+        self.fim = np.datetime64(fim, "D")
+        self.feriados = _feriados_array(inicio.year, fim.year)
+
+        dias = np.arange(self.inicio, self.fim + 1)
+        uteis = np.is_busday(dias, holidays=self.feriados)
+        # acumulado[k] = dias úteis em [inicio, inicio + k)
+        self.acumulado = np.concatenate(([0], np.cumsum(uteis)))
+
+    def contar(self, inicio, fim) -> np.ndarray:
+        """Dias úteis em [inicio, fim) para datas ou arrays de datas (negativo se fim < inicio)."""
+        inicio = np.asarray(inicio, dtype="datetime64[D]")
+        fim = np.asarray(fim, dtype="datetime64[D]")
+        if not self._cobre(inicio) or not self._cobre(fim):
+            return self._contar_fora_do_intervalo(inicio, fim)
+        i = (inicio - self.inicio).astype(np.int64)
+        j = (fim - self.inicio).astype(np.int64)
+        return self.acumulado[j] - self.acumulado[i]
+
+    def is_dia_util(self, dia) -> np.ndarray:
+        dia = np.asarray(dia, dtype="datetime64[D]")
+        return self.contar(dia, dia + 1) == 1
+
+    def _cobre(self, datas: np.ndarray) -> bool:
+        return datas.size == 0 or (
+            datas.min() >= self.inicio and datas.max() <= self.fim + 1
+        )
+
+    def _contar_fora_do_intervalo(self, inicio, fim):
+        # Raro: datas fora do intervalo pré-computado (ver BUSINESS_CALENDAR_*)
+        anos = np.concatenate([inicio.ravel(), fim.ravel()]).astype("datetime64[Y]")
+        feriados_extra = _feriados_array(
+            int(anos.min().astype(int)) + 1970, int(anos.max().astype(int)) + 1970
+        )
+        return np.busday_count(inicio, fim, holidays=feriados_extra)
+
+
+calendario = CalendarioDiasUteis(
+    settings.BUSINESS_CALENDAR_START, settings.BUSINESS_CALENDAR_END
+)
+
+
+def dias_uteis(inicio, fim):
+    """Dias úteis em [inicio, fim), pelo calendário pré-computado."""
+    return calendario.contar(inicio, fim)
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from datetime import date
 from pathlib import Path
 
 
@@ -11,12 +12,81 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 1 semana
 
+    # bcrypt: custo (hashes com outro custo são refeitos no próximo login) e pool dedicado
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+
+    # Tentativas de login por username dentro da janela antes de recusar (429)
+    LOGIN_MAX_ATTEMPTS: int = 5
+    LOGIN_ATTEMPT_WINDOW_SECONDS: int = 60
+
     # Banco de Dados
     # BASE_DIR aponta para a raiz do backend/
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     # O arquivo será criado em backend/investimentos.db
     DATABASE_URL: str = f"sqlite:///{BASE_DIR}/investimentos.db"
 
+    # Perfil do engine SQLite: "tuned" (WAL, busy_timeout, pool dimensionado) ou "basic"
+    SQLITE_PROFILE: str = "tuned"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE_BYTES: int = 268435456
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    # Pool: o threadpool do uvicorn/anyio tem 40 threads por padrão
+    DB_POOL_SIZE: int = 40
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+
+    # Stack assíncrono (AsyncSession): rotas de leitura async quando ativo.
+    # ASYNC_DATABASE_URL vazio deriva de DATABASE_URL (sqlite+aiosqlite / postgresql+asyncpg)
+    ASYNC_DB_ROUTES: bool = True
+    ASYNC_DATABASE_URL: str = ""
+
+    # Fila de reconstrução de histórico (pedidos do mesmo usuário dentro da janela são agrupados)
+    HISTORY_REBUILD_DEBOUNCE_SECONDS: float = 2.0
+    HISTORY_REBUILD_WORKERS: int = 2
+
+    # Atualização agendada: usuários são divididos em shards recalculados em processos paralelos
+    MARKET_UPDATE_SHARD_SIZE: int = 50
+    MARKET_UPDATE_MAX_PROCESSES: int = 4
+
+    # Cotações: tamanho de cada lote enviado aos provedores e requisições simultâneas
+    QUOTE_BATCH_SIZE: int = 50
+    QUOTE_FETCH_MAX_WORKERS: int = 4
+
+    # Cache de cotações: dentro do TTL não há chamada de rede; vencidas são servidas e revalidadas
+    QUOTE_CACHE_TTL_SECONDS: int = 900
+    QUOTE_CACHE_MAX_ENTRIES: int = 5000
+
+    # Séries de indicadores (CDI diário) baixadas do BCB a partir desta data
+    INDEX_SERIES_START: date = date(2000, 1, 1)
+
+    # Calendário de dias úteis pré-computado (datas fora do intervalo são calculadas sob demanda)
+    BUSINESS_CALENDAR_START: date = date(2000, 1, 1)
+    BUSINESS_CALENDAR_END: date = date(2078, 12, 31)
+
+    # Listagem de transações (paginação por cursor): tamanho padrão e limite máximo da página
+    TRANSACTIONS_PAGE_SIZE: int = 50
+    TRANSACTIONS_PAGE_MAX: int = 500
+
+    # Importação de extratos: linhas validadas/inseridas por bloco e erros listados no relatório
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Exportação: linhas buscadas por vez no banco e linhas por row group do Parquet
+    EXPORT_YIELD_PER: int = 1000
+    EXPORT_PARQUET_ROW_GROUP: int = 10000
+
+    # Cache do usuário autenticado (get_current_user): validade e tamanho máximo
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # Grade de cenários da calculadora: combinações e séries completas por request
+    CALCULATOR_GRID_MAX_CELLS: int = 200000
+    CALCULATOR_GRID_MAX_SERIES: int = 20
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,151 @@
+"""
+Exportação em streaming (CSV ou Parquet) do resultado de uma consulta.
+
+As linhas são lidas como tuplas com yield_per (sem objetos ORM) em uma
+sessão própria e escritas incrementalmente: o CSV sai em blocos de texto e
+o Parquet em row groups de EXPORT_PARQUET_ROW_GROUP linhas, então a memória
+usada não depende do tamanho da conta.
+"""
+
+from typing import Callable, Iterable, Iterator, List, Tuple
+import csv
+import io
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+FORMATOS = ("csv", "parquet")
+
+# (nome da coluna, tipo): tipo em "texto", "real", "inteiro", "data_hora"
+Colunas = List[Tuple[str, str]]
+
+
+def ler_linhas(consulta: Select, session_factory=SessionLocal) -> Iterator[tuple]:
+    """Linhas da consulta como tuplas, buscadas em lotes de EXPORT_YIELD_PER."""
+    db = session_factory()
+    try:
+        resultado = db.execute(
+            consulta.execution_options(yield_per=settings.EXPORT_YIELD_PER)
+        )
+        for linha in resultado:
+            yield tuple(linha)
+    finally:
+        db.close()
+
+
+def csv_em_blocos(
+    colunas: Colunas, linhas: Iterable[tuple], linhas_por_bloco: int
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([nome for nome, _ in colunas])
+    pendentes = 0
+    for linha in linhas:
+        escritor.writerow(linha)
+        pendentes += 1
+        if pendentes >= linhas_por_bloco:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    yield buffer.getvalue()
+
+
+class _SaidaParquet:
+    """Arquivo só de escrita que entrega os bytes já gravados a cada row group."""
+
+    closed = False
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def retirar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def parquet_em_grupos(
+    colunas: Colunas, linhas: Iterable[tuple], linhas_por_grupo: int
+) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {
+        "texto": pa.string(),
+        "real": pa.float64(),
+        "inteiro": pa.int64(),
+        "data_hora": pa.timestamp("us"),
+    }
+    schema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    saida = _SaidaParquet()
+    escritor = pq.ParquetWriter(saida, schema)
+
+    def grupo(bloco):
+        return pa.Table.from_pylist(
+            [dict(zip(schema.names, linha)) for linha in bloco], schema=schema
+        )
+
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= linhas_por_grupo:
+            escritor.write_table(grupo(bloco))
+            bloco = []
+            yield saida.retirar()
+    if bloco:
+        escritor.write_table(grupo(bloco))
+    escritor.close()
+    yield saida.retirar()
+
+
+def resposta_exportacao(
+    nome: str,
+    formato: str,
+    colunas: Colunas,
+    linhas: Callable[[], Iterable[tuple]],
+) -> StreamingResponse:
+    """StreamingResponse com o arquivo `nome`.csv/.parquet gerado a partir de linhas()."""
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato deve ser csv ou parquet")
+
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=400, detail="Exportação Parquet requer o pacote pyarrow"
+            )
+        conteudo = parquet_em_grupos(
+            colunas, linhas(), settings.EXPORT_PARQUET_ROW_GROUP
+        )
+        tipo_midia = "application/vnd.apache.parquet"
+    else:
+        conteudo = csv_em_blocos(colunas, linhas(), settings.EXPORT_YIELD_PER)
+        tipo_midia = "text/csv; charset=utf-8"
+
+    return StreamingResponse(
+        conteudo,
+        media_type=tipo_midia,
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'},
+    )
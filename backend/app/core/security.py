@@ -1,10 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Tuple, Union
+import asyncio
+import threading
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -30,3 +37,73 @@ def create_access_token(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
+
+
+class HashingSobrecarregado(Exception):
+    """A fila do pool de hashing está cheia."""
+
+
+class PasswordHasher:
+    """
+    Hash/verificação de senha (bcrypt) em um pool de threads próprio, com fila
+    limitada: rajadas de login esperam ou são recusadas aqui, sem ocupar o
+    threadpool compartilhado pelas rotas síncronas.
+    """
+
+    def __init__(self, max_workers: int, limite_fila: int):
+        self.max_workers = max_workers
+        self.limite_fila = limite_fila
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._vagas = threading.BoundedSemaphore(max_workers + limite_fila)
+        self._lock = threading.Lock()
+        self._em_uso = 0
+        self._recusados = 0
+
+    async def hash(self, senha: str) -> str:
+        return await self._executar(pwd_context.hash, senha)
+
+    async def verify_and_update(
+        self, senha: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """(senha confere, novo hash se o custo configurado mudou)."""
+        return await self._executar(
+            pwd_context.verify_and_update, senha, hashed_password
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "limite_fila": self.limite_fila,
+                "em_uso": self._em_uso,
+                "recusados": self._recusados,
+            }
+
+    async def _executar(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self._recusados += 1
+            raise HashingSobrecarregado()
+        with self._lock:
+            self._em_uso += 1
+        try:
+            future = self._executor.submit(funcao, *args)
+        except Exception:
+            self._liberar(None)
+            raise
+        # A vaga só é devolvida quando o hash termina, mesmo se a request for cancelada
+        future.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(future)
+
+    def _liberar(self, _future):
+        with self._lock:
+            self._em_uso -= 1
+        self._vagas.release()
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    limite_fila=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
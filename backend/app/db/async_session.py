@@ -0,0 +1,46 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.db.session import IS_SQLITE, aplicar_pragmas_sqlite, engine_kwargs
+
+# Drivers assíncronos equivalentes aos usados pelo engine síncrono
+_DRIVERS_ASYNC = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    esquema, resto = settings.DATABASE_URL.split(":", 1)
+    return f"{_DRIVERS_ASYNC.get(esquema, esquema)}:{resto}"
+
+
+def get_async_engine():
+    """
+    Engine assíncrono, criado no primeiro uso: o driver (aiosqlite/asyncpg) só é
+    exigido quando o stack assíncrono é usado (ver ASYNC_DB_ROUTES).
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = create_async_engine(async_database_url(), **engine_kwargs())
+        # Mesmo perfil de PRAGMAs do engine síncrono (WAL, busy_timeout...)
+        if IS_SQLITE and settings.SQLITE_PROFILE == "tuned":
+            event.listen(_async_engine.sync_engine, "connect", aplicar_pragmas_sqlite)
+        # expire_on_commit=False: objetos continuam legíveis após o commit sem I/O implícito
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+# Dependência assíncrona equivalente a get_db
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
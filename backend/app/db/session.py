@@ -1,15 +1,59 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
-# Configuração específica para SQLite (check_same_thread=False é necessário)
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=(
-        {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-    ),
+IS_SQLITE = "sqlite" in settings.DATABASE_URL
+# Banco em memória usa um pool de conexão única; não há pool a dimensionar
+IS_SQLITE_MEMORY = IS_SQLITE and (
+    settings.DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+    or "mode=memory" in settings.DATABASE_URL
 )
 
+
+def engine_kwargs() -> dict:
+    # Configuração específica para SQLite (check_same_thread=False é necessário)
+    if not IS_SQLITE:
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_pre_ping": True,
+        }
+
+    kwargs = {"connect_args": {"check_same_thread": False}}
+    if settings.SQLITE_PROFILE == "tuned" and not IS_SQLITE_MEMORY:
+        kwargs["connect_args"]["timeout"] = settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return kwargs
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_kwargs())
+
+
+def aplicar_pragmas_sqlite(dbapi_connection, connection_record):
+    """
+    Perfil "tuned": WAL permite leituras concorrentes com uma escrita, e o
+    busy_timeout faz escritas simultâneas (fila de histórico, scheduler e
+    requests) esperarem em vez de falhar com "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    if not IS_SQLITE_MEMORY:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+    cursor.close()
+
+
+if IS_SQLITE and settings.SQLITE_PROFILE == "tuned":
+    event.listen(engine, "connect", aplicar_pragmas_sqlite)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -4,7 +4,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.db.session import engine, Base, SessionLocal
 from app.core.config import settings
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import time
 
 # Importações para o Scheduler
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -18,8 +20,11 @@ from app.modules.history import routes as history_routes
 
 # Importando Services para o Job
 from app.modules.investments import service as inv_service
+from app.modules.investments.cdi_provider import cdi_provider
+from app.modules.investments.index_series import serie_cdi, serie_ipca
 from app.modules.auth import models as auth_models
-from app.modules.history import service as history_service
+from app.modules.history import jobs as history_jobs
+from app.modules.history.jobs import history_queue
 
 # Logger
 logging.basicConfig(level=logging.INFO)
@@ -34,39 +39,85 @@ Base.metadata.create_all(bind=engine)
 
 
 # --- TAREFAS AGENDADAS (JOBS) ---
+def refresh_index_series():
+    """
+    Atualiza (e persiste) as séries do CDI e do IPCA. Quando chegam pontos novos,
+    refaz os livros de lotes com saques na faixa antes extrapolada, para que o
+    saldo dos ativos use os fatores publicados.
+    """
+    for serie in (serie_cdi, serie_ipca):
+        ultima = serie.ultima_data
+        if not serie.refresh():
+            continue
+        db = SessionLocal()
+        try:
+            refeitos = inv_service.rebuild_index_ledgers(db, serie.indicador, ultima)
+            logger.info(f"Livros de lotes {serie.indicador} refeitos: {refeitos}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erro ao refazer livros de lotes {serie.indicador}: {e}")
+        finally:
+            db.close()
+
+
 def scheduled_market_update():
     """
     Roda diariamente para:
-    1. Atualizar Taxa CDI (Se houver reunião do Copom)
+    1. Atualizar Taxa CDI (Se houver reunião do Copom) e séries do CDI/IPCA
     2. Atualizar Preços de Mercado (Ações/Cripto)
-    3. Recalcular histórico dos usuários
+    3. Recalcular histórico dos usuários (em shards, processos paralelos)
     """
     logger.info("⏳ Iniciando atualização agendada de mercado...")
+    tempos = {}
 
-    # 1. Atualiza Variavel Global do CDI
-    inv_service.update_cdi_rate_variable()
+    # 1. Atualiza (e persiste) a taxa CDI e as séries do CDI e do IPCA
+    inicio = time.perf_counter()
+    cdi_provider.refresh()
+    refresh_index_series()
+    tempos["cdi"] = time.perf_counter() - inicio
 
     # 2. Atualiza Preços dos Ativos no Banco
+    inicio = time.perf_counter()
     db = SessionLocal()
     try:
         # Atualiza cotações (Yahoo/CoinGecko) e recalcula Renda Fixa com novo CDI
-        inv_service.refresh_all_assets_prices(db)
-
-        # 3. Reconstrói histórico para todos os usuários (para o gráfico não ficar defasado)
-        users = db.query(auth_models.User).all()
-        for user in users:
-            history_service.rebuild_user_history(db, user.username)
-
-        logger.info("✅ Atualização agendada concluída com sucesso.")
+        res = inv_service.refresh_all_assets_prices(db, forcar_cotacoes=True)
+        logger.info(
+            f"Cotações: {res['linhas_alteradas']} ativos alterados. "
+            f"Tempos (s): {res['tempos']}"
+        )
+        usernames = [u for (u,) in db.query(auth_models.User.username).all()]
     except Exception as e:
-        logger.error(f"❌ Erro na atualização agendada: {e}")
+        logger.error(f"❌ Erro na atualização agendada (cotações): {e}")
+        return
     finally:
         db.close()
+    tempos["cotacoes"] = time.perf_counter() - inicio
+
+    # 3. Reconstrói histórico para todos os usuários (para o gráfico não ficar defasado)
+    inicio = time.perf_counter()
+    try:
+        resultado = history_jobs.rebuild_users_in_shards(usernames)
+    except Exception as e:
+        logger.error(f"❌ Erro na atualização agendada (histórico): {e}")
+        return
+    tempos["historico"] = time.perf_counter() - inicio
+
+    logger.info(
+        f"✅ Atualização agendada concluída: {resultado['usuarios']} usuários em "
+        f"{resultado['shards']} shards ({resultado['falhas']} com falha). Tempos (s): "
+        + ", ".join(f"{fase}={seg:.2f}" for fase, seg in tempos.items())
+    )
 
 
 # --- LIFESPAN (Inicialização) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Taxa CDI e séries: últimas persistidas agora, atualização do BCB em segundo plano
+    cdi_provider.load()
+    cdi_provider.refresh_async()
+    asyncio.get_running_loop().run_in_executor(None, refresh_index_series)
+
     # Inicia o Scheduler
     scheduler = AsyncIOScheduler()
 
@@ -81,6 +132,8 @@ async def lifespan(app: FastAPI):
 
     # Desliga o Scheduler
     scheduler.shutdown()
+    # Executa reconstruções de histórico ainda pendentes antes de sair
+    history_queue.shutdown()
 
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
@@ -100,6 +153,22 @@ def read_root():
 
 
 app.include_router(auth_routes.router, prefix="/api/v1/auth", tags=["Auth"])
+
+# Rotas de leitura assíncronas (AsyncSession) registradas antes das síncronas de
+# mesma URL; com ASYNC_DB_ROUTES=False a aplicação usa só o stack síncrono
+if settings.ASYNC_DB_ROUTES:
+    from app.modules.investments import async_routes as investment_async_routes
+    from app.modules.history import async_routes as history_async_routes
+
+    app.include_router(
+        investment_async_routes.router,
+        prefix="/api/v1/investments",
+        tags=["Investments"],
+    )
+    app.include_router(
+        history_async_routes.router, prefix="/api/v1/history", tags=["History"]
+    )
+
 app.include_router(
     investment_routes.router, prefix="/api/v1/investments", tags=["Investments"]
 )
@@ -1,38 +1,66 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.session import get_db
+from app.db.async_session import get_async_db
 from app.core.config import settings
 from app.modules.auth import schemas, models
+from app.modules.auth.user_cache import UsuarioAutenticado, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _username_from_token(token: str) -> str:
+    """Valida o JWT e retorna o username (sub)."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return token_data.username
 
-    user = (
-        db.query(models.User)
-        .filter(models.User.username == token_data.username)
-        .first()
-    )
-    if user is None:
-        raise credentials_exception
-    return user
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> UsuarioAutenticado:
+    """Usuário do token; o banco só é consultado quando ele não está no cache."""
+    username = _username_from_token(token)
+    usuario = user_cache.get(username)
+    if usuario is None:
+        user = db.query(models.User).filter(models.User.username == username).first()
+        if user is None:
+            raise _credentials_exception()
+        usuario = UsuarioAutenticado.from_user(user)
+        user_cache.put(usuario)
+    return usuario
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> UsuarioAutenticado:
+    """Versão assíncrona de get_current_user (AsyncSession)."""
+    username = _username_from_token(token)
+    usuario = user_cache.get(username)
+    if usuario is None:
+        user = await db.get(models.User, username)
+        if user is None:
+            raise _credentials_exception()
+        usuario = UsuarioAutenticado.from_user(user)
+        user_cache.put(usuario)
+    return usuario
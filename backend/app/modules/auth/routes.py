@@ -1,50 +1,109 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.db.session import get_db
 from app.core import security
 from app.modules.auth import models, schemas
+from app.modules.auth.dependencies import get_current_user
+from app.modules.auth.throttle import login_throttle
+from app.modules.auth.user_cache import UsuarioAutenticado, user_cache
 
 router = APIRouter()
 
 
+def _buscar_usuario(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def _servidor_ocupado() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes",
+        headers={"Retry-After": "1"},
+    )
+
+
+# Rotas assíncronas: o bcrypt roda no pool do password_hasher e o acesso ao banco
+# é curto (run_in_threadpool), então uma rajada de logins não ocupa o threadpool
+# compartilhado pelas demais rotas síncronas.
+
+
 @router.post("/register", response_model=schemas.User)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     # Verifica se usuário já existe
-    user = (
-        db.query(models.User).filter(models.User.username == user_in.username).first()
-    )
-    if user:
+    if await run_in_threadpool(_buscar_usuario, db, user_in.username):
         raise HTTPException(status_code=400, detail="Username já cadastrado")
 
-    hashed_pw = security.get_password_hash(user_in.password)
-    new_user = models.User(username=user_in.username, hashed_password=hashed_pw)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    try:
+        hashed_pw = await security.password_hasher.hash(user_in.password)
+    except security.HashingSobrecarregado:
+        raise _servidor_ocupado()
+
+    def criar():
+        new_user = models.User(username=user_in.username, hashed_password=hashed_pw)
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
+
+    return await run_in_threadpool(criar)
 
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
-    user = (
-        db.query(models.User).filter(models.User.username == form_data.username).first()
-    )
-    if not user or not security.verify_password(
-        form_data.password, user.hashed_password
-    ):
+    # Username com tentativas demais é recusado antes de qualquer hash
+    if not login_throttle.permitir(form_data.username):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login, aguarde e tente novamente",
+            headers={"Retry-After": str(login_throttle.janela_segundos)},
+        )
+
+    user = await run_in_threadpool(_buscar_usuario, db, form_data.username)
+    valido, novo_hash = False, None
+    if user:
+        try:
+            valido, novo_hash = await security.password_hasher.verify_and_update(
+                form_data.password, user.hashed_password
+            )
+        except security.HashingSobrecarregado:
+            raise _servidor_ocupado()
+    if not valido:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário ou senha incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_throttle.limpar(form_data.username)
 
-    # Atualiza last_login
-    user.last_login = datetime.now()
-    db.commit()
+    def registrar_login():
+        # Hash gerado com outro custo (PASSWORD_HASH_ROUNDS mudou) é substituído
+        if novo_hash:
+            user.hashed_password = novo_hash
+        # Atualiza last_login
+        user.last_login = datetime.now()
+        db.commit()
+
+    await run_in_threadpool(registrar_login)
 
     access_token = security.create_access_token(subject=user.username)
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/cache")
+def user_cache_stats(current_user: UsuarioAutenticado = Depends(get_current_user)):
+    """Contadores de hit/miss do cache de usuários autenticados."""
+    return user_cache.stats()
+
+
+@router.get("/login-stats")
+def login_stats(current_user: UsuarioAutenticado = Depends(get_current_user)):
+    """Ocupação do pool de hashing e tentativas de login recusadas."""
+    return {
+        "hashing": security.password_hasher.stats(),
+        "tentativas": login_throttle.stats(),
+    }
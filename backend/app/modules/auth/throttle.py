@@ -0,0 +1,61 @@
+"""
+Limite de tentativas de login por username (janela deslizante, em memória).
+
+A tentativa é contada antes de qualquer hash, então um username sob ataque
+é recusado sem gastar bcrypt. Um login bem-sucedido zera o contador.
+"""
+
+from collections import OrderedDict, deque
+import threading
+import time
+
+from app.core.config import settings
+
+
+class LoginThrottle:
+    def __init__(
+        self, max_tentativas: int, janela_segundos: int, max_usuarios: int = 10000
+    ):
+        self.max_tentativas = max_tentativas
+        self.janela_segundos = janela_segundos
+        self.max_usuarios = max_usuarios
+        self._lock = threading.Lock()
+        self._tentativas = OrderedDict()  # username -> deque de instantes
+        self._recusadas = 0
+
+    def permitir(self, username: str) -> bool:
+        """Registra uma tentativa; False se o limite da janela já foi atingido."""
+        agora = time.monotonic()
+        with self._lock:
+            tentativas = self._tentativas.get(username)
+            if tentativas is None:
+                tentativas = self._tentativas[username] = deque()
+            self._tentativas.move_to_end(username)
+            while tentativas and tentativas[0] <= agora - self.janela_segundos:
+                tentativas.popleft()
+            if len(tentativas) >= self.max_tentativas:
+                self._recusadas += 1
+                return False
+            tentativas.append(agora)
+            while len(self._tentativas) > self.max_usuarios:
+                self._tentativas.popitem(last=False)
+            return True
+
+    def limpar(self, username: str):
+        with self._lock:
+            self._tentativas.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "usuarios": len(self._tentativas),
+                "max_tentativas": self.max_tentativas,
+                "janela_segundos": self.janela_segundos,
+                "recusadas": self._recusadas,
+            }
+
+
+login_throttle = LoginThrottle(
+    max_tentativas=settings.LOGIN_MAX_ATTEMPTS,
+    janela_segundos=settings.LOGIN_ATTEMPT_WINDOW_SECONDS,
+)
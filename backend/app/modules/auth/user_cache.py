@@ -0,0 +1,102 @@
+"""
+Cache em memória de username -> registro leve do usuário, com TTL e despejo LRU.
+
+Evita o SELECT em `users` a cada request autenticada (get_current_user).
+Alterações no usuário via ORM (update/delete) invalidam a entrada; entre
+processos diferentes a defasagem máxima é o TTL.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.modules.auth import models
+
+
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    """O que as rotas usam do usuário autenticado (sem sessão nem relacionamentos)."""
+
+    username: str
+    is_admin: bool = False
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UsuarioAutenticado":
+        return cls(username=user.username, is_admin=bool(user.is_admin))
+
+
+class UserCache:
+    def __init__(self, ttl_segundos: int, max_entradas: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # username -> (usuario, vence_em)
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidacoes = 0
+
+    def get(self, username: str) -> Optional[UsuarioAutenticado]:
+        with self._lock:
+            entrada = self._entradas.get(username)
+            if entrada is None or entrada[1] <= time.monotonic():
+                if entrada is not None:
+                    del self._entradas[username]
+                self._misses += 1
+                return None
+            self._entradas.move_to_end(username)
+            self._hits += 1
+            return entrada[0]
+
+    def put(self, usuario: UsuarioAutenticado):
+        with self._lock:
+            self._entradas[usuario.username] = (
+                usuario,
+                time.monotonic() + self.ttl_segundos,
+            )
+            self._entradas.move_to_end(usuario.username)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, username: str):
+        with self._lock:
+            if self._entradas.pop(username, None) is not None:
+                self._invalidacoes += 1
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self._hits + self._misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / consultas, 4) if consultas else 0.0,
+                "evictions": self._evictions,
+                "invalidacoes": self._invalidacoes,
+            }
+
+
+user_cache = UserCache(
+    ttl_segundos=settings.USER_CACHE_TTL_SECONDS,
+    max_entradas=settings.USER_CACHE_MAX_ENTRIES,
+)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidar_usuario(mapper, connection, target):
+    user_cache.invalidate(target.username)
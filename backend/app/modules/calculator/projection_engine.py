@@ -0,0 +1,187 @@
+"""
+Motor vetorizado das projeções de renda fixa da calculadora.
+
+O patrimônio de cada mês sai da fórmula fechada de juros compostos com
+aportes mensais (anuidade postecipada), sem laço mês a mês:
+
+    bruto(m) = inicial * (1 + i)^m + aporte * ((1 + i)^m - 1) / i
+
+Todos os parâmetros aceitam escalares ou arrays e são combinados por
+broadcasting do NumPy, então uma série inteira (ou uma grade de cenários)
+é calculada em uma única passada.
+
+A fórmula fechada e a soma mês a mês diferem só no ruído de ponto
+flutuante. Para a série arredondada em centavos ser idêntica à da soma mês a
+mês, os meses em que esse ruído poderia mudar o arredondamento (valor a
+um fio de x,xx5) são refeitos pela soma (ver serie_mensal).
+"""
+
+import numpy as np
+
+# Faixas da tabela regressiva de IR (dias corridos -> alíquota), ver get_ir_rate
+LIMITES_IR = (180, 360, 720)
+ALIQUOTAS_IR = (0.225, 0.200, 0.175)
+ALIQUOTA_IR_MINIMA = 0.150
+
+# Diferença relativa máxima admitida entre fórmula fechada e soma, por mês somado
+TOLERANCIA_RELATIVA = 1e-15
+
+
+def aliquota_ir(dias) -> np.ndarray:
+    """Versão vetorizada de get_ir_rate."""
+    dias = np.asarray(dias)
+    return np.select(
+        [dias <= limite for limite in LIMITES_IR], ALIQUOTAS_IR, ALIQUOTA_IR_MINIMA
+    )
+
+
+def taxa_mensal(taxa_juros_anual) -> np.ndarray:
+    """Taxa mensal equivalente a uma taxa anual em %."""
+    return (1 + np.asarray(taxa_juros_anual, dtype=float) / 100) ** (1 / 12) - 1
+
+
+def _imposto(bruto, investido, meses, isento_ir):
+    lucro = bruto - investido
+    tributavel = np.logical_not(isento_ir) & (lucro > 0)
+    return np.where(tributavel, lucro * aliquota_ir(meses * 30), 0.0)
+
+
+def projetar(valor_inicial, aporte_mensal, meses, taxa_juros_anual, isento_ir):
+    """
+    Patrimônio bruto, total investido e patrimônio líquido (após IR sobre o
+    lucro, alíquota pelo prazo de meses * 30 dias) ao fim de `meses` meses.
+    Retorna (bruto, investido, liquido) com o shape do broadcast das entradas.
+    """
+    meses = np.asarray(meses)
+    i = taxa_mensal(taxa_juros_anual)
+    crescimento = np.power(1 + i, meses)
+    # expm1 evita o cancelamento de (1 + i)^m - 1 com taxas pequenas;
+    # com taxa zero a anuidade é só a quantidade de aportes
+    sem_juros = i == 0
+    anuidade = np.where(
+        sem_juros,
+        meses,
+        np.expm1(meses * np.log1p(i)) / np.where(sem_juros, 1.0, i),
+    )
+
+    bruto = valor_inicial * crescimento + aporte_mensal * anuidade
+    investido = valor_inicial + aporte_mensal * meses
+    return bruto, investido, bruto - _imposto(bruto, investido, meses, isento_ir)
+
+
+def arredondar(valores, casas: int = 2) -> np.ndarray:
+    """
+    Mesmo resultado de round(v, casas) do Python, vetorizado. np.round difere
+    do round do Python só perto de empates (...5), que são refeitos um a um.
+    """
+    valores = np.asarray(valores, dtype=float)
+    escala = 10.0**casas
+    escalado = valores * escala
+    resultado = np.round(escalado) / escala
+    distancia_empate = np.abs(escalado - np.floor(escalado) - 0.5)
+    empates = distancia_empate <= 1e-9 * np.maximum(1.0, np.abs(escalado))
+    resultado[empates] = [round(v, casas) for v in valores[empates].tolist()]
+    return resultado
+
+
+def _perto_de_empate(valores, magnitude, meses) -> np.ndarray:
+    """Meses em que a diferença para a soma mês a mês pode mudar o centavo."""
+    centavos = valores * 100
+    distancia = np.abs(centavos - np.floor(centavos) - 0.5)
+    folga = TOLERANCIA_RELATIVA * (meses + 1) * np.maximum(1.0, magnitude * 100)
+    return distancia <= folga
+
+
+def serie_iterativa(
+    valor_inicial: float, aporte_mensal: float, ate_mes: int, taxa_juros_anual: float
+):
+    """Bruto, investido e rendimento de 0..ate_mes pela soma mês a mês."""
+    taxa_juros_mensal = (1 + taxa_juros_anual / 100) ** (1 / 12) - 1
+    patrimonio_atual = valor_inicial
+    total_investido = valor_inicial
+    bruto, investido, rendimento = [patrimonio_atual], [total_investido], [0.0]
+    for _ in range(ate_mes):
+        juros_mes = patrimonio_atual * taxa_juros_mensal
+        patrimonio_atual += juros_mes
+        patrimonio_atual += aporte_mensal
+        total_investido += aporte_mensal
+        bruto.append(patrimonio_atual)
+        investido.append(total_investido)
+        rendimento.append(juros_mes)
+    return bruto, investido, rendimento
+
+
+def serie_mensal(
+    valor_inicial: float,
+    aporte_mensal: float,
+    periodo_meses: int,
+    taxa_juros_anual: float,
+    isento_ir: bool,
+) -> dict:
+    """
+    Arrays mês a mês (0..periodo_meses) de uma projeção, sem arredondar.
+    Arredondados em centavos, coincidem com os da soma mês a mês.
+    """
+    meses = np.arange(max(periodo_meses, 0) + 1)
+    bruto, investido, liquido = projetar(
+        valor_inicial, aporte_mensal, meses, taxa_juros_anual, isento_ir
+    )
+    rendimento = np.zeros(len(meses))
+    rendimento[1:] = bruto[:-1] * taxa_mensal(taxa_juros_anual)
+
+    magnitude = np.maximum(np.abs(bruto), np.abs(investido))
+    duvidosos = (
+        _perto_de_empate(bruto, np.abs(bruto), meses)
+        | _perto_de_empate(investido, np.abs(investido), meses)
+        | _perto_de_empate(liquido, magnitude, meses)
+        | _perto_de_empate(rendimento, np.abs(rendimento), meses)
+        | _perto_de_empate(bruto - investido, magnitude, meses)
+        | _perto_de_empate(bruto - liquido, magnitude, meses)
+    )
+    if duvidosos.any():
+        # Raro: refaz pela soma até o último mês duvidoso
+        ate = int(np.nonzero(duvidosos)[0][-1])
+        b, inv, rend = serie_iterativa(
+            valor_inicial, aporte_mensal, ate, taxa_juros_anual
+        )
+        bruto[: ate + 1], investido[: ate + 1], rendimento[: ate + 1] = b, inv, rend
+        liquido = bruto - _imposto(bruto, investido, meses, isento_ir)
+
+    return {
+        "mes": meses,
+        "patrimonio_bruto": bruto,
+        "total_investido": investido,
+        "patrimonio_liquido": liquido,
+        "rendimento_mes": rendimento,
+    }
+
+
+def grade_valor_liquido(valor_inicial: float, taxas, aportes, prazos, isentos):
+    """
+    Valor líquido final (em centavos, como calcular_projecao_rf) de todas as
+    combinações taxa x aporte x prazo x isenção, em um único broadcast.
+    Retorna um array de shape (len(taxas), len(aportes), len(prazos), len(isentos)).
+    """
+    taxas = np.asarray(taxas, dtype=float)[:, None, None, None]
+    aportes = np.asarray(aportes, dtype=float)[None, :, None, None]
+    prazos = np.maximum(np.asarray(prazos, dtype=np.int64), 0)[None, None, :, None]
+    isentos = np.asarray(isentos, dtype=bool)[None, None, None, :]
+
+    bruto, investido, liquido = projetar(valor_inicial, aportes, prazos, taxas, isentos)
+    magnitude = np.maximum(np.abs(bruto), np.abs(investido))
+    liquido = np.array(np.broadcast_to(liquido, np.broadcast(liquido, isentos).shape))
+    duvidosos = _perto_de_empate(liquido, magnitude, prazos) | _perto_de_empate(
+        bruto - liquido, magnitude, prazos
+    )
+    # Raro: células a um fio do meio centavo são refeitas pela soma mês a mês
+    for t, a, p, k in np.argwhere(duvidosos).tolist():
+        b, inv, _ = serie_iterativa(
+            valor_inicial,
+            float(aportes[0, a, 0, 0]),
+            int(prazos[0, 0, p, 0]),
+            float(taxas[t, 0, 0, 0]),
+        )
+        liquido[t, a, p, k] = b[-1] - _imposto(
+            b[-1], inv[-1], prazos[0, 0, p, 0], isentos[0, 0, 0, k]
+        )
+    return arredondar(liquido)
@@ -78,3 +78,11 @@ def simulate_quick_rf(input: schemas.SimuladorRapidoInput):
     return service.simulador_rapido_rf(
         input.valor_inicial, input.anos, input.taxa_cdb, input.taxa_lci, input.taxa_di
     )
+
+
+@router.post("/grid", response_model=schemas.ResultadoGrade)
+def simulate_grid(input: schemas.GradeInput):
+    try:
+        return service.simular_grade(input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
 
 
 # --- Mantendo os anteriores... ---
@@ -92,3 +92,43 @@ class ResultadoComparacao(BaseModel):
     cenario_b: ResultadoSimulacao
     diferenca_liquida: float
     melhor_cenario: str
+
+
+# --- Grade de cenários ---
+class Faixa(BaseModel):
+    inicio: float
+    fim: float
+    quantidade: int = Field(..., ge=1)  # pontos igualmente espaçados, extremos inclusos
+
+
+class CelulaGrade(BaseModel):
+    # Índices da célula em cada eixo da grade
+    taxa: int = Field(..., ge=0)
+    aporte: int = Field(..., ge=0)
+    prazo: int = Field(..., ge=0)
+    isento: int = Field(0, ge=0)
+
+
+class GradeInput(BaseModel):
+    valor_inicial: float
+    taxas_anuais: Union[List[float], Faixa]
+    aportes_mensais: Union[List[float], Faixa]
+    prazos_meses: Union[List[int], Faixa]
+    isento_ir: List[bool] = [False]
+    # Células que também devem trazer a projeção mês a mês completa
+    series: List[CelulaGrade] = []
+
+
+class SerieGrade(BaseModel):
+    celula: CelulaGrade
+    resultado: ResultadoSimulacao
+
+
+class ResultadoGrade(BaseModel):
+    taxas_anuais: List[float]
+    aportes_mensais: List[float]
+    prazos_meses: List[int]
+    isento_ir: List[bool]
+    # valor_liquido[taxa][aporte][prazo][isento]
+    valor_liquido: List[List[List[List[float]]]]
+    series: List[SerieGrade] = []
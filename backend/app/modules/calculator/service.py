@@ -1,12 +1,18 @@
 from typing import List
+import numpy as np
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.modules.investments import models
+from app.modules.calculator import projection_engine
 from .schemas import (
     ResultadoSimulacao,
     DadosMes,
     ResultadoReserva,
     ResultadoPrimeiroMilhao,
     ResultadoComparacao,
+    Faixa,
+    GradeInput,
+    ResultadoGrade,
 )
 
 # ... (Manter get_ir_rate, calcular_projecao_rf, calcular_juros_simples, calcular_primeiro_milhao, calcular_reserva, comparar_cenarios) ...
@@ -30,43 +36,23 @@ def calcular_projecao_rf(
     taxa_juros_anual: float,
     isento_ir: bool = False,
 ) -> ResultadoSimulacao:
-    # Lógica padrão já implementada
-    taxa_juros_mensal = (1 + taxa_juros_anual / 100) ** (1 / 12) - 1
-    patrimonio_atual = valor_inicial
-    total_investido = valor_inicial
-    dados_projecao = []
-
-    dados_projecao.append(
-        {
-            "mes": 0,
-            "patrimonio_bruto": round(patrimonio_atual, 2),
-            "total_investido": round(total_investido, 2),
-            "patrimonio_liquido": round(patrimonio_atual, 2),
-            "rendimento_mes": 0.0,
-        }
+    # Série inteira em uma passada vetorizada (fórmula fechada, ver projection_engine)
+    serie = projection_engine.serie_mensal(
+        valor_inicial, aporte_mensal, periodo_meses, taxa_juros_anual, isento_ir
     )
-
-    for mes in range(1, periodo_meses + 1):
-        juros_mes = patrimonio_atual * taxa_juros_mensal
-        patrimonio_atual += juros_mes
-        patrimonio_atual += aporte_mensal
-        total_investido += aporte_mensal
-
-        lucro_bruto = patrimonio_atual - total_investido
-        imposto_pago = 0.0
-        if not isento_ir and lucro_bruto > 0:
-            imposto_pago = lucro_bruto * get_ir_rate(mes * 30)
-
-        dados_projecao.append(
-            {
-                "mes": mes,
-                "patrimonio_bruto": round(patrimonio_atual, 2),
-                "patrimonio_liquido": round(patrimonio_atual - imposto_pago, 2),
-                "total_investido": round(total_investido, 2),
-                "rendimento_mes": round(juros_mes, 2),
-            }
-        )
-
+    arredondada = {
+        campo: projection_engine.arredondar(valores).tolist()
+        for campo, valores in serie.items()
+        if campo != "mes"
+    }
+    # Dicts simples: o ResultadoSimulacao valida a lista inteira de uma vez
+    dados_projecao = [
+        dict(zip(arredondada, valores), mes=mes)
+        for mes, valores in enumerate(zip(*arredondada.values()))
+    ]
+
+    patrimonio_atual = float(serie["patrimonio_bruto"][-1])
+    total_investido = float(serie["total_investido"][-1])
     lucro_bruto = patrimonio_atual - total_investido
     imposto_final = (
         lucro_bruto * get_ir_rate(periodo_meses * 30)
@@ -81,7 +67,7 @@ def calcular_projecao_rf(
         imposto_pago=round(imposto_final, 2),
         valor_liquido=round(patrimonio_atual - imposto_final, 2),
         tipo="Isento" if isento_ir else "Tributável",
-        projecao_mensal=[DadosMes(**d) for d in dados_projecao],
+        projecao_mensal=dados_projecao,
     )
 
 
@@ -243,3 +229,74 @@ def simulador_rapido_rf(
         taxa_b=taxa_efetiva_b,
         isento_b=True,  # LCI
     )
+
+
+def _tamanho_eixo(eixo) -> int:
+    return eixo.quantidade if isinstance(eixo, Faixa) else len(eixo)
+
+
+def _valores_eixo(eixo) -> list:
+    if isinstance(eixo, Faixa):
+        return np.linspace(eixo.inicio, eixo.fim, eixo.quantidade).tolist()
+    return list(eixo)
+
+
+def simular_grade(grade: GradeInput) -> ResultadoGrade:
+    """
+    Valor líquido final de todas as combinações de taxa, aporte, prazo e
+    isenção de IR (uma única conta vetorizada), mais a projeção completa das
+    células pedidas em `series`.
+    """
+    celulas = (
+        _tamanho_eixo(grade.taxas_anuais)
+        * _tamanho_eixo(grade.aportes_mensais)
+        * _tamanho_eixo(grade.prazos_meses)
+        * len(grade.isento_ir)
+    )
+    if celulas == 0:
+        raise ValueError("Todos os eixos da grade precisam de ao menos um valor")
+    if celulas > settings.CALCULATOR_GRID_MAX_CELLS:
+        raise ValueError(
+            f"Grade com {celulas} combinações excede o limite de "
+            f"{settings.CALCULATOR_GRID_MAX_CELLS}"
+        )
+    if len(grade.series) > settings.CALCULATOR_GRID_MAX_SERIES:
+        raise ValueError(
+            f"No máximo {settings.CALCULATOR_GRID_MAX_SERIES} séries por grade"
+        )
+
+    taxas = _valores_eixo(grade.taxas_anuais)
+    aportes = _valores_eixo(grade.aportes_mensais)
+    prazos = [int(round(p)) for p in _valores_eixo(grade.prazos_meses)]
+    isentos = list(grade.isento_ir)
+    eixos = (taxas, aportes, prazos, isentos)
+
+    series = []
+    for celula in grade.series:
+        indices = (celula.taxa, celula.aporte, celula.prazo, celula.isento)
+        if any(i >= len(eixo) for i, eixo in zip(indices, eixos)):
+            raise ValueError(f"Célula fora da grade: {list(indices)}")
+        series.append(
+            {
+                "celula": celula,
+                "resultado": calcular_projecao_rf(
+                    grade.valor_inicial,
+                    aportes[celula.aporte],
+                    prazos[celula.prazo],
+                    taxas[celula.taxa],
+                    isentos[celula.isento],
+                ),
+            }
+        )
+
+    valor_liquido = projection_engine.grade_valor_liquido(
+        grade.valor_inicial, taxas, aportes, prazos, isentos
+    )
+    return ResultadoGrade(
+        taxas_anuais=taxas,
+        aportes_mensais=aportes,
+        prazos_meses=prazos,
+        isento_ir=isentos,
+        valor_liquido=valor_liquido.tolist(),
+        series=series,
+    )
@@ -0,0 +1,50 @@
+"""Versão assíncrona (AsyncSession) da leitura do histórico (ver routes.py)."""
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.db.async_session import get_async_db
+from app.modules.auth.dependencies import get_current_user_async
+from app.modules.auth.models import User
+from app.modules.history import models, schemas
+from app.modules.history.jobs import history_queue
+
+router = APIRouter()
+
+
+async def _get_history(db: AsyncSession, user_username: str):
+    resultado = await db.scalars(
+        select(models.Snapshot)
+        .where(models.Snapshot.owner_id == user_username)
+        .order_by(models.Snapshot.timestamp.asc())
+    )
+    return resultado.all()
+
+
+@router.get("/", response_model=List[schemas.Snapshot])
+async def get_portfolio_history(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    history = await _get_history(db, current_user.username)
+
+    # Mesma regra da rota síncrona: sem histórico ou com dados pré-migração
+    needs_rebuild = not history or (
+        history[-1].valor_total_investido is None
+        or (
+            history[-1].valor_total_bruto > 0
+            and (history[-1].valor_total_investido or 0) == 0
+        )
+    )
+
+    if needs_rebuild:
+        # Encerra a leitura antes de a reconstrução gravar (e para reler o que ela
+        # gravou); a reconstrução passa pela fila (mesma exclusão por usuário)
+        # e roda no threadpool, fora do event loop
+        await db.rollback()
+        await run_in_threadpool(history_queue.rebuild_now, current_user.username)
+        history = await _get_history(db, current_user.username)
+
+    return history
@@ -0,0 +1,246 @@
+"""
+Fila em processo para reconstrução de histórico por usuário.
+
+Pedidos do mesmo usuário dentro da janela de debounce são agrupados em uma
+única execução (a partir da data mais antiga pedida). Cada execução roda no
+pool da fila com uma sessão de banco própria, nunca com a sessão da request.
+Reconstruções imediatas (rebuild_now) passam pela mesma exclusão por usuário.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from typing import List
+import logging
+import multiprocessing
+import threading
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.modules.history import service
+
+# Os shards rodam em processos "spawn", que só importam este módulo: todos os
+# modelos precisam estar registrados para os relacionamentos se resolverem
+from app.modules.auth import models as _auth_models  # noqa: F401
+from app.modules.history import models as _history_models  # noqa: F401
+from app.modules.investments import models as _investment_models  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Marca "reconstrução completa" (sem data inicial) ao agrupar pedidos
+_COMPLETO = object()
+
+
+def _menor_data(atual, nova):
+    if atual is _COMPLETO or nova is None:
+        return _COMPLETO
+    return min(atual, nova)
+
+
+class HistoryRebuildQueue:
+    def __init__(
+        self,
+        debounce_segundos: float,
+        max_workers: int,
+        session_factory=SessionLocal,
+    ):
+        self.debounce_segundos = debounce_segundos
+        # Limite para um fluxo contínuo de pedidos não adiar a execução para sempre
+        self.espera_maxima_segundos = debounce_segundos * 5
+        self.max_workers = max_workers
+        self._session_factory = session_factory
+
+        self._cond = threading.Condition()
+        self._pendentes = {}  # username -> [primeiro_pedido, vence_em, a_partir_de]
+        self._em_execucao = set()
+        self._executor = None
+        self._dispatcher = None
+        self._parar = False
+
+        self._execucoes = 0
+        self._coalescidas = 0
+        self._ultima_execucao = None
+
+    def schedule(self, username: str, a_partir_de: date = None):
+        """Agenda (ou agrupa) a reconstrução do histórico de um usuário."""
+        data = _COMPLETO if a_partir_de is None else a_partir_de
+        with self._cond:
+            self._iniciar()
+            agora = time.monotonic()
+            pendente = self._pendentes.get(username)
+            if pendente:
+                self._coalescidas += 1
+                primeiro = pendente[0]
+                data = _menor_data(pendente[2], a_partir_de)
+            else:
+                primeiro = agora
+            vence_em = min(
+                agora + self.debounce_segundos, primeiro + self.espera_maxima_segundos
+            )
+            self._pendentes[username] = [primeiro, vence_em, data]
+            self._cond.notify_all()
+
+    def rebuild_now(self, username: str, a_partir_de: date = None) -> bool:
+        """
+        Reconstrói o histórico do usuário agora, na thread de quem chamou, com a
+        mesma exclusão por usuário da fila: espera a execução em andamento dele
+        terminar e absorve o pedido pendente (a partir da data mais antiga).
+        Retorna False se a reconstrução falhar.
+        """
+        data = _COMPLETO if a_partir_de is None else a_partir_de
+        with self._cond:
+            while username in self._em_execucao:
+                self._cond.wait()
+            pendente = self._pendentes.pop(username, None)
+            if pendente:
+                self._coalescidas += 1
+                data = _menor_data(pendente[2], a_partir_de)
+            self._em_execucao.add(username)
+        return self._executar(username, data)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pendentes": len(self._pendentes),
+                "em_execucao": len(self._em_execucao),
+                "execucoes": self._execucoes,
+                "coalescidas": self._coalescidas,
+                "debounce_segundos": self.debounce_segundos,
+                "ultima_execucao": self._ultima_execucao,
+            }
+
+    def shutdown(self):
+        """Executa os pedidos ainda pendentes e encerra a fila."""
+        with self._cond:
+            if self._dispatcher is None:
+                return
+            self._parar = True
+            for pendente in self._pendentes.values():
+                pendente[1] = 0.0
+            self._cond.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self._dispatcher = None
+        self._executor = None
+
+    def _iniciar(self):
+        if self._dispatcher is not None:
+            return
+        self._parar = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="history-rebuild"
+        )
+        self._dispatcher = threading.Thread(
+            target=self._loop, name="history-rebuild-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+
+    def _loop(self):
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+                aguardando = [
+                    (u, p)
+                    for u, p in self._pendentes.items()
+                    if u not in self._em_execucao
+                ]
+                for username, (_, vence_em, data) in aguardando:
+                    if vence_em <= agora:
+                        del self._pendentes[username]
+                        self._em_execucao.add(username)
+                        self._executor.submit(self._executar, username, data)
+
+                proximos = [
+                    p[1]
+                    for u, p in self._pendentes.items()
+                    if u not in self._em_execucao
+                ]
+                if self._parar and not self._pendentes:
+                    return
+                timeout = max(0.0, min(proximos) - agora) if proximos else None
+                self._cond.wait(timeout)
+
+    def _executar(self, username: str, data) -> bool:
+        inicio = time.perf_counter()
+        iniciado_em = datetime.now()
+        ok = False
+        db = self._session_factory()
+        try:
+            ok = service.rebuild_user_history(
+                db, username, None if data is _COMPLETO else data
+            )
+        except Exception as e:
+            logger.error(f"Erro na reconstrução de histórico de {username}: {e}")
+        finally:
+            db.close()
+            duracao = time.perf_counter() - inicio
+            with self._cond:
+                self._em_execucao.discard(username)
+                self._execucoes += 1
+                # Sem o username: GET /history/queue é aberto a qualquer usuário
+                self._ultima_execucao = {
+                    "inicio": iniciado_em.isoformat(),
+                    "duracao_segundos": round(duracao, 4),
+                    "a_partir_de": None if data is _COMPLETO else data.isoformat(),
+                }
+                self._cond.notify_all()
+        return ok
+
+
+history_queue = HistoryRebuildQueue(
+    debounce_segundos=settings.HISTORY_REBUILD_DEBOUNCE_SECONDS,
+    max_workers=settings.HISTORY_REBUILD_WORKERS,
+)
+
+
+def _rebuild_shard(usernames: List[str]) -> tuple:
+    """
+    Reconstrói o histórico completo de um shard de usuários com sessão própria.
+    Retorna (usuários reconstruídos, usuários com falha).
+    """
+    reconstruidos = 0
+    db = SessionLocal()
+    try:
+        for username in usernames:
+            try:
+                ok = service.rebuild_user_history(db, username)
+            except Exception as e:
+                logger.error(f"Erro na reconstrução de histórico de {username}: {e}")
+                db.rollback()
+                ok = False
+            reconstruidos += 1 if ok else 0
+    finally:
+        db.close()
+    return reconstruidos, len(usernames) - reconstruidos
+
+
+def rebuild_users_in_shards(
+    usernames: List[str],
+    shard_size: int = None,
+    max_processes: int = None,
+) -> dict:
+    """
+    Divide os usuários em shards e reconstrói o histórico de cada shard em um
+    processo separado (no máximo max_processes simultâneos).
+    """
+    shard_size = shard_size or settings.MARKET_UPDATE_SHARD_SIZE
+    max_processes = max_processes or settings.MARKET_UPDATE_MAX_PROCESSES
+    shards = [
+        usernames[i : i + shard_size] for i in range(0, len(usernames), shard_size)
+    ]
+
+    if len(shards) <= 1 or max_processes <= 1:
+        resultados = [_rebuild_shard(shard) for shard in shards]
+    else:
+        # spawn: o processo pai tem threads (scheduler, fila, uvicorn), então fork não é seguro
+        with ProcessPoolExecutor(
+            max_workers=min(max_processes, len(shards)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            resultados = list(pool.map(_rebuild_shard, shards))
+
+    return {
+        "usuarios": sum(ok for ok, _ in resultados),
+        "falhas": sum(falhas for _, falhas in resultados),
+        "shards": len(shards),
+    }
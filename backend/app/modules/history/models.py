@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 from datetime import datetime
@@ -6,6 +6,10 @@ from datetime import datetime
 
 class Snapshot(Base):
     __tablename__ = "snapshots"
+    # Histórico de um usuário em ordem cronológica (get_history, rebuild incremental)
+    __table_args__ = (
+        Index("ix_snapshots_owner_id_timestamp", "owner_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(String, ForeignKey("users.username"))
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
+from app.core import export
 from app.db.session import get_db
 from app.modules.auth.dependencies import get_current_user
 from app.modules.auth.models import User
 from app.modules.history import service, schemas
+from app.modules.history.jobs import history_queue
 
 router = APIRouter()
 
@@ -28,15 +30,37 @@ def get_portfolio_history(
         needs_rebuild = True
 
     if needs_rebuild:
-        service.rebuild_user_history(db, current_user.username)
+        # Pela fila (mesma exclusão por usuário), com sessão própria; a leitura
+        # desta sessão é encerrada para reler o que a reconstrução gravou
+        db.rollback()
+        history_queue.rebuild_now(current_user.username)
         history = service.get_history(db, current_user.username)
 
     return history
 
 
 @router.post("/rebuild")
-def force_rebuild_history(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
-):
-    service.rebuild_user_history(db, current_user.username)
+def force_rebuild_history(current_user: User = Depends(get_current_user)):
+    if not history_queue.rebuild_now(current_user.username):
+        raise HTTPException(status_code=500, detail="Erro ao reconstruir histórico.")
     return {"message": "Histórico reconstruído com sucesso."}
+
+
+@router.get("/queue")
+def get_rebuild_queue_stats(current_user: User = Depends(get_current_user)):
+    """Profundidade da fila de reconstrução e tempo da última execução."""
+    return history_queue.stats()
+
+
+@router.get("/export")
+def export_history(
+    formato: str = "csv", current_user: User = Depends(get_current_user)
+):
+    """Histórico (snapshots) do usuário em CSV ou Parquet (streaming)."""
+    consulta = service.export_snapshots_query(current_user.username)
+    return export.resposta_exportacao(
+        "historico",
+        formato,
+        service.COLUNAS_EXPORTACAO_SNAPSHOTS,
+        lambda: export.ler_linhas(consulta),
+    )
@@ -1,22 +1,194 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from app.modules.history import models as history_models
 from app.modules.investments import models as inv_models
-from app.modules.investments.service import calculate_future_value, CURRENT_CDI_RATE
+from app.modules.investments import lot_engine
+from app.modules.investments.service import get_curva
+from collections import defaultdict
 from datetime import timedelta, date, datetime
+import logging
+import numpy as np
 
+logger = logging.getLogger(__name__)
 
-def rebuild_user_history(db: Session, user_username: str):
+
+def _saldos_renda_fixa(transacoes, curva, refs: np.ndarray):
     """
-    Reconstrói completamente o histórico do usuário baseado nas transações.
+    Saldo bruto e investido de um ativo de Renda Fixa em cada data de referência.
+
+    Mesma regra do livro de lotes (lot_engine.aplicar_saque): cada Saque consome
+    os lotes mais antigos pelo valor corrigido na data do saque, então o saldo
+    de hoje coincide com Ativo.valor_atual_bruto. O estado dos lotes é mantido
+    em ordem cronológica e cada transação atualiza uma única vez o trecho de
+    datas a partir dela: um Aporte soma o lote corrigido e um Saque tira o
+    principal consumido de cada lote alterado.
     """
-    try:
-        # 1. Limpa histórico antigo
-        db.query(history_models.Snapshot).filter(
-            history_models.Snapshot.owner_id == user_username
-        ).delete()
+    bruto = np.zeros(len(refs))
+    investido = np.zeros(len(refs))
+
+    colunas = lot_engine.ColunasTransacoes.from_transacoes(transacoes)
+    estado = lot_engine.EstadoLotes(
+        ids=[i for i, a in zip(colunas.ids, colunas.is_aporte) if a],
+        datas=colunas.datas[colunas.is_aporte],
+        principal_restante=colunas.valores[colunas.is_aporte].copy(),
+        fator=np.ones(int(colunas.is_aporte.sum()), dtype=float),
+    )
+    curva = lot_engine.como_curva(curva)
+    um = np.float64(1.0)
+
+    lotes = 0
+    for is_aporte, valor, data in zip(
+        colunas.is_aporte, colunas.valores, colunas.datas
+    ):
+        inicio = int(np.searchsorted(refs, data))
+        if is_aporte:
+            lotes += 1
+            if inicio < len(refs) and valor > 0:
+                fator = lot_engine.fatores_crescimento(data, um, curva, refs[inicio:])
+                bruto[inicio:] += valor * fator
+                investido[inicio:] += valor
+            continue
+
+        # Saques posteriores à última data não mudam nenhum saldo calculado
+        if inicio == len(refs):
+            continue
+        antes = estado.principal_restante[:lotes].copy()
+        alterados = lot_engine.aplicar_saque(
+            estado, float(valor), data.item(), curva, lotes
+        )
+        for lote in alterados:
+            consumido = antes[lote] - estado.principal_restante[lote]
+            fator = lot_engine.fatores_crescimento(
+                estado.datas[lote], um, curva, refs[inicio:]
+            )
+            bruto[inicio:] -= consumido * fator
+            investido[inicio:] -= consumido
+
+    return np.maximum(bruto, 0), np.maximum(investido, 0)
+
+
+def _custo_renda_variavel(transacoes, refs: np.ndarray):
+    """Custo acumulado (Aportes - Saques) de um ativo de Renda Variável em cada data."""
+    custo = np.zeros(len(refs))
+    for t in transacoes:
+        inicio = int(np.searchsorted(refs, np.datetime64(t.timestamp, "us")))
+        if t.tipo == "Aporte":
+            custo[inicio:] += t.valor
+        elif t.tipo == "Saque":
+            custo[inicio:] -= t.valor
+    return custo
+
+
+def _calcular_snapshots(transacoes, ativos, sorted_dates):
+    """
+    Calcula os valores do histórico para cada data de sorted_dates (23:59:59).
+    Percorre as transações uma única vez, em ordem cronológica (sweep-line);
+    transações anteriores à primeira data entram apenas no saldo acumulado.
+    """
+    indice_data = {d: i for i, d in enumerate(sorted_dates)}
+    datas_referencia = [
+        datetime(d.year, d.month, d.day, 23, 59, 59) for d in sorted_dates
+    ]
+    refs = np.array(datas_referencia, dtype="datetime64[us]")
+
+    # Fluxo do dia e transações por ativo em uma única passada
+    fluxo_aportes = np.zeros(len(sorted_dates))
+    fluxo_saques = np.zeros(len(sorted_dates))
+    transacoes_por_ativo = defaultdict(list)
+    for t in transacoes:
+        transacoes_por_ativo[t.ativo_id].append(t)
+        i = indice_data.get(t.timestamp.date())
+        if i is None:
+            continue
+        if t.tipo == "Aporte":
+            fluxo_aportes[i] += t.valor
+        elif t.tipo == "Saque":
+            fluxo_saques[i] += t.valor
+
+    # Saldos acumulados por ativo ao longo de todas as datas
+    valor_total_bruto = np.zeros(len(sorted_dates))
+    valor_total_investido = np.zeros(len(sorted_dates))
+    idx_hoje = indice_data.get(date.today())
+
+    for ativo in ativos:
+        txs = transacoes_por_ativo.get(ativo.id)
+        if not txs:
+            continue
+
+        # Datas em que o ativo já tinha alguma transação
+        primeira = int(np.searchsorted(refs, np.datetime64(txs[0].timestamp, "us")))
+        possui = np.arange(len(refs)) >= primeira
+
+        # Renda Fixa
+        if ativo.tipo_indexador not in ["B3", "CRYPTO", "USA"]:
+            bruto, investido = _saldos_renda_fixa(txs, get_curva(ativo), refs)
+
+        # Renda Variável
+        else:
+            custo_acumulado = _custo_renda_variavel(txs, refs)
+            bruto = np.maximum(custo_acumulado, 0)
+            if idx_hoje is not None and ativo.valor_atual_bruto > 0:
+                bruto[idx_hoje] = ativo.valor_atual_bruto
+            investido = np.maximum(custo_acumulado, 0)
+
+        valor_total_bruto += np.where(possui, bruto, 0.0)
+        valor_total_investido += np.where(possui, investido, 0.0)
+
+    return [
+        {
+            "timestamp": data_referencia,
+            "valor_total_bruto": round(float(valor_total_bruto[i]), 2),
+            "valor_total_investido": round(float(valor_total_investido[i]), 2),
+            "total_aportes": round(float(fluxo_aportes[i]), 2),
+            "total_saques": round(float(fluxo_saques[i]), 2),
+        }
+        for i, data_referencia in enumerate(datas_referencia)
+    ]
+
+
+def _upsert_snapshots(db: Session, user_username: str, a_partir_de: date, linhas):
+    """
+    Grava as linhas a partir de a_partir_de reaproveitando os snapshots existentes
+    (um por dia). Snapshots desse período sem linha correspondente são removidos;
+    os anteriores a a_partir_de não são tocados.
+    """
+    existentes = (
+        db.query(history_models.Snapshot)
+        .filter(
+            history_models.Snapshot.owner_id == user_username,
+            history_models.Snapshot.timestamp
+            >= datetime.combine(a_partir_de, datetime.min.time()),
+        )
+        .all()
+    )
+    por_data = {}
+    for snap in existentes:
+        if snap.timestamp.date() in por_data:
+            db.delete(snap)
+        else:
+            por_data[snap.timestamp.date()] = snap
+
+    for linha in linhas:
+        snap = por_data.pop(linha["timestamp"].date(), None)
+        if snap is None:
+            db.add(history_models.Snapshot(owner_id=user_username, **linha))
+            continue
+        for campo, valor in linha.items():
+            setattr(snap, campo, valor)
 
-        # 2. Busca todas as transações
+    for snap in por_data.values():
+        db.delete(snap)
+
+
+def rebuild_user_history(db: Session, user_username: str, a_partir_de: date = None):
+    """
+    Reconstrói o histórico do usuário baseado nas transações.
+    Com a_partir_de, só recalcula (upsert) os snapshots a partir dessa data;
+    sem ela, apaga e regenera o histórico completo.
+    Retorna False (após o rollback) se a reconstrução falhar.
+    """
+    try:
+        # 1. Busca todas as transações
         transacoes = (
             db.query(inv_models.Transacao)
             .join(inv_models.Ativo)
@@ -25,6 +197,15 @@ def rebuild_user_history(db: Session, user_username: str):
             .all()
         )
 
+        if not transacoes:
+            a_partir_de = None
+
+        # 2. Limpa histórico antigo (modo completo)
+        if a_partir_de is None:
+            db.query(history_models.Snapshot).filter(
+                history_models.Snapshot.owner_id == user_username
+            ).delete()
+
         if not transacoes:
             snap = history_models.Snapshot(
                 owner_id=user_username,
@@ -36,11 +217,13 @@ def rebuild_user_history(db: Session, user_username: str):
             )
             db.add(snap)
             db.commit()
-            return
+            return True
 
-        # 3. Datas únicas
+        # 3. Datas únicas (apenas as afetadas no modo incremental)
         datas_relevantes = set(t.timestamp.date() for t in transacoes)
         datas_relevantes.add(date.today())
+        if a_partir_de is not None:
+            datas_relevantes = {d for d in datas_relevantes if d >= a_partir_de}
         sorted_dates = sorted(list(datas_relevantes))
 
         ativos = (
@@ -49,94 +232,25 @@ def rebuild_user_history(db: Session, user_username: str):
             .all()
         )
 
-        # 4. Loop de reconstrução
-        for data_alvo in sorted_dates:
-            data_referencia = datetime(
-                data_alvo.year, data_alvo.month, data_alvo.day, 23, 59, 59
-            )
-
-            valor_total_bruto = 0.0
-            valor_total_investido = 0.0
-
-            # Fluxo do dia (Apenas transações que aconteceram EXATAMENTE nesta data)
-            fluxo_aportes = 0.0
-            fluxo_saques = 0.0
-
-            # Calcula fluxo do dia globalmente antes de entrar nos ativos (mais eficiente)
-            for t in transacoes:
-                if t.timestamp.date() == data_alvo:
-                    if t.tipo == "Aporte":
-                        fluxo_aportes += t.valor
-                    elif t.tipo == "Saque":
-                        fluxo_saques += t.valor
-
-            # Calcula Saldos Acumulados
-            for ativo in ativos:
-                txs_ate_data = [
-                    t for t in ativo.transacoes if t.timestamp <= data_referencia
+        # 4. Calcula e salva os snapshots
+        linhas = _calcular_snapshots(transacoes, ativos, sorted_dates)
+        if a_partir_de is None:
+            db.add_all(
+                [
+                    history_models.Snapshot(owner_id=user_username, **linha)
+                    for linha in linhas
                 ]
-                if not txs_ate_data:
-                    continue
-
-                # Renda Fixa
-                if ativo.tipo_indexador not in ["B3", "CRYPTO", "USA"]:
-                    taxa_efetiva = ativo.valor_taxa
-                    if ativo.tipo_indexador == "CDI":
-                        taxa_efetiva = CURRENT_CDI_RATE * (ativo.valor_taxa / 100.0)
-
-                    lotes = []
-                    investido_ativo = 0.0
-                    for t in txs_ate_data:
-                        if t.tipo == "Aporte":
-                            val_futuro = calculate_future_value(
-                                t.valor, t.timestamp, taxa_efetiva, data_referencia
-                            )
-                            lotes.append({"val": val_futuro, "principal": t.valor})
-                            investido_ativo += t.valor
-                        elif t.tipo == "Saque":
-                            saldo_momento = sum(l["val"] for l in lotes)
-                            if saldo_momento > 0:
-                                ratio = 1 - (t.valor / saldo_momento)
-                                for l in lotes:
-                                    l["val"] *= ratio
-                                    l["principal"] *= ratio
-                                investido_ativo -= t.valor
-
-                    valor_total_bruto += sum(l["val"] for l in lotes)
-                    valor_total_investido += max(0, investido_ativo)
-
-                # Renda Variável
-                else:
-                    custo_acumulado = 0.0
-                    for t in txs_ate_data:
-                        if t.tipo == "Aporte":
-                            custo_acumulado += t.valor
-                        elif t.tipo == "Saque":
-                            custo_acumulado -= t.valor
-
-                    if data_alvo == date.today() and ativo.valor_atual_bruto > 0:
-                        valor_total_bruto += ativo.valor_atual_bruto
-                    else:
-                        valor_total_bruto += max(0, custo_acumulado)
-
-                    valor_total_investido += max(0, custo_acumulado)
-
-            # Salva Snapshot
-            snap = history_models.Snapshot(
-                owner_id=user_username,
-                timestamp=data_referencia,
-                valor_total_bruto=round(valor_total_bruto, 2),
-                valor_total_investido=round(valor_total_investido, 2),
-                total_aportes=round(fluxo_aportes, 2),
-                total_saques=round(fluxo_saques, 2),
             )
-            db.add(snap)
+        else:
+            _upsert_snapshots(db, user_username, a_partir_de, linhas)
 
         db.commit()
+        return True
 
     except Exception as e:
         db.rollback()
-        print(f"Erro ao reconstruir histórico: {e}")
+        logger.error(f"Erro ao reconstruir histórico de {user_username}: {e}")
+        return False
 
 
 def get_history(db: Session, user_username: str):
@@ -146,3 +260,22 @@ def get_history(db: Session, user_username: str):
         .order_by(history_models.Snapshot.timestamp.asc())
         .all()
     )
+
+
+COLUNAS_EXPORTACAO_SNAPSHOTS = [
+    ("timestamp", "data_hora"),
+    ("valor_total_bruto", "real"),
+    ("valor_total_investido", "real"),
+    ("total_aportes", "real"),
+    ("total_saques", "real"),
+]
+
+
+def export_snapshots_query(user_username: str):
+    """Histórico do usuário em ordem cronológica, só colunas (sem objetos ORM)."""
+    S = history_models.Snapshot
+    return (
+        select(*(getattr(S, nome) for nome, _ in COLUNAS_EXPORTACAO_SNAPSHOTS))
+        .where(S.owner_id == user_username)
+        .order_by(S.timestamp.asc())
+    )
@@ -0,0 +1,78 @@
+"""
+Versões assíncronas (AsyncSession) das rotas de leitura de investimentos.
+Incluídas antes das rotas síncronas quando ASYNC_DB_ROUTES está ativo; com a
+opção desligada, as mesmas URLs são atendidas pelas rotas de routes.py.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Union
+from app.db.async_session import get_async_db
+from app.modules.investments import schemas, models
+from app.modules.auth.dependencies import get_current_user_async
+from app.modules.auth.models import User
+
+router = APIRouter()
+
+
+@router.get("/assets", response_model=List[Union[schemas.Ativo, schemas.AtivoResumo]])
+async def list_assets(
+    incluir_transacoes: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    """Resumo dos ativos; transações só com incluir_transacoes=true (selectinload)."""
+    query = select(models.Ativo).where(models.Ativo.owner_id == current_user.username)
+    if not incluir_transacoes:
+        resultado = await db.scalars(query)
+        return [schemas.AtivoResumo.model_validate(a) for a in resultado.all()]
+    resultado = await db.scalars(query.options(selectinload(models.Ativo.transacoes)))
+    return [schemas.Ativo.model_validate(a) for a in resultado.all()]
+
+
+@router.get("/assets/{asset_id}", response_model=schemas.Ativo)
+async def get_asset(
+    asset_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    asset = await db.get(
+        models.Ativo, asset_id, options=[selectinload(models.Ativo.transacoes)]
+    )
+    if not asset or asset.owner_id != current_user.username:
+        raise HTTPException(status_code=404, detail="Ativo não encontrado")
+    return asset
+
+
+@router.get("/passivos", response_model=List[schemas.Passivo])
+async def list_passivos(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    resultado = await db.scalars(
+        select(models.Passivo)
+        .where(models.Passivo.owner_id == current_user.username)
+        .options(selectinload(models.Passivo.parcelas))
+    )
+    return resultado.all()
+
+
+@router.get("/passivos/{passivo_id}", response_model=schemas.Passivo)
+async def get_passivo(
+    passivo_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    p = await db.scalar(
+        select(models.Passivo)
+        .where(
+            models.Passivo.id == passivo_id,
+            models.Passivo.owner_id == current_user.username,
+        )
+        .options(selectinload(models.Passivo.parcelas))
+    )
+    if not p:
+        raise HTTPException(status_code=404, detail="Passivo não encontrado")
+    return p
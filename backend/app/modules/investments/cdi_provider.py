@@ -0,0 +1,145 @@
+"""
+Provedor da taxa CDI usada na correção dos ativos pós-fixados.
+
+A taxa vem do último valor persistido na tabela `taxas_referencia` (leitura
+local, sem rede) e é atualizada a partir do Banco Central em segundo plano.
+Nenhuma chamada de rede acontece na importação do módulo.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+import logging
+import threading
+
+from app.db.session import SessionLocal
+from app.modules.investments import models
+
+logger = logging.getLogger(__name__)
+
+INDICADOR_CDI = "CDI"
+
+# Usada apenas enquanto não houver nenhuma taxa persistida
+TAXA_FALLBACK = 11.25
+
+
+@dataclass(frozen=True)
+class TaxaCdi:
+    taxa: float  # % a.a.
+    data_referencia: Optional[date]  # None = fallback (nunca obtida da fonte)
+    atualizado_em: Optional[datetime] = None
+
+
+def buscar_meta_selic() -> Optional[TaxaCdi]:
+    """
+    Busca a Meta Selic atual (código 432) diretamente do Banco Central.
+    Utiliza a biblioteca python-bcb. Retorna None em caso de erro.
+    """
+    try:
+        from bcb import sgs
+
+        # Código 432: Taxa de juros - Meta Selic definida pelo Copom (% a.a.)
+        df = sgs.get({"selic": 432}, last=1)
+        if not df.empty:
+            return TaxaCdi(
+                taxa=float(df["selic"].iloc[-1]),
+                data_referencia=df.index[-1].date(),
+                atualizado_em=datetime.now(),
+            )
+    except Exception as e:
+        logger.warning(f"Erro ao buscar taxa CDI no BCB: {str(e)}")
+    return None
+
+
+class CdiRateProvider:
+    def __init__(self, fetcher=buscar_meta_selic, session_factory=SessionLocal):
+        self._fetcher = fetcher
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._atual: Optional[TaxaCdi] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="cdi-refresh"
+        )
+        self._atualizando = None
+
+    def get(self) -> TaxaCdi:
+        """Taxa atual e sua data de referência (carrega do banco no primeiro uso)."""
+        atual = self._atual
+        if atual is None:
+            atual = self.load()
+        return atual
+
+    @property
+    def taxa(self) -> float:
+        return self.get().taxa
+
+    def load(self) -> TaxaCdi:
+        """Carrega a última taxa persistida (ou o fallback, se não houver)."""
+        carregada = self._carregar() or TaxaCdi(TAXA_FALLBACK, None)
+        with self._lock:
+            # Não sobrescreve uma taxa já atualizada da fonte por outra thread
+            if self._atual is None or self._atual.data_referencia is None:
+                self._atual = carregada
+            return self._atual
+
+    def refresh(self) -> bool:
+        """Busca a taxa na fonte e persiste. Em caso de falha mantém a atual."""
+        nova = self._fetcher()
+        if nova is None or nova.taxa <= 0:
+            logger.warning(f"Mantendo taxa CDI atual: {self.get().taxa}%")
+            return False
+        self._persistir(nova)
+        with self._lock:
+            self._atual = nova
+        logger.info(
+            f"Taxa CDI atualizada via BCB: {nova.taxa}% (referência {nova.data_referencia})"
+        )
+        return True
+
+    def refresh_async(self):
+        """Agenda refresh() em segundo plano (pedidos simultâneos são agrupados)."""
+        with self._lock:
+            if self._atualizando is not None and not self._atualizando.done():
+                return self._atualizando
+            self._atualizando = self._executor.submit(self.refresh)
+            return self._atualizando
+
+    def _carregar(self) -> Optional[TaxaCdi]:
+        db = self._session_factory()
+        try:
+            linha = db.get(models.TaxaReferencia, INDICADOR_CDI)
+            if linha is None:
+                return None
+            return TaxaCdi(linha.valor, linha.data_referencia, linha.atualizado_em)
+        except Exception as e:
+            logger.error(f"Erro ao carregar taxa CDI persistida: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _persistir(self, taxa: TaxaCdi):
+        db = self._session_factory()
+        try:
+            db.merge(
+                models.TaxaReferencia(
+                    indicador=INDICADOR_CDI,
+                    valor=taxa.taxa,
+                    data_referencia=taxa.data_referencia,
+                    atualizado_em=taxa.atualizado_em or datetime.now(),
+                )
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao persistir taxa CDI: {e}")
+        finally:
+            db.close()
+
+
+cdi_provider = CdiRateProvider()
+
+
+def get_cdi_rate() -> TaxaCdi:
+    """Taxa CDI atual (% a.a.) com a data de referência."""
+    return cdi_provider.get()
@@ -0,0 +1,336 @@
+"""
+Importação em lote de extratos (CSV de corretora/banco e OFX).
+
+O arquivo é lido em streaming e validado em blocos de IMPORT_CHUNK_SIZE
+linhas; cada bloco válido vira um único INSERT em lote. Só no final cada
+ativo afetado é recalculado uma vez (livro de lotes ou posição) e o
+histórico do usuário é reconstruído uma única vez a partir da data mais
+antiga importada.
+
+CSV: cabeçalho com tipo, valor e timestamp (obrigatórias) e, opcionalmente,
+ativo_id, quantidade e valor_liquido. Separador "," ou ";"; datas ISO ou
+dd/mm/aaaa; valores com vírgula ou ponto decimal ("1.234,56" ou "1,234.56"),
+inferido de cada valor ou fixado para o arquivo (separador_decimal).
+
+OFX: cada <STMTTRN> vira uma transação do ativo informado na importação;
+TRNAMT positivo é Aporte e negativo é Saque.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+import csv
+import io
+import logging
+import math
+import re
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.modules.investments import lot_engine, models, service
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "ofx")
+TIPOS_VALIDOS = ("Aporte", "Saque")
+SEPARADORES_DECIMAIS = (",", ".")
+FORMATOS_DATA = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+_TAG_OFX = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_TAMANHO_BLOCO_OFX = 64 * 1024
+
+
+class ErroLinha(ValueError):
+    pass
+
+
+def detectar_formato(nome_arquivo: Optional[str]) -> Optional[str]:
+    extensao = (nome_arquivo or "").rsplit(".", 1)[-1].lower()
+    return extensao if extensao in FORMATOS else None
+
+
+def _separador_decimal(texto: str, bruto) -> Optional[str]:
+    """
+    Separador decimal inferido do próprio valor: o último "," ou "." quando os
+    dois aparecem; um separador repetido é de milhar (None). Um separador único
+    que também formaria um milhar ("1.000", mas não "0.125") é ambíguo e vira erro.
+    """
+    separadores = [c for c in texto if c in SEPARADORES_DECIMAIS]
+    if not separadores:
+        return None
+    ultimo = separadores[-1]
+    if len(set(separadores)) > 1:
+        return ultimo
+    if len(separadores) > 1:
+        return None
+    inteiro, fracao = texto.rsplit(ultimo, 1)
+    if re.fullmatch(r"[+-]?[1-9]\d{0,2}", inteiro) and re.fullmatch(r"\d{3}", fracao):
+        raise ErroLinha(
+            f"Valor ambíguo: {bruto!r} (informe separador_decimal na importação)"
+        )
+    return ultimo
+
+
+def _parse_valor(bruto, separador_decimal: Optional[str] = None) -> float:
+    """
+    Valor com vírgula ou ponto decimal; o outro separador é o de milhar
+    ("1.234,56" e "1,234.56" valem 1234.56). Sem separador_decimal, ele é
+    inferido do valor (ver _separador_decimal). Agrupamentos fora do padrão e
+    valores não finitos ("nan", "inf") são erro.
+    """
+    texto = str(bruto or "").strip().replace("R$", "").replace(" ", "")
+    decimal = separador_decimal or _separador_decimal(texto, bruto)
+    milhar = {",": ".", ".": ","}.get(decimal)
+    if decimal is None:
+        # Sem separador decimal: os separadores presentes são de milhar
+        milhar = next((c for c in texto if c in SEPARADORES_DECIMAIS), None)
+        inteiro = texto
+    elif texto.count(decimal) > 1:
+        raise ErroLinha(f"Valor inválido: {bruto!r}")
+    else:
+        inteiro = texto.split(decimal, 1)[0]
+
+    if milhar and milhar in inteiro:
+        if not re.fullmatch(rf"[+-]?\d{{1,3}}(\{milhar}\d{{3}})+", inteiro):
+            raise ErroLinha(f"Valor inválido: {bruto!r}")
+        texto = texto.replace(milhar, "")
+    if decimal:
+        texto = texto.replace(decimal, ".")
+    try:
+        valor = float(texto)
+    except ValueError:
+        raise ErroLinha(f"Valor inválido: {bruto!r}")
+    if not math.isfinite(valor):
+        raise ErroLinha(f"Valor inválido: {bruto!r}")
+    return valor
+
+
+def _parse_data(bruto) -> datetime:
+    texto = str(bruto or "").strip()
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    raise ErroLinha(f"Data inválida: {bruto!r}")
+
+
+def _parse_data_ofx(bruto: str) -> datetime:
+    # AAAAMMDD[HHMMSS[.XXX]][[-3:BRT]]
+    digitos = re.match(r"\d+", bruto.strip())
+    if not digitos or len(digitos.group()) < 8:
+        raise ErroLinha(f"Data inválida: {bruto!r}")
+    texto = digitos.group()[:14]
+    return datetime.strptime(texto, "%Y%m%d%H%M%S"[: len(texto) - 2])
+
+
+def ler_csv(arquivo: io.TextIOBase) -> Iterator[Tuple[int, dict]]:
+    """(número da linha, campos) de cada linha do CSV, sem carregar o arquivo."""
+    primeira = arquivo.readline()
+    separador = ";" if primeira.count(";") > primeira.count(",") else ","
+    cabecalho = [
+        c.strip().lower() for c in next(csv.reader([primeira], delimiter=separador))
+    ]
+    for numero, campos in enumerate(csv.reader(arquivo, delimiter=separador), start=2):
+        if not any(c.strip() for c in campos):
+            continue
+        yield numero, dict(zip(cabecalho, campos))
+
+
+def ler_ofx(arquivo: io.TextIOBase) -> Iterator[Tuple[int, dict]]:
+    """(ordem do lançamento, campos) de cada <STMTTRN> do OFX, lido em blocos."""
+    ordem, atual, resto = 0, None, ""
+    while True:
+        bloco = arquivo.read(_TAMANHO_BLOCO_OFX)
+        texto = resto + bloco
+        # Uma tag cortada no fim do bloco fica para a próxima leitura
+        corte = texto.rfind("<") if bloco else -1
+        corte = corte if corte >= 0 else len(texto)
+        texto, resto = texto[:corte], texto[corte:]
+        for fechamento, tag, valor in _TAG_OFX.findall(texto):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if atual is not None:
+                    ordem += 1
+                    yield ordem, atual
+                atual = None if fechamento else {}
+            elif atual is not None and not fechamento:
+                atual[tag] = valor.strip()
+        if not bloco:
+            break
+    if atual is not None:
+        yield ordem + 1, atual
+
+
+def _linha_csv(
+    campos: dict, ativo_padrao: Optional[str], decimal: Optional[str] = None
+) -> dict:
+    tipo = (campos.get("tipo") or "").strip().capitalize()
+    if tipo not in TIPOS_VALIDOS:
+        raise ErroLinha(f"Tipo inválido: {campos.get('tipo')!r}")
+    valor = _parse_valor(campos.get("valor"), decimal)
+    quantidade = campos.get("quantidade")
+    valor_liquido = campos.get("valor_liquido")
+    return {
+        "ativo_id": (campos.get("ativo_id") or "").strip() or ativo_padrao,
+        "tipo": tipo,
+        "valor": valor,
+        "quantidade": _parse_valor(quantidade, decimal) if quantidade else 0.0,
+        "valor_liquido": (
+            _parse_valor(valor_liquido, decimal) if valor_liquido else 0.0
+        ),
+        "timestamp": _parse_data(campos.get("timestamp")),
+    }
+
+
+def _linha_ofx(
+    campos: dict, ativo_padrao: Optional[str], decimal: Optional[str] = None
+) -> dict:
+    if "TRNAMT" not in campos or "DTPOSTED" not in campos:
+        raise ErroLinha("Lançamento sem TRNAMT ou DTPOSTED")
+    valor = _parse_valor(campos["TRNAMT"], decimal)
+    return {
+        "ativo_id": ativo_padrao,
+        "tipo": "Aporte" if valor > 0 else "Saque",
+        "valor": abs(valor),
+        "quantidade": 0.0,
+        "valor_liquido": 0.0,
+        "timestamp": _parse_data_ofx(campos["DTPOSTED"]),
+    }
+
+
+def _validar(linha: dict, ativos_do_usuario: set) -> dict:
+    if not linha["ativo_id"]:
+        raise ErroLinha("ativo_id não informado")
+    if linha["ativo_id"] not in ativos_do_usuario:
+        raise ErroLinha(f"Ativo não encontrado: {linha['ativo_id']}")
+    if linha["valor"] <= 0:
+        raise ErroLinha("Valor deve ser positivo")
+    return linha
+
+
+def _em_blocos(linhas: Iterable, tamanho: int) -> Iterator[list]:
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def _recalcular_ativos(db: Session, ativos, deltas: dict):
+    """Recalcula uma vez cada ativo afetado (sem commit)."""
+    data_hoje = datetime.now()
+    for asset in ativos:
+        if asset.tipo_indexador in ["B3", "CRYPTO", "USA"]:
+            # Mesma regra de create_transaction: bruto/líquido somam o valor movimentado
+            bruto, liquido = deltas[asset.id]
+            asset.valor_atual_bruto = (asset.valor_atual_bruto or 0.0) + bruto
+            asset.valor_liquido_estimado = (
+                asset.valor_liquido_estimado or 0.0
+            ) + liquido
+            service.recalculate_position(db, asset)
+        else:
+            lotes = [
+                l
+                for l in service.rebuild_lot_ledger(db, asset)
+                if l.principal_restante > lot_engine.EPSILON_SAQUE
+            ]
+            saldo = service._calcular_saldo_renda_fixa(asset, lotes, data_hoje)
+            for campo, valor in saldo.items():
+                setattr(asset, campo, valor)
+
+
+def importar_transacoes(
+    db: Session,
+    user_username: str,
+    arquivo: io.TextIOBase,
+    formato: str,
+    ativo_id: Optional[str] = None,
+    separador_decimal: Optional[str] = None,
+) -> tuple:
+    """
+    Importa as transações do arquivo em uma única transação de banco.
+    Linhas inválidas são ignoradas e relatadas; as válidas são gravadas.
+    separador_decimal ("," ou ".") vale para o arquivo todo; sem ele, o
+    separador é inferido de cada valor e valores ambíguos ("1.000") são erro.
+    Retorna o relatório e a data mais antiga importada (para o histórico).
+    """
+    inicio = time.perf_counter()
+    leitor, conversor = (
+        (ler_ofx, _linha_ofx) if formato == "ofx" else (ler_csv, _linha_csv)
+    )
+    ativos_do_usuario = {
+        a
+        for (a,) in db.query(models.Ativo.id).filter(
+            models.Ativo.owner_id == user_username
+        )
+    }
+
+    lidas, importadas, total_erros = 0, 0, 0
+    erros = []
+    deltas = defaultdict(lambda: [0.0, 0.0])  # RV: variação de bruto e líquido
+    primeira_data = None
+
+    for bloco in _em_blocos(leitor(arquivo), settings.IMPORT_CHUNK_SIZE):
+        validas = []
+        for numero, campos in bloco:
+            lidas += 1
+            try:
+                validas.append(
+                    _validar(
+                        conversor(campos, ativo_id, separador_decimal),
+                        ativos_do_usuario,
+                    )
+                )
+            except ErroLinha as e:
+                total_erros += 1
+                if len(erros) < settings.IMPORT_MAX_REPORTED_ERRORS:
+                    erros.append({"linha": numero, "erro": str(e)})
+        if not validas:
+            continue
+
+        db.execute(insert(models.Transacao), validas)
+        importadas += len(validas)
+        for linha in validas:
+            sinal = 1 if linha["tipo"] == "Aporte" else -1
+            delta = deltas[linha["ativo_id"]]
+            delta[0] += sinal * linha["valor"]
+            delta[1] += sinal * (
+                linha["valor"]
+                if sinal > 0 or not linha["valor_liquido"]
+                else linha["valor_liquido"]
+            )
+            data = linha["timestamp"].date()
+            primeira_data = data if primeira_data is None else min(primeira_data, data)
+
+    ativos = []
+    if deltas:
+        ativos = db.query(models.Ativo).filter(models.Ativo.id.in_(list(deltas))).all()
+        _recalcular_ativos(db, ativos, deltas)
+    db.commit()
+
+    duracao = time.perf_counter() - inicio
+    logger.info(
+        f"Importação de {user_username}: {importadas}/{lidas} linhas, "
+        f"{len(ativos)} ativos recalculados em {duracao:.2f}s"
+    )
+    relatorio = {
+        "linhas_lidas": lidas,
+        "linhas_importadas": importadas,
+        "total_erros": total_erros,
+        "erros": erros,
+        "ativos_recalculados": len(ativos),
+        "duracao_segundos": round(duracao, 4),
+        "linhas_por_segundo": round(lidas / duracao, 1) if duracao > 0 else None,
+    }
+    return relatorio, primeira_data
@@ -0,0 +1,301 @@
+"""
+Séries de indicadores guardadas localmente (tabela `series_indicadores`).
+
+A série diária do CDI (SGS 12) é pré-computada em um array de fatores
+acumulados por dia útil publicado, então a correção de um lote entre duas
+datas é a razão de duas entradas do array. Depois do último dia publicado
+(ou sem série nenhuma), a curva projeta com a taxa CDI atual (cdi_provider).
+
+A série mensal do IPCA (SGS 433) vira um número-índice acumulado por mês,
+interpolado pro rata dia dentro do mês, para os ativos IPCA + X%.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import List, Tuple
+import logging
+import threading
+
+import numpy as np
+
+from app.core import business_days
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.modules.investments import lot_engine, models
+from app.modules.investments.cdi_provider import cdi_provider
+
+logger = logging.getLogger(__name__)
+
+INDICADOR_CDI = "CDI"
+CODIGO_SGS_CDI = 12  # Taxa DI diária (% a.d.)
+
+INDICADOR_IPCA = "IPCA"
+CODIGO_SGS_IPCA = 433  # IPCA, variação mensal (%)
+
+# Meses publicados usados para projetar o IPCA depois do último mês da série
+MESES_PROJECAO_IPCA = 12
+
+# O SGS limita consultas de séries diárias a 10 anos por requisição
+JANELA_CONSULTA = timedelta(days=365 * 5)
+
+# Origem arbitrária para contar dias úteis quando não há série carregada
+_ORIGEM = np.datetime64("2000-01-03", "D")
+
+
+def buscar_serie_sgs(codigo: int, inicio: date, fim: date) -> List[Tuple[date, float]]:
+    """Busca (data, valor) de uma série do SGS/BCB entre inicio e fim (inclusive)."""
+    from bcb import sgs
+
+    pontos = []
+    while inicio <= fim:
+        fim_janela = min(fim, inicio + JANELA_CONSULTA)
+        df = sgs.get({"valor": codigo}, start=inicio, end=fim_janela)
+        pontos.extend((ts.date(), float(v)) for ts, v in df["valor"].dropna().items())
+        inicio = fim_janela + timedelta(days=1)
+    return pontos
+
+
+class CurvaIndice:
+    """
+    Correção por um índice diário. acumulado[k] é o produto dos fatores
+    diários de todos os dias da série anteriores a datas[k]; fora da série
+    cada dia útil rende taxa_extrapolacao.
+    """
+
+    def __init__(
+        self, datas: np.ndarray, taxas_diarias: np.ndarray, taxa_extrapolacao: float
+    ):
+        self.datas = datas
+        self.acumulado = np.concatenate(([1.0], np.cumprod(1 + taxas_diarias)))
+        self.taxa_extrapolacao = taxa_extrapolacao
+
+    def fator_acumulado(self, datas) -> np.ndarray:
+        """Fator acumulado do índice no início de cada data."""
+        dias = np.asarray(datas, dtype="datetime64[D]")
+        if len(self.datas) == 0:
+            extra = business_days.dias_uteis(_ORIGEM, dias)
+            return np.power(1 + self.taxa_extrapolacao, extra.astype(float))
+
+        primeiro, ultimo = self.datas[0], self.datas[-1]
+        fator = self.acumulado[np.searchsorted(self.datas, dias, side="left")]
+        extra = np.where(dias > ultimo, business_days.dias_uteis(ultimo + 1, dias), 0)
+        extra = extra - np.where(
+            dias < primeiro, business_days.dias_uteis(dias, primeiro), 0
+        )
+        return fator * np.power(1 + self.taxa_extrapolacao, extra.astype(float))
+
+    def fatores(self, datas: np.ndarray, datas_referencia: np.ndarray) -> np.ndarray:
+        return self.fator_acumulado(datas_referencia) / self.fator_acumulado(datas)
+
+
+class CurvaIpca:
+    """
+    Correção IPCA + taxa real. O índice acumulado é guardado por mês
+    (acumulado[k] = produto das variações dos meses anteriores ao k-ésimo) e
+    interpolado pro rata pelos dias corridos dentro do mês. Meses fora da série
+    usam a variação mensal de projeção.
+    """
+
+    def __init__(
+        self,
+        primeiro_mes: np.datetime64,
+        variacoes: np.ndarray,
+        variacao_projetada: float,
+        taxa_real: float,
+    ):
+        self.primeiro_mes = primeiro_mes
+        self.variacoes = variacoes
+        self.acumulado = np.concatenate(([1.0], np.cumprod(1 + variacoes)))
+        self.variacao_projetada = variacao_projetada
+        self.juros_reais = lot_engine.CurvaPrefixada(taxa_real)
+
+    def indice(self, datas) -> np.ndarray:
+        """Número-índice (base 1 no início da série) em cada data."""
+        dias = np.asarray(datas, dtype="datetime64[D]")
+        meses = dias.astype("datetime64[M]")
+        n = len(self.variacoes)
+
+        k = (meses - self.primeiro_mes).astype(np.int64)
+        dentro = np.clip(k, 0, n)
+        base = self.acumulado[dentro] * np.power(
+            1 + self.variacao_projetada, (k - dentro).astype(float)
+        )
+        variacao = np.full(np.shape(k), self.variacao_projetada)
+        publicado = (k >= 0) & (k < n)
+        variacao[publicado] = self.variacoes[k[publicado]]
+
+        inicio_mes = meses.astype("datetime64[D]")
+        dias_no_mes = ((meses + 1).astype("datetime64[D]") - inicio_mes).astype(float)
+        fracao = (dias - inicio_mes).astype(float) / dias_no_mes
+        return base * np.power(1 + variacao, fracao)
+
+    def fatores(self, datas: np.ndarray, datas_referencia: np.ndarray) -> np.ndarray:
+        inflacao = self.indice(datas_referencia) / self.indice(datas)
+        return inflacao * self.juros_reais.fatores(datas, datas_referencia)
+
+
+class SerieLocal:
+    """
+    Série de um indicador do SGS persistida em `series_indicadores`.
+    load() lê só do banco; refresh() baixa os pontos novos, persiste e recarrega.
+    """
+
+    indicador: str
+    codigo_sgs: int
+
+    def __init__(self, fetcher=buscar_serie_sgs, session_factory=SessionLocal):
+        self._fetcher = fetcher
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._dados = None  # (datas datetime64[D], valores na unidade do SGS)
+        self._curvas = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"{self.indicador.lower()}-series-refresh",
+        )
+        self._atualizando = None
+
+    @property
+    def ultima_data(self):
+        datas, _ = self._serie()
+        return datas[-1].item() if len(datas) else None
+
+    def load(self):
+        """Carrega a série persistida e descarta as curvas já calculadas."""
+        db = self._session_factory()
+        try:
+            linhas = (
+                db.query(models.SerieIndicador.data, models.SerieIndicador.valor)
+                .filter(models.SerieIndicador.indicador == self.indicador)
+                .order_by(models.SerieIndicador.data.asc())
+                .all()
+            )
+        except Exception as e:
+            logger.error(f"Erro ao carregar série do {self.indicador}: {e}")
+            linhas = []
+        finally:
+            db.close()
+
+        datas = np.array([d for d, _ in linhas], dtype="datetime64[D]")
+        valores = np.array([v for _, v in linhas], dtype=float)
+        with self._lock:
+            self._dados = (datas, valores)
+            self._curvas = {}
+
+    def refresh(self) -> int:
+        """Baixa os pontos ainda não guardados, persiste e recarrega. Retorna quantos."""
+        inicio = settings.INDEX_SERIES_START
+        ultima = self.ultima_data
+        if ultima is not None:
+            inicio = ultima + timedelta(days=1)
+        hoje = date.today()
+        if inicio > hoje:
+            return 0
+
+        try:
+            pontos = [
+                (d, v)
+                for d, v in self._fetcher(self.codigo_sgs, inicio, hoje)
+                if d >= inicio
+            ]
+        except Exception as e:
+            logger.warning(f"Erro ao buscar série do {self.indicador} no BCB: {e}")
+            return 0
+        if not pontos:
+            return 0
+
+        db = self._session_factory()
+        try:
+            db.bulk_insert_mappings(
+                models.SerieIndicador,
+                [
+                    {"indicador": self.indicador, "data": d, "valor": v}
+                    for d, v in pontos
+                ],
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao persistir série do {self.indicador}: {e}")
+            return 0
+        finally:
+            db.close()
+
+        self.load()
+        logger.info(
+            f"Série do {self.indicador} atualizada: {len(pontos)} pontos até {pontos[-1][0]}"
+        )
+        return len(pontos)
+
+    def refresh_async(self):
+        """Agenda refresh() em segundo plano (pedidos simultâneos são agrupados)."""
+        with self._lock:
+            if self._atualizando is not None and not self._atualizando.done():
+                return self._atualizando
+            self._atualizando = self._executor.submit(self.refresh)
+            return self._atualizando
+
+    def _serie(self):
+        if self._dados is None:
+            self.load()
+        return self._dados
+
+
+class SerieCdi(SerieLocal):
+    indicador = INDICADOR_CDI
+    codigo_sgs = CODIGO_SGS_CDI  # % a.d.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._taxa_curvas = None  # taxa CDI usada na extrapolação das curvas em cache
+
+    def curva(self, percentual: float) -> CurvaIndice:
+        """Curva de um ativo que rende `percentual`% do CDI."""
+        taxa_cdi = cdi_provider.taxa
+        if taxa_cdi != self._taxa_curvas:
+            self._curvas = {}
+            self._taxa_curvas = taxa_cdi
+        curva = self._curvas.get(percentual)
+        if curva is None:
+            datas, taxas = self._serie()
+            taxa_diaria_atual = (1 + taxa_cdi / 100) ** (1 / 252) - 1
+            curva = CurvaIndice(
+                datas,
+                taxas / 100 * (percentual / 100.0),
+                taxa_diaria_atual * (percentual / 100.0),
+            )
+            self._curvas[percentual] = curva
+        return curva
+
+
+class SerieIpca(SerieLocal):
+    indicador = INDICADOR_IPCA
+    codigo_sgs = CODIGO_SGS_IPCA  # % a.m., um ponto por mês (dia 1)
+
+    def variacao_projetada(self) -> float:
+        """Média geométrica das variações dos últimos meses publicados (a.m.)."""
+        _, variacoes = self._serie()
+        ultimas = variacoes[-MESES_PROJECAO_IPCA:] / 100
+        if len(ultimas) == 0:
+            return 0.0
+        return float(np.prod(1 + ultimas) ** (1 / len(ultimas)) - 1)
+
+    def curva(self, taxa_real: float) -> CurvaIpca:
+        """Curva de um ativo IPCA + `taxa_real`% a.a."""
+        curva = self._curvas.get(taxa_real)
+        if curva is None:
+            datas, variacoes = self._serie()
+            primeiro_mes = (
+                datas[0].astype("datetime64[M]")
+                if len(datas)
+                else np.datetime64(settings.INDEX_SERIES_START, "M")
+            )
+            curva = CurvaIpca(
+                primeiro_mes, variacoes / 100, self.variacao_projetada(), taxa_real
+            )
+            self._curvas[taxa_real] = curva
+        return curva
+
+
+serie_cdi = SerieCdi()
+serie_ipca = SerieIpca()
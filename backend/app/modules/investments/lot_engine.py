@@ -0,0 +1,355 @@
+"""
+Motor de lotes FIFO vetorizado para Renda Fixa.
+
+Recebe as transações (Aporte/Saque) de um ativo como colunas NumPy e calcula
+fatores de crescimento, consumo FIFO dos lotes e impostos (IOF/IR) sem laços
+aninhados em Python. Cada Saque consome os lotes pelo valor corrigido na data
+do saque, então o principal restante de um lote não muda depois de gravado
+(ver models.Lote).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+import numpy as np
+
+from app.core import business_days
+
+# Tabela regressiva de IOF (0 a 29 dias)
+TABELA_IOF = {
+    0: 100,
+    1: 96,
+    2: 93,
+    3: 90,
+    4: 86,
+    5: 83,
+    6: 80,
+    7: 76,
+    8: 73,
+    9: 70,
+    10: 66,
+    11: 63,
+    12: 60,
+    13: 56,
+    14: 53,
+    15: 50,
+    16: 46,
+    17: 43,
+    18: 40,
+    19: 36,
+    20: 33,
+    21: 30,
+    22: 26,
+    23: 23,
+    24: 20,
+    25: 16,
+    26: 13,
+    27: 10,
+    28: 6,
+    29: 3,
+}
+
+_ALIQUOTAS_IOF = np.array([TABELA_IOF[d] for d in range(30)], dtype=float) / 100.0
+
+# Valores abaixo destes limites são considerados "pó" (lote esgotado / saque concluído)
+EPSILON_SAQUE = 0.001
+EPSILON_SALDO = 0.01
+
+
+def get_aliquota_ir(dias: int) -> float:
+    """Retorna a alíquota de IR baseada na tabela regressiva de Renda Fixa."""
+    if dias <= 180:
+        return 0.225
+    elif dias <= 360:
+        return 0.20
+    elif dias <= 720:
+        return 0.175
+    else:
+        return 0.15
+
+
+def aliquotas_ir(dias: np.ndarray) -> np.ndarray:
+    """Versão vetorizada de get_aliquota_ir."""
+    return np.select(
+        [dias <= 180, dias <= 360, dias <= 720], [0.225, 0.20, 0.175], default=0.15
+    )
+
+
+def aliquotas_iof(dias: np.ndarray) -> np.ndarray:
+    """Alíquota de IOF por lote (zero a partir de 30 dias ou para datas futuras)."""
+    dentro_tabela = (dias >= 0) & (dias < 30)
+    return np.where(dentro_tabela, _ALIQUOTAS_IOF[np.clip(dias, 0, 29)], 0.0)
+
+
+def dias_corridos(datas: np.ndarray, data_referencia) -> np.ndarray:
+    """
+    Equivalente vetorizado de (data_referencia - data).days (arredonda para baixo).
+    data_referencia pode ser uma data única ou um array compatível com `datas`.
+    """
+    ref = np.asarray(data_referencia, dtype="datetime64[us]")
+    return (ref - datas) // np.timedelta64(1, "D")
+
+
+class CurvaPrefixada:
+    """
+    Correção por uma taxa anual fixa (% a.a.).
+    Mesma convenção de calculate_future_value (252 dias úteis, calendário ANBIMA).
+    """
+
+    def __init__(self, taxa_anual_efetiva: float):
+        self.taxa_anual_efetiva = taxa_anual_efetiva
+
+    def fatores(self, datas: np.ndarray, datas_referencia: np.ndarray) -> np.ndarray:
+        dias = dias_corridos(datas, datas_referencia)
+        if self.taxa_anual_efetiva <= 0:
+            return np.ones(np.shape(dias), dtype=float)
+        dias_uteis = business_days.dias_uteis(datas, datas_referencia)
+        taxa_diaria = (1 + self.taxa_anual_efetiva / 100) ** (1 / 252) - 1
+        return np.power(1 + taxa_diaria, dias_uteis.astype(float))
+
+
+def como_curva(curva):
+    """Aceita uma curva (objeto com .fatores) ou uma taxa anual fixa."""
+    return curva if hasattr(curva, "fatores") else CurvaPrefixada(curva)
+
+
+def fatores_crescimento(
+    datas: np.ndarray,
+    valores: np.ndarray,
+    curva,
+    data_referencia,
+) -> np.ndarray:
+    """
+    Fator de correção de cada lote até a data de referência.
+    `curva` é uma CurvaPrefixada, uma curva de índice (ver index_series) ou uma
+    taxa anual fixa. Lotes sem valor ou com menos de um dia não são corrigidos.
+    """
+    curva = como_curva(curva)
+    dias = dias_corridos(datas, data_referencia)
+    fatores = np.ones(np.shape(dias), dtype=float)
+    if fatores.size == 0:
+        return fatores
+
+    crescer = (dias > 0) & (np.broadcast_to(valores, dias.shape) > 0)
+    if crescer.any():
+        inicio, fim = np.broadcast_arrays(
+            np.asarray(datas, dtype="datetime64[us]"),
+            np.asarray(data_referencia, dtype="datetime64[us]"),
+        )
+        fatores[crescer] = curva.fatores(inicio[crescer], fim[crescer])
+    return fatores
+
+
+@dataclass
+class ColunasTransacoes:
+    """Transações de um ativo em formato colunar, em ordem cronológica."""
+
+    ids: List[str]
+    is_aporte: np.ndarray
+    valores: np.ndarray
+    datas: np.ndarray
+
+    @classmethod
+    def from_transacoes(cls, transacoes) -> "ColunasTransacoes":
+        validas = [t for t in transacoes if t.tipo in ("Aporte", "Saque")]
+        return cls(
+            ids=[t.id for t in validas],
+            is_aporte=np.array([t.tipo == "Aporte" for t in validas], dtype=bool),
+            valores=np.array([t.valor or 0.0 for t in validas], dtype=float),
+            datas=np.array([t.timestamp for t in validas], dtype="datetime64[us]"),
+        )
+
+
+@dataclass
+class EstadoLotes:
+    """
+    Lotes (um por Aporte) em ordem FIFO.
+    fator guarda o fator de crescimento do lote na data do último saque que o
+    consumiu (1.0 se o lote nunca foi consumido).
+    """
+
+    ids: List[str]
+    datas: np.ndarray
+    principal_restante: np.ndarray
+    fator: np.ndarray
+
+    @classmethod
+    def from_lotes(cls, lotes) -> "EstadoLotes":
+        return cls(
+            ids=[l.transacao_id for l in lotes],
+            datas=np.array([l.data for l in lotes], dtype="datetime64[us]"),
+            principal_restante=np.array(
+                [l.principal_restante for l in lotes], dtype=float
+            ),
+            fator=np.array([l.fator for l in lotes], dtype=float),
+        )
+
+
+def aplicar_saque(
+    estado: EstadoLotes,
+    valor_saque: float,
+    data_saque: datetime,
+    curva,
+    limite: int = None,
+) -> np.ndarray:
+    """
+    Consome valor_saque dos lotes mais antigos (entre os `limite` primeiros),
+    avaliando cada lote pelo seu valor corrigido na data do saque.
+    O excedente acima do saldo disponível é descartado.
+    Retorna os índices dos lotes alterados.
+    """
+    alterados = np.array([], dtype=np.int64)
+    if valor_saque <= EPSILON_SAQUE:
+        return alterados
+
+    principal = estado.principal_restante
+    fim = len(principal) if limite is None else limite
+    vivos = np.flatnonzero(principal[:fim] > EPSILON_SAQUE)
+    if len(vivos) == 0:
+        return alterados
+
+    # Só os lotes da cabeça são corrigidos: o corte é pelo valor corrigido, não
+    # pelo principal, porque com deflação (IPCA) o fator pode ficar abaixo de 1.
+    # Começa pelos lotes cujo principal cobre o saque e dobra o prefixo até o
+    # valor acumulado passar do saque (ou acabarem os lotes).
+    n = int(np.searchsorted(np.cumsum(principal[vivos]), valor_saque, "right")) + 1
+    while True:
+        cabeca = vivos[:n]
+        fator = fatores_crescimento(
+            estado.datas[cabeca], principal[cabeca], curva, data_saque
+        )
+        acumulado = np.cumsum(principal[cabeca] * fator)
+        if acumulado[-1] > valor_saque or len(cabeca) == len(vivos):
+            break
+        n *= 2
+    vivos = cabeca
+
+    # Lotes [0, k) são consumidos por inteiro; o lote k (se houver) parcialmente
+    k = int(np.searchsorted(acumulado, valor_saque, side="right"))
+    cheios = vivos[:k]
+    principal[cheios] = 0.0
+    estado.fator[cheios] = fator[:k]
+    alterados = cheios
+
+    if k < len(vivos):
+        parcial = valor_saque - (acumulado[k - 1] if k > 0 else 0.0)
+        if parcial > EPSILON_SAQUE:
+            i = vivos[k]
+            principal[i] -= parcial / fator[k]
+            estado.fator[i] = fator[k]
+            alterados = vivos[: k + 1]
+
+    return alterados
+
+
+def reconstruir_lotes(colunas: ColunasTransacoes, curva) -> EstadoLotes:
+    """
+    Replay completo: cria um lote por Aporte e aplica cada Saque sobre os lotes
+    existentes até o momento dele.
+    """
+    is_aporte = colunas.is_aporte
+    estado = EstadoLotes(
+        ids=[i for i, a in zip(colunas.ids, is_aporte) if a],
+        datas=colunas.datas[is_aporte],
+        principal_restante=colunas.valores[is_aporte].copy(),
+        fator=np.ones(int(is_aporte.sum()), dtype=float),
+    )
+
+    # Quantidade de lotes existentes no momento de cada saque
+    curva = como_curva(curva)
+    lotes_antes = np.cumsum(is_aporte)[~is_aporte]
+    saques = colunas.valores[~is_aporte]
+    datas_saque = colunas.datas[~is_aporte]
+    for valor, data, limite in zip(saques, datas_saque, lotes_antes):
+        aplicar_saque(estado, float(valor), data.item(), curva, int(limite))
+
+    return estado
+
+
+def fatores_atuais(estado: EstadoLotes, curva, data_referencia: datetime) -> np.ndarray:
+    """Fator de crescimento de cada lote até a data de referência."""
+    return fatores_crescimento(
+        estado.datas, estado.principal_restante, curva, data_referencia
+    )
+
+
+def calcular_impostos(
+    estado: EstadoLotes,
+    fator: np.ndarray,
+    data_referencia: datetime,
+    is_isento: bool,
+) -> tuple:
+    """
+    Soma o saldo bruto e o imposto estimado (IOF + IR) dos lotes restantes.
+    Retorna (saldo_bruto, imposto_total).
+    """
+    valor_atual = estado.principal_restante * fator
+    vivos = valor_atual > EPSILON_SALDO
+    valor = valor_atual[vivos]
+    lucro = valor - estado.principal_restante[vivos]
+    dias = dias_corridos(estado.datas[vivos], data_referencia)
+
+    tributado = lucro > 0
+    lucro = lucro[tributado]
+    dias = dias[tributado]
+
+    val_iof = lucro * aliquotas_iof(dias)
+    aliq_ir = 0.0 if is_isento else aliquotas_ir(dias)
+    val_ir = (lucro - val_iof) * aliq_ir
+
+    return float(valor.sum()), float((val_iof + val_ir).sum())
+
+
+@dataclass
+class ResultadoSaque:
+    total_iof: float
+    total_ir: float
+    total_lucro: float
+    datas: np.ndarray
+    valores_sacados: np.ndarray
+    lucros: np.ndarray
+    aliquotas_ir: np.ndarray
+
+
+def simular_saque(
+    estado: EstadoLotes,
+    fator: np.ndarray,
+    valor_saque_bruto: float,
+    data_referencia: datetime,
+    is_isento: bool,
+) -> ResultadoSaque:
+    """Aplica um saque hipotético em FIFO sobre os lotes restantes e calcula os impostos."""
+    vivos = estado.principal_restante > EPSILON_SAQUE
+    principal = estado.principal_restante[vivos]
+    fator = fator[vivos]
+    valor_lote = principal * fator
+
+    antes = np.cumsum(valor_lote) - valor_lote
+    restante = valor_saque_bruto - antes
+    tocados = restante > EPSILON_SAQUE
+
+    valor_lote = valor_lote[tocados]
+    principal = principal[tocados]
+    fator = fator[tocados]
+    restante = restante[tocados]
+    datas = estado.datas[vivos][tocados]
+
+    integral = restante >= valor_lote
+    sacado = np.where(integral, valor_lote, restante)
+    principal_sacado = np.where(integral, principal, sacado / fator)
+    lucro = np.maximum(sacado - principal_sacado, 0.0)
+
+    dias = dias_corridos(datas, data_referencia)
+    val_iof = lucro * aliquotas_iof(dias)
+    aliq_ir = np.zeros(len(dias)) if is_isento else aliquotas_ir(dias)
+    val_ir = (lucro - val_iof) * aliq_ir
+
+    return ResultadoSaque(
+        total_iof=float(val_iof.sum()),
+        total_ir=float(val_ir.sum()),
+        total_lucro=float(lucro.sum()),
+        datas=datas,
+        valores_sacados=sacado,
+        lucros=lucro,
+        aliquotas_ir=aliq_ir,
+    )
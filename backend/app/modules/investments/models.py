@@ -1,4 +1,14 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Integer, Boolean
+from sqlalchemy import (
+    Column,
+    String,
+    Float,
+    Date,
+    Index,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Boolean,
+)
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import uuid
@@ -13,7 +23,7 @@ class Ativo(Base):
     __tablename__ = "ativos"
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    owner_id = Column(String, ForeignKey("users.username"))
+    owner_id = Column(String, ForeignKey("users.username"), index=True)
 
     nome = Column(String, nullable=False)
     categoria = Column(String, default="Outros")
@@ -26,14 +36,23 @@ class Ativo(Base):
     imposto_estimado = Column(Float, default=0.0)
     valor_liquido_estimado = Column(Float, default=0.0)
 
+    # Posição da Renda Variável, mantida por create_transaction/delete_transaction
+    quantidade_atual = Column(Float, default=0.0)  # Aportes - Saques (cotas)
+    preco_medio = Column(Float, default=0.0)
+
     transacoes = relationship(
         "Transacao", back_populates="ativo", cascade="all, delete-orphan"
     )
+    lotes = relationship("Lote", back_populates="ativo", cascade="all, delete-orphan")
     owner = relationship("app.modules.auth.models.User", back_populates="ativos")
 
 
 class Transacao(Base):
     __tablename__ = "transacoes"
+    # Transações de um ativo em ordem cronológica (saldos, livro de lotes, histórico)
+    __table_args__ = (
+        Index("ix_transacoes_ativo_id_timestamp", "ativo_id", "timestamp"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     ativo_id = Column(String, ForeignKey("ativos.id"))
@@ -50,10 +69,63 @@ class Transacao(Base):
     ativo = relationship("Ativo", back_populates="transacoes")
 
 
+class Lote(Base):
+    """
+    Livro de lotes FIFO da Renda Fixa (um lote por Aporte).
+    Mantido incrementalmente por create_transaction/delete_transaction.
+    """
+
+    __tablename__ = "lotes"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    ativo_id = Column(String, ForeignKey("ativos.id"), index=True)
+    transacao_id = Column(String, ForeignKey("transacoes.id"))  # Aporte de origem
+
+    data = Column(DateTime)
+    principal_restante = Column(Float, default=0.0)
+    # Fator de crescimento na data do último saque que consumiu o lote
+    fator = Column(Float, default=1.0)
+
+    ativo = relationship("Ativo", back_populates="lotes")
+    transacao = relationship("Transacao")
+
+
+class Cotacao(Base):
+    """Última cotação conhecida de cada ticker, por provedor."""
+
+    __tablename__ = "cotacoes"
+
+    provedor = Column(String, primary_key=True)  # coingecko, yahoo
+    ticker = Column(String, primary_key=True)
+    preco = Column(Float, nullable=False)
+    atualizado_em = Column(DateTime, default=datetime.now)
+
+
+class TaxaReferencia(Base):
+    """Último valor conhecido de um indicador de mercado (ex.: CDI)."""
+
+    __tablename__ = "taxas_referencia"
+
+    indicador = Column(String, primary_key=True)  # CDI
+    valor = Column(Float, nullable=False)  # % a.a.
+    data_referencia = Column(Date, nullable=True)  # data do valor na fonte
+    atualizado_em = Column(DateTime, default=datetime.now)
+
+
+class SerieIndicador(Base):
+    """Série histórica de um indicador (CDI diário, IPCA mensal), um valor por data."""
+
+    __tablename__ = "series_indicadores"
+
+    indicador = Column(String, primary_key=True)  # CDI, IPCA
+    data = Column(Date, primary_key=True)
+    valor = Column(Float, nullable=False)  # CDI: % a.d. / IPCA: % a.m.
+
+
 class Passivo(Base):
     __tablename__ = "passivos"
     id = Column(String, primary_key=True, default=generate_uuid)
-    owner_id = Column(String, ForeignKey("users.username"))
+    owner_id = Column(String, ForeignKey("users.username"), index=True)
 
     nome = Column(String, nullable=False)
     tipo = Column(String)
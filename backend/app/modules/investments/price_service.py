@@ -1,18 +1,34 @@
 import yfinance as yf
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from app.core.config import settings
+from app.modules.investments.quote_cache import QuoteCache
 
 logger = logging.getLogger(__name__)
 
 
+def _normalize_crypto_id(ticker: str) -> str:
+    # CoinGecko usa IDs em minúsculo (ex: bitcoin)
+    return ticker.lower().strip()
+
+
+def _normalize_stock_ticker(ticker: str) -> str:
+    clean_ticker = ticker.upper().strip()
+    if not clean_ticker.endswith(".SA") and len(clean_ticker) <= 6:
+        # Tenta adicionar .SA se o usuário esqueceu (assumindo B3)
+        clean_ticker += ".SA"
+    return clean_ticker
+
+
 def get_crypto_price(ticker: str) -> float:
     """
     Busca preço de cripto na CoinGecko.
     O ticker deve ser o ID da CoinGecko (ex: 'bitcoin', 'ethereum').
     """
     try:
-        # CoinGecko usa IDs em minúsculo (ex: bitcoin)
-        clean_id = ticker.lower().strip()
+        clean_id = _normalize_crypto_id(ticker)
         url = f"https://api.coingecko.com/api/v3/simple/price?ids={clean_id}&vs_currencies=brl"
         response = requests.get(url, timeout=10)
         data = response.json()
@@ -33,10 +49,7 @@ def get_stock_price(ticker: str) -> float:
     Para B3, o ticker deve ter .SA (ex: PETR4.SA).
     """
     try:
-        clean_ticker = ticker.upper().strip()
-        if not clean_ticker.endswith(".SA") and len(clean_ticker) <= 6:
-            # Tenta adicionar .SA se o usuário esqueceu (assumindo B3)
-            clean_ticker += ".SA"
+        clean_ticker = _normalize_stock_ticker(ticker)
 
         stock = yf.Ticker(clean_ticker)
         # Tenta pegar o preço mais recente (fast access)
@@ -63,3 +76,118 @@ def get_price(ticker: str, tipo_indexador: str) -> float:
         return get_stock_price(ticker)
 
     return 0.0
+
+
+def _chunks(itens: List[str], tamanho: int) -> List[List[str]]:
+    return [itens[i : i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def get_crypto_prices(ids: List[str]) -> Dict[str, float]:
+    """Busca várias criptos em uma única chamada simple/price da CoinGecko."""
+    try:
+        url = "https://api.coingecko.com/api/v3/simple/price"
+        response = requests.get(
+            url, params={"ids": ",".join(ids), "vs_currencies": "brl"}, timeout=10
+        )
+        data = response.json()
+        return {i: float(data[i]["brl"]) for i in ids if i in data}
+    except Exception as e:
+        logger.error(f"Erro ao buscar criptos {ids}: {e}")
+        return {}
+
+
+def get_stock_prices(tickers: List[str]) -> Dict[str, float]:
+    """
+    Busca vários tickers (já normalizados) em um único download do Yahoo Finance.
+    Usa 5 dias para cobrir feriados diferentes entre B3 e EUA e pega o último
+    fechamento disponível de cada ticker.
+    """
+    try:
+        dados = yf.download(tickers, period="5d", progress=False, threads=False)
+        fechamento = dados["Close"]
+        if fechamento.ndim == 1:
+            fechamento = fechamento.to_frame(tickers[0])
+
+        precos = {}
+        for ticker in tickers:
+            if ticker not in fechamento:
+                continue
+            serie = fechamento[ticker].dropna()
+            if not serie.empty:
+                precos[ticker] = float(serie.iloc[-1])
+        return precos
+    except Exception as e:
+        logger.error(f"Erro ao buscar ações {tickers}: {e}")
+        return {}
+
+
+def quote_key(ticker: str, tipo_indexador: str):
+    """Chave (provedor, ticker normalizado) usada no lote e no cache de cotações."""
+    if not ticker:
+        return None
+    if tipo_indexador == "CRYPTO":
+        return ("coingecko", _normalize_crypto_id(ticker))
+    elif tipo_indexador in ["B3", "USA"]:
+        return ("yahoo", _normalize_stock_ticker(ticker))
+    return None
+
+
+def fetch_quotes(chaves: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+    """
+    Busca na rede as cotações das chaves (provedor, ticker).
+    Criptos vão em uma chamada da CoinGecko por lote e ações/ETFs em downloads
+    multi-ticker do Yahoo, executados em paralelo (QUOTE_FETCH_MAX_WORKERS).
+    Chaves sem cotação ficam de fora do resultado.
+    """
+    chaves = set(chaves)
+    provedores = {"coingecko": get_crypto_prices, "yahoo": get_stock_prices}
+    tamanho = settings.QUOTE_BATCH_SIZE
+    lotes = [
+        (provedor, lote)
+        for provedor in provedores
+        for lote in _chunks(sorted(t for p, t in chaves if p == provedor), tamanho)
+    ]
+
+    resultado = {}
+    if lotes:
+        with ThreadPoolExecutor(
+            max_workers=min(settings.QUOTE_FETCH_MAX_WORKERS, len(lotes))
+        ) as pool:
+            futuros = [
+                (provedor, pool.submit(provedores[provedor], lote))
+                for provedor, lote in lotes
+            ]
+            for provedor, futuro in futuros:
+                for ticker, preco in futuro.result().items():
+                    resultado[(provedor, ticker)] = preco
+    return resultado
+
+
+def get_prices(
+    pares: Iterable[Tuple[str, str]], forcar: bool = False
+) -> Dict[Tuple[str, str], float]:
+    """
+    Versão em lote de get_price para pares (ticker, tipo_indexador).
+    Tickers repetidos (inclusive entre usuários) são resolvidos uma única vez,
+    passando pelo cache de cotações (forcar=True ignora o TTL e vai à rede).
+    Pares sem cotação conhecida retornam 0.0, como get_price.
+    """
+    pares = {p: quote_key(*p) for p in set(pares)}
+    precos = quote_cache.get_many(
+        [c for c in pares.values() if c is not None], forcar=forcar
+    )
+
+    resultado = {}
+    for (ticker, tipo), chave in pares.items():
+        preco = precos.get(chave, 0.0)
+        if preco == 0.0:
+            logger.warning(f"Sem cotação para '{ticker}' ({tipo}).")
+        resultado[(ticker, tipo)] = preco
+    return resultado
+
+
+quote_cache = QuoteCache(
+    fetch_quotes,
+    ttl_segundos=settings.QUOTE_CACHE_TTL_SECONDS,
+    max_entradas=settings.QUOTE_CACHE_MAX_ENTRIES,
+)
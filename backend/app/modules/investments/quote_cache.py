@@ -0,0 +1,203 @@
+"""
+Cache de cotações por (provedor, ticker), com TTL e despejo LRU.
+
+- Dentro do TTL a cotação é servida da memória, sem rede.
+- Vencida, é servida imediatamente e revalidada em segundo plano.
+- A última cotação conhecida é persistida na tabela `cotacoes`, então uma
+  falha do provedor (ou um restart) não zera o preço dos ativos.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Tuple
+import logging
+import threading
+
+from app.db.session import SessionLocal
+from app.modules.investments import models
+
+logger = logging.getLogger(__name__)
+
+Chave = Tuple[str, str]
+
+
+class QuoteCache:
+    def __init__(
+        self,
+        fetcher: Callable[[Iterable[Chave]], Dict[Chave, float]],
+        ttl_segundos: int,
+        max_entradas: int,
+        session_factory=SessionLocal,
+    ):
+        self._fetcher = fetcher
+        self.ttl = timedelta(seconds=ttl_segundos)
+        self.max_entradas = max_entradas
+        self._session_factory = session_factory
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # chave -> (preco, atualizado_em)
+        self._revalidando = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="quote-revalidate"
+        )
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._fetches = 0
+
+    def get_many(
+        self, chaves: Iterable[Chave], forcar: bool = False
+    ) -> Dict[Chave, float]:
+        """
+        Resolve as cotações das chaves. Só vai à rede (de forma síncrona) para
+        chaves nunca vistas ou quando forcar=True; nesse caso, falhas do
+        provedor caem na última cotação conhecida.
+        """
+        chaves = set(chaves)
+        if forcar:
+            return self._buscar(chaves)
+
+        agora = datetime.now()
+        resultado, vencidas, ausentes = {}, set(), set()
+        with self._lock:
+            for chave in chaves:
+                entrada = self._entradas.get(chave)
+                if entrada is None:
+                    ausentes.add(chave)
+                    continue
+                self._entradas.move_to_end(chave)
+                resultado[chave] = entrada[0]
+                if agora - entrada[1] < self.ttl:
+                    self._hits += 1
+                else:
+                    self._stale_hits += 1
+                    vencidas.add(chave)
+
+        # Fora da memória: tenta a última cotação persistida antes da rede
+        if ausentes:
+            for chave, (preco, atualizado_em) in self._carregar(ausentes).items():
+                ausentes.discard(chave)
+                resultado[chave] = preco
+                with self._lock:
+                    self._guardar(chave, preco, atualizado_em)
+                    if agora - atualizado_em < self.ttl:
+                        self._hits += 1
+                    else:
+                        self._stale_hits += 1
+                        vencidas.add(chave)
+
+        if vencidas:
+            self._revalidar(vencidas)
+        if ausentes:
+            with self._lock:
+                self._misses += len(ausentes)
+            resultado.update(self._buscar(ausentes))
+        return resultado
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self._hits + self._stale_hits + self._misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": int(self.ttl.total_seconds()),
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": (
+                    round((self._hits + self._stale_hits) / consultas, 4)
+                    if consultas
+                    else 0.0
+                ),
+                "evictions": self._evictions,
+                "fetches": self._fetches,
+                "revalidando": len(self._revalidando),
+            }
+
+    def _guardar(self, chave: Chave, preco: float, atualizado_em: datetime):
+        """Insere/atualiza a entrada na memória (chamar com o lock)."""
+        self._entradas[chave] = (preco, atualizado_em)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self._evictions += 1
+
+    def _buscar(self, chaves: set) -> Dict[Chave, float]:
+        """Busca na rede, atualiza memória e banco e completa falhas com o último preço."""
+        try:
+            novos = {c: p for c, p in self._fetcher(chaves).items() if p > 0}
+        except Exception as e:
+            logger.error(f"Erro ao buscar cotações: {e}")
+            novos = {}
+
+        agora = datetime.now()
+        with self._lock:
+            self._fetches += 1
+            for chave, preco in novos.items():
+                self._guardar(chave, preco, agora)
+            resultado = {c: self._entradas[c][0] for c in chaves if c in self._entradas}
+
+        faltando = chaves - set(resultado)
+        if faltando:
+            resultado.update({c: p for c, (p, _) in self._carregar(faltando).items()})
+        if novos:
+            self._persistir(novos, agora)
+        return resultado
+
+    def _revalidar(self, chaves: set):
+        with self._lock:
+            chaves = chaves - self._revalidando
+            self._revalidando |= chaves
+        if not chaves:
+            return
+
+        def tarefa():
+            try:
+                self._buscar(chaves)
+            finally:
+                with self._lock:
+                    self._revalidando -= chaves
+
+        self._executor.submit(tarefa)
+
+    def _carregar(self, chaves: set) -> Dict[Chave, Tuple[float, datetime]]:
+        """Últimas cotações persistidas para as chaves."""
+        db = self._session_factory()
+        try:
+            linhas = (
+                db.query(models.Cotacao)
+                .filter(models.Cotacao.ticker.in_({t for _, t in chaves}))
+                .all()
+            )
+            return {
+                (l.provedor, l.ticker): (l.preco, l.atualizado_em)
+                for l in linhas
+                if (l.provedor, l.ticker) in chaves
+            }
+        except Exception as e:
+            logger.error(f"Erro ao carregar cotações persistidas: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def _persistir(self, precos: Dict[Chave, float], atualizado_em: datetime):
+        db = self._session_factory()
+        try:
+            for (provedor, ticker), preco in precos.items():
+                db.merge(
+                    models.Cotacao(
+                        provedor=provedor,
+                        ticker=ticker,
+                        preco=preco,
+                        atualizado_em=atualizado_em,
+                    )
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao persistir cotações: {e}")
+        finally:
+            db.close()
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Body, File, Query, UploadFile
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Union
+from datetime import date, datetime
+import io
+from app.core import export
+from app.core.config import settings
 from app.db.session import get_db
-from app.modules.investments import schemas, models, service
-from app.modules.history import service as history_service
+from app.modules.investments import schemas, models, service, price_service
+from app.modules.investments import importer
+from app.modules.investments.cdi_provider import get_cdi_rate
+from app.modules.history.jobs import history_queue
 from app.modules.auth.dependencies import get_current_user
 from app.modules.auth.models import User
 
@@ -13,15 +18,23 @@ router = APIRouter()
 # --- ATIVOS ---
 
 
-@router.get("/assets", response_model=List[schemas.Ativo])
+@router.get("/assets", response_model=List[Union[schemas.Ativo, schemas.AtivoResumo]])
 def list_assets(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    incluir_transacoes: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
-    return (
-        db.query(models.Ativo)
-        .filter(models.Ativo.owner_id == current_user.username)
-        .all()
+    """
+    Resumo dos ativos (sem transações). Com incluir_transacoes=true, as
+    transações de todos os ativos vêm em uma única consulta extra (selectinload).
+    """
+    query = db.query(models.Ativo).filter(
+        models.Ativo.owner_id == current_user.username
     )
+    if not incluir_transacoes:
+        return [schemas.AtivoResumo.model_validate(a) for a in query.all()]
+    query = query.options(selectinload(models.Ativo.transacoes))
+    return [schemas.Ativo.model_validate(a) for a in query.all()]
 
 
 @router.get("/assets/{asset_id}", response_model=schemas.Ativo)
@@ -39,7 +52,6 @@ def get_asset(
 @router.post("/assets", response_model=schemas.Ativo)
 def create_asset(
     asset_in: schemas.AtivoCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -66,9 +78,7 @@ def create_asset(
         db.add(t)
         db.commit()
         service.update_asset_balance(db, new_asset)
-        background_tasks.add_task(
-            history_service.rebuild_user_history, db, current_user.username
-        )
+        history_queue.schedule(current_user.username, data_transacao.date())
 
     return new_asset
 
@@ -76,27 +86,54 @@ def create_asset(
 @router.delete("/assets/{asset_id}")
 def delete_asset_route(
     asset_id: str,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     asset = service.get_asset_by_id(db, asset_id)
     if not asset or asset.owner_id != current_user.username:
         raise HTTPException(status_code=403, detail="Acesso negado")
+    primeira_data = service.get_first_transaction_date(db, asset_id) or date.today()
     service.delete_asset(db, asset_id)
-    background_tasks.add_task(
-        history_service.rebuild_user_history, db, current_user.username
-    )
+    history_queue.schedule(current_user.username, primeira_data)
     return {"message": "Ativo excluído"}
 
 
 # --- TRANSAÇÕES ---
 
 
+@router.get("/transactions", response_model=schemas.PaginaTransacoes)
+def list_transactions(
+    ativo_id: Optional[str] = None,
+    tipo: Optional[str] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(
+        settings.TRANSACTIONS_PAGE_SIZE, ge=1, le=settings.TRANSACTIONS_PAGE_MAX
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Transações do usuário (filtros opcionais), paginadas por cursor."""
+    try:
+        itens, proximo_cursor = service.list_transactions(
+            db,
+            current_user.username,
+            limite,
+            ativo_id=ativo_id,
+            tipo=tipo,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"itens": itens, "proximo_cursor": proximo_cursor}
+
+
 @router.post("/transactions", response_model=schemas.Transacao)
 def create_transaction(
     transaction_in: schemas.TransacaoCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -104,16 +141,52 @@ def create_transaction(
     if not asset or asset.owner_id != current_user.username:
         raise HTTPException(status_code=403, detail="Acesso negado")
     tx = service.create_transaction(db, transaction_in)
-    background_tasks.add_task(
-        history_service.rebuild_user_history, db, current_user.username
-    )
+    history_queue.schedule(current_user.username, tx.timestamp.date())
     return tx
 
 
+@router.post("/transactions/import")
+def import_transactions(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = None,
+    ativo_id: Optional[str] = None,
+    encoding: str = "utf-8-sig",
+    separador_decimal: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Importa um extrato CSV/OFX em lote. ativo_id é obrigatório no OFX e, no CSV,
+    vale para as linhas sem a coluna ativo_id. O histórico é reconstruído uma vez.
+    separador_decimal ("," ou ".") desfaz valores ambíguos como "1.000".
+    """
+    formato = (formato or importer.detectar_formato(arquivo.filename) or "").lower()
+    if formato not in importer.FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato deve ser csv ou ofx")
+    if separador_decimal not in (None, *importer.SEPARADORES_DECIMAIS):
+        raise HTTPException(
+            status_code=400, detail='separador_decimal deve ser "," ou "."'
+        )
+    if ativo_id:
+        asset = service.get_asset_by_id(db, ativo_id)
+        if not asset or asset.owner_id != current_user.username:
+            raise HTTPException(status_code=403, detail="Acesso negado")
+
+    try:
+        texto = io.TextIOWrapper(arquivo.file, encoding=encoding, errors="replace")
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Encoding inválido: {encoding}")
+    relatorio, primeira_data = importer.importar_transacoes(
+        db, current_user.username, texto, formato, ativo_id, separador_decimal
+    )
+    if primeira_data:
+        history_queue.schedule(current_user.username, primeira_data)
+    return relatorio
+
+
 @router.delete("/transactions/{transaction_id}")
 def delete_transaction_route(
     transaction_id: str,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -123,10 +196,9 @@ def delete_transaction_route(
     asset = service.get_asset_by_id(db, t.ativo_id)
     if not asset or asset.owner_id != current_user.username:
         raise HTTPException(status_code=403)
+    data_transacao = t.timestamp.date()
     res = service.delete_transaction(db, transaction_id)
-    background_tasks.add_task(
-        history_service.rebuild_user_history, db, current_user.username
-    )
+    history_queue.schedule(current_user.username, data_transacao)
     return res
 
 
@@ -227,5 +299,46 @@ def refresh_prices(
     db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
     res = service.refresh_all_assets_prices(db)
-    history_service.rebuild_user_history(db, current_user.username)
+    # Cotações só alteram o valor de hoje; o restante do histórico continua válido
+    history_queue.rebuild_now(current_user.username, date.today())
     return res
+
+
+@router.get("/quotes/cache")
+def quote_cache_stats(current_user: User = Depends(get_current_user)):
+    """Contadores de hit/miss do cache de cotações."""
+    return price_service.quote_cache.stats()
+
+
+@router.get("/export/transactions")
+def export_transactions(
+    formato: str = "csv", current_user: User = Depends(get_current_user)
+):
+    """Todas as transações do usuário em CSV ou Parquet (streaming)."""
+    consulta = service.export_transactions_query(current_user.username)
+    return export.resposta_exportacao(
+        "transacoes",
+        formato,
+        service.COLUNAS_EXPORTACAO_TRANSACOES,
+        lambda: export.ler_linhas(consulta),
+    )
+
+
+@router.get("/export/passivos")
+def export_passivos(
+    formato: str = "csv", current_user: User = Depends(get_current_user)
+):
+    """Passivos do usuário em CSV ou Parquet (streaming)."""
+    consulta = service.export_passivos_query(current_user.username)
+    return export.resposta_exportacao(
+        "passivos",
+        formato,
+        service.COLUNAS_EXPORTACAO_PASSIVOS,
+        lambda: export.ler_linhas(consulta),
+    )
+
+
+@router.get("/cdi")
+def current_cdi_rate(current_user: User = Depends(get_current_user)):
+    """Taxa CDI em uso (% a.a.) e a data de referência dela."""
+    return get_cdi_rate()
@@ -34,6 +34,16 @@ class Transacao(TransacaoBase):
         from_attributes = True
 
 
+class TransacaoListagem(Transacao):
+    ativo_id: str
+
+
+class PaginaTransacoes(BaseModel):
+    itens: List[TransacaoListagem]
+    # Cursor opaco da próxima página (None quando não há mais itens)
+    proximo_cursor: Optional[str] = None
+
+
 # --- Schemas para Ativo ---
 class AtivoBase(BaseModel):
     nome: str
@@ -58,11 +68,21 @@ class AtivoUpdate(BaseModel):
     status: Optional[str] = None
 
 
-class Ativo(AtivoBase):
+class AtivoResumo(AtivoBase):
+    """Ativo sem as transações (padrão da listagem do dashboard)."""
+
     id: str
     valor_atual_bruto: float
     imposto_estimado: float
     valor_liquido_estimado: float
+    quantidade_atual: Optional[float] = 0.0
+    preco_medio: Optional[float] = 0.0
+
+    class Config:
+        from_attributes = True
+
+
+class Ativo(AtivoResumo):
     transacoes: List[Transacao] = []
 
     class Config:
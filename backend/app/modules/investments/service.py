@@ -1,101 +1,51 @@
-from sqlalchemy import func
+from sqlalchemy import bindparam, case, func, or_, select, tuple_, update
 from sqlalchemy.orm import Session
+from app.core import business_days
+from app.modules.history import models as history_models
 from app.modules.investments import models, schemas
-from app.modules.investments import price_service
+from app.modules.investments import price_service, lot_engine
+from app.modules.investments.cdi_provider import cdi_provider
+from app.modules.investments.index_series import serie_cdi, serie_ipca
+from collections import defaultdict
+import base64
+import json
 from datetime import date, datetime, timedelta
-import math
+import numpy as np
 import logging
+import time
 
 # Configuração de Logger
 logger = logging.getLogger(__name__)
 
 
-def get_current_cdi_rate() -> float:
+def get_asset_by_id(db: Session, asset_id: str):
+    return db.query(models.Ativo).filter(models.Ativo.id == asset_id).first()
+
+
+def get_taxa_efetiva(asset: models.Ativo) -> float:
+    """Taxa anual efetiva do ativo (% a.a.). Para CDI, aplica o percentual sobre a taxa atual."""
+    if asset.tipo_indexador == "CDI":
+        return cdi_provider.taxa * (asset.valor_taxa / 100.0)
+    return asset.valor_taxa
+
+
+def get_curva(asset: models.Ativo):
     """
-    Busca a Meta Selic atual (código 432) diretamente do Banco Central.
-    Utiliza a biblioteca python-bcb.
-    Retorna 11.25 como fallback em caso de erro de conexão ou leitura.
+    Curva de correção dos lotes do ativo: CDI usa a série diária acumulada,
+    IPCA o índice mensal mais a taxa real (ver index_series); os demais, a
+    taxa anual fixa.
     """
-    fallback_rate = 11.25
-    try:
-        from bcb import sgs
-
-        # Código 432: Taxa de juros - Meta Selic definida pelo Copom (% a.a.)
-        df = sgs.get({"selic": 432}, last=1)
-        if not df.empty:
-            rate = float(df["selic"].iloc[-1])
-            logger.info(f"Taxa CDI/Selic atualizada automaticamente via BCB: {rate}%")
-            return rate
-    except Exception as e:
-        logger.warning(
-            f"Erro ao buscar taxa CDI no BCB (usando fallback {fallback_rate}%): {str(e)}"
-        )
-
-    return fallback_rate
-
-
-# Taxa CDI Atual Aproximada (Atualizada automaticamente na inicialização)
-CURRENT_CDI_RATE = get_current_cdi_rate()
-
-
-def update_cdi_rate_variable():
-    """Função auxiliar para o Scheduler atualizar a taxa global."""
-    global CURRENT_CDI_RATE
-    new_rate = get_current_cdi_rate()
-    if new_rate > 0:
-        CURRENT_CDI_RATE = new_rate
-        logger.info(f"Scheduler: Taxa CDI Global atualizada para {CURRENT_CDI_RATE}%")
-
-
-# Tabela regressiva de IOF (0 a 29 dias)
-TABELA_IOF = {
-    0: 100,
-    1: 96,
-    2: 93,
-    3: 90,
-    4: 86,
-    5: 83,
-    6: 80,
-    7: 76,
-    8: 73,
-    9: 70,
-    10: 66,
-    11: 63,
-    12: 60,
-    13: 56,
-    14: 53,
-    15: 50,
-    16: 46,
-    17: 43,
-    18: 40,
-    19: 36,
-    20: 33,
-    21: 30,
-    22: 26,
-    23: 23,
-    24: 20,
-    25: 16,
-    26: 13,
-    27: 10,
-    28: 6,
-    29: 3,
-}
-
-
-def get_aliquota_ir(dias: int) -> float:
-    """Retorna a alíquota de IR baseada na tabela regressiva de Renda Fixa."""
-    if dias <= 180:
-        return 0.225
-    elif dias <= 360:
-        return 0.20
-    elif dias <= 720:
-        return 0.175
-    else:
-        return 0.15
+    if asset.tipo_indexador == "CDI":
+        return serie_cdi.curva(asset.valor_taxa)
+    if asset.tipo_indexador == "IPCA":
+        return serie_ipca.curva(asset.valor_taxa)
+    return lot_engine.CurvaPrefixada(get_taxa_efetiva(asset))
 
 
-def get_asset_by_id(db: Session, asset_id: str):
-    return db.query(models.Ativo).filter(models.Ativo.id == asset_id).first()
+def is_ativo_isento(asset: models.Ativo) -> bool:
+    """LCI/LCA (ou ativos marcados como isentos no nome) não pagam IR."""
+    nome = str(asset.nome).upper()
+    return "LCI" in nome or "LCA" in nome or "ISENTO" in nome
 
 
 def calculate_future_value(
@@ -119,117 +69,324 @@ def calculate_future_value(
     if dias_corridos <= 0:
         return valor_original
 
-    # Aproximação de dias úteis (5/7 dos dias corridos)
-    dias_uteis = int(dias_corridos * (5 / 7))
+    # Dias úteis pelo calendário ANBIMA pré-computado
+    dias_uteis = int(business_days.dias_uteis(data_original, data_referencia))
     taxa_diaria = (1 + taxa_anual_efetiva / 100) ** (1 / 252) - 1
     fator = (1 + taxa_diaria) ** dias_uteis
 
     return valor_original * fator
 
 
-def update_asset_balance(db: Session, asset: models.Ativo):
+def get_lotes(db: Session, asset_id: str, apenas_vivos: bool = False):
+    """Lotes do ativo em ordem FIFO (opcionalmente apenas os com principal restante)."""
+    query = db.query(models.Lote).filter(models.Lote.ativo_id == asset_id)
+    if apenas_vivos:
+        query = query.filter(models.Lote.principal_restante > lot_engine.EPSILON_SAQUE)
+    return query.order_by(models.Lote.data.asc(), models.Lote.id.asc()).all()
+
+
+def _get_lotes_cabeca(db: Session, asset_id: str, valor: float, curva, data: datetime):
     """
-    Recalcula o saldo total, o lucro e os impostos (IOF e IR) do ativo
-    baseando-se no histórico completo de transações (Reconstrução de Lotes).
+    Carrega só os lotes vivos da cabeça da fila necessários para cobrir `valor`.
+    A cobertura é medida pelo valor corrigido na data do saque, não pelo
+    principal: com deflação (IPCA) o fator de crescimento pode ficar abaixo de 1.
     """
-    # Se for Renda Variável (B3, Crypto, USA), o cálculo é feito via cotação atual, não juros
-    if asset.tipo_indexador in ["B3", "CRYPTO", "USA"]:
-        return
+    query = (
+        db.query(models.Lote)
+        .filter(
+            models.Lote.ativo_id == asset_id,
+            models.Lote.principal_restante > lot_engine.EPSILON_SAQUE,
+        )
+        .order_by(models.Lote.data.asc(), models.Lote.id.asc())
+    )
+    lotes = []
+    coberto = 0.0
+    pagina = 16
+    while True:
+        bloco = query.offset(len(lotes)).limit(pagina).all()
+        lotes.extend(bloco)
+        if bloco:
+            estado = lot_engine.EstadoLotes.from_lotes(bloco)
+            coberto += float(
+                np.sum(
+                    estado.principal_restante
+                    * lot_engine.fatores_atuais(estado, curva, data)
+                )
+            )
+        if len(bloco) < pagina or coberto > valor:
+            return lotes
+        pagina *= 2
+
+
+def _lot_ledger_missing(db: Session, asset_id: str) -> bool:
+    """True se o ativo tem Aportes mas o livro de lotes ainda não foi construído."""
+    if db.query(models.Lote.id).filter(models.Lote.ativo_id == asset_id).first():
+        return False
+    aporte = (
+        db.query(models.Transacao.id)
+        .filter(
+            models.Transacao.ativo_id == asset_id,
+            models.Transacao.tipo == "Aporte",
+        )
+        .first()
+    )
+    return aporte is not None
 
-    # 1. Define Taxa Efetiva
-    taxa_efetiva = asset.valor_taxa
-    if asset.tipo_indexador == "CDI":
-        taxa_efetiva = CURRENT_CDI_RATE * (asset.valor_taxa / 100.0)
 
-    # 2. Busca todas as transações ordenadas cronologicamente
+def rebuild_lot_ledger(db: Session, asset: models.Ativo):
+    """
+    Replay completo: apaga o livro de lotes do ativo e o reconstrói a partir de
+    todas as transações. Não faz commit.
+    """
+    db.query(models.Lote).filter(models.Lote.ativo_id == asset.id).delete(
+        synchronize_session=False
+    )
+
     transacoes = (
         db.query(models.Transacao)
         .filter(models.Transacao.ativo_id == asset.id)
         .order_by(models.Transacao.timestamp.asc())
         .all()
     )
+    colunas = lot_engine.ColunasTransacoes.from_transacoes(transacoes)
+    estado = lot_engine.reconstruir_lotes(colunas, get_curva(asset))
+
+    lotes = [
+        models.Lote(
+            ativo_id=asset.id,
+            transacao_id=transacao_id,
+            data=data.item(),
+            principal_restante=float(principal),
+            fator=float(fator),
+        )
+        for transacao_id, data, principal, fator in zip(
+            estado.ids, estado.datas, estado.principal_restante, estado.fator
+        )
+    ]
+    db.add_all(lotes)
+    db.flush()
+    return lotes
 
-    lotes = []
+
+def rebuild_index_ledgers(db: Session, tipo_indexador: str, desde: date = None) -> int:
+    """
+    Replay do livro de lotes dos ativos `tipo_indexador` (CDI/IPCA) com Saque a
+    partir de `desde`. Esses saques foram gravados com fatores extrapolados, que
+    a série atualizada substituiu pelos publicados. Sem `desde`, refaz todos.
+    O saldo dos ativos refeitos é recalculado no mesmo commit.
+    Retorna quantos livros foram refeitos.
+    """
+    query = (
+        db.query(models.Ativo)
+        .join(models.Transacao)
+        .filter(
+            models.Ativo.tipo_indexador == tipo_indexador,
+            models.Transacao.tipo == "Saque",
+        )
+    )
+    if desde is not None:
+        query = query.filter(
+            models.Transacao.timestamp >= datetime.combine(desde, datetime.min.time())
+        )
+    assets = query.distinct().all()
     data_hoje = datetime.now()
+    for asset in assets:
+        vivos = [
+            l
+            for l in rebuild_lot_ledger(db, asset)
+            if l.principal_restante > lot_engine.EPSILON_SAQUE
+        ]
+        for campo, valor in _calcular_saldo_renda_fixa(asset, vivos, data_hoje).items():
+            setattr(asset, campo, valor)
+    db.commit()
+    return len(assets)
 
-    # 3. Processa FIFO (Primeiro que Entra, Primeiro que Sai)
-    for t in transacoes:
-        if t.tipo == "Aporte":
-            val_atualizado = calculate_future_value(
-                t.valor, t.timestamp, taxa_efetiva, data_hoje
-            )
-            lotes.append(
-                {
-                    "data": t.timestamp,
-                    "principal_restante": t.valor,
-                    "valor_atual": val_atualizado,
-                }
-            )
-        elif t.tipo == "Saque":
-            valor_a_deduzir = t.valor
-
-            # Percorre os lotes antigos para descontar o saque
-            for lote in lotes:
-                if valor_a_deduzir <= 0.001:
-                    break
-                if lote["valor_atual"] <= 0.001:
-                    continue  # Lote já esgotado
-
-                if valor_a_deduzir >= lote["valor_atual"]:
-                    # Saque consome todo este lote
-                    valor_a_deduzir -= lote["valor_atual"]
-                    lote["valor_atual"] = 0.0
-                    lote["principal_restante"] = 0.0
-                else:
-                    # Saque parcial deste lote
-                    pct_removido = valor_a_deduzir / lote["valor_atual"]
-                    lote["valor_atual"] -= valor_a_deduzir
-                    # Deduz proporcionalmente do principal para manter coerência no lucro futuro
-                    lote["principal_restante"] -= (
-                        lote["principal_restante"] * pct_removido
-                    )
-                    valor_a_deduzir = 0.0
-
-    # 4. Calcula Totais e Impostos sobre o saldo restante
-    saldo_bruto = 0.0
-    imposto_total = 0.0
-
-    is_isento = (
-        "LCI" in str(asset.nome).upper()
-        or "LCA" in str(asset.nome).upper()
-        or "ISENTO" in str(asset.nome).upper()
+
+def get_lot_ledger(db: Session, asset: models.Ativo):
+    """Lotes vivos do ativo, construindo o livro na primeira vez que for necessário."""
+    lotes = get_lotes(db, asset.id, apenas_vivos=True)
+    if not lotes and _lot_ledger_missing(db, asset.id):
+        lotes = [
+            l
+            for l in rebuild_lot_ledger(db, asset)
+            if l.principal_restante > lot_engine.EPSILON_SAQUE
+        ]
+    return lotes
+
+
+def register_transaction_in_ledger(
+    db: Session, asset: models.Ativo, transaction: models.Transacao
+):
+    """
+    Aplica uma transação recém-criada ao livro de lotes.
+    Aporte cria um lote e Saque consome apenas os lotes da cabeça da fila.
+    Transações retroativas (anteriores à última registrada) fazem replay completo.
+    """
+    ultima = (
+        db.query(func.max(models.Transacao.timestamp))
+        .filter(
+            models.Transacao.ativo_id == asset.id,
+            models.Transacao.id != transaction.id,
+        )
+        .scalar()
     )
+    if ultima is not None and (
+        transaction.timestamp < ultima or _lot_ledger_missing(db, asset.id)
+    ):
+        rebuild_lot_ledger(db, asset)
+        return
 
-    for lote in lotes:
-        if lote["valor_atual"] > 0.01:
-            saldo_bruto += lote["valor_atual"]
+    if transaction.tipo == "Aporte":
+        db.add(
+            models.Lote(
+                ativo_id=asset.id,
+                transacao_id=transaction.id,
+                data=transaction.timestamp,
+                principal_restante=transaction.valor,
+                fator=1.0,
+            )
+        )
+    elif transaction.tipo == "Saque":
+        curva = get_curva(asset)
+        lotes = _get_lotes_cabeca(
+            db, asset.id, transaction.valor, curva, transaction.timestamp
+        )
+        estado = lot_engine.EstadoLotes.from_lotes(lotes)
+        alterados = lot_engine.aplicar_saque(
+            estado, transaction.valor, transaction.timestamp, curva
+        )
+        for i in alterados:
+            lotes[i].principal_restante = float(estado.principal_restante[i])
+            lotes[i].fator = float(estado.fator[i])
+    db.flush()
 
-            # Lucro = Valor Atual - Principal Investido
-            lucro = lote["valor_atual"] - lote["principal_restante"]
 
-            if lucro > 0:
-                dias = (data_hoje - lote["data"]).days
+def _drop_intact_lot(db: Session, transaction: models.Transacao) -> bool:
+    """
+    Remove o lote de um Aporte que nunca foi consumido (nenhum saque o alcançou,
+    então tirá-lo não altera os demais). Retorna False se for preciso replay.
+    """
+    if transaction.tipo not in ["Aporte", "Saque"]:
+        return True
+    if transaction.tipo == "Saque":
+        return False
 
-                # Cálculo IOF (apenas se < 30 dias)
-                aliq_iof = TABELA_IOF.get(dias, 0) / 100.0 if dias < 30 else 0.0
-                val_iof = lucro * aliq_iof
+    lote = (
+        db.query(models.Lote).filter(models.Lote.transacao_id == transaction.id).first()
+    )
+    if (
+        lote is None
+        or lote.fator != 1.0
+        or lote.principal_restante != transaction.valor
+    ):
+        return False
+    db.delete(lote)
+    db.flush()
+    return True
+
+
+def _calcular_saldo_renda_fixa(
+    asset: models.Ativo, lotes, data_referencia: datetime
+) -> dict:
+    """Saldo bruto, imposto estimado (IOF + IR) e líquido do ativo a partir dos lotes vivos."""
+    # 1. Estado dos lotes ainda com saldo (FIFO já aplicado na gravação)
+    estado = lot_engine.EstadoLotes.from_lotes(lotes)
+
+    # 2. Corrige cada lote até a data pela curva do ativo (série do CDI/IPCA ou taxa fixa)
+    fator = lot_engine.fatores_atuais(estado, get_curva(asset), data_referencia)
+
+    # 3. Calcula Totais e Impostos sobre o saldo restante
+    saldo_bruto, imposto_total = lot_engine.calcular_impostos(
+        estado, fator, data_referencia, is_ativo_isento(asset)
+    )
+    return {
+        "valor_atual_bruto": round(saldo_bruto, 2),
+        "imposto_estimado": round(imposto_total, 2),
+        "valor_liquido_estimado": round(saldo_bruto - imposto_total, 2),
+    }
 
-                # Cálculo IR (sobre lucro descontado do IOF)
-                base_ir = lucro - val_iof
-                aliq_ir = 0.0 if is_isento else get_aliquota_ir(dias)
-                val_ir = base_ir * aliq_ir
 
-                imposto_total += val_iof + val_ir
+def update_asset_balance(db: Session, asset: models.Ativo):
+    """
+    Recalcula o saldo total, o lucro e os impostos (IOF e IR) do ativo
+    a partir do livro de lotes persistido (ver register_transaction_in_ledger).
+    """
+    # Se for Renda Variável (B3, Crypto, USA), o cálculo é feito via cotação atual, não juros
+    if asset.tipo_indexador in ["B3", "CRYPTO", "USA"]:
+        return
 
-    # 5. Salva no Banco
-    asset.valor_atual_bruto = round(saldo_bruto, 2)
-    asset.imposto_estimado = round(imposto_total, 2)
-    asset.valor_liquido_estimado = round(saldo_bruto - imposto_total, 2)
+    saldo = _calcular_saldo_renda_fixa(asset, get_lot_ledger(db, asset), datetime.now())
+    for campo, valor in saldo.items():
+        setattr(asset, campo, valor)
 
     db.add(asset)
     db.commit()
 
 
+def aplicar_movimento(
+    quantidade: float, preco_medio: float, tipo: str, valor: float, cotas: float
+) -> tuple:
+    """
+    Nova (quantidade, preço médio) da posição após um Aporte/Saque de `cotas`.
+    Aporte recalcula o preço médio ponderado; Saque só reduz a quantidade.
+    """
+    cotas = cotas or 0.0
+    if tipo == "Aporte":
+        posicao = max(quantidade, 0.0)
+        if posicao + cotas > 0:
+            preco_medio = (posicao * preco_medio + (valor or 0.0)) / (posicao + cotas)
+        return quantidade + cotas, preco_medio
+    if tipo == "Saque":
+        quantidade -= cotas
+        return quantidade, preco_medio if quantidade > 0 else 0.0
+    return quantidade, preco_medio
+
+
+def recalculate_position(db: Session, asset: models.Ativo):
+    """Recalcula quantidade_atual e preco_medio do ativo a partir das transações."""
+    transacoes = (
+        db.query(
+            models.Transacao.tipo, models.Transacao.valor, models.Transacao.quantidade
+        )
+        .filter(models.Transacao.ativo_id == asset.id)
+        .order_by(models.Transacao.timestamp.asc())
+        .all()
+    )
+    quantidade, preco_medio = 0.0, 0.0
+    for tipo, valor, cotas in transacoes:
+        quantidade, preco_medio = aplicar_movimento(
+            quantidade, preco_medio, tipo, valor, cotas
+        )
+    asset.quantidade_atual = quantidade
+    asset.preco_medio = preco_medio
+
+
+def update_position(db: Session, asset: models.Ativo, transaction: models.Transacao):
+    """
+    Aplica uma transação recém-criada à posição do ativo (sem commit).
+    Transações retroativas recalculam a posição, pois o preço médio depende da ordem.
+    """
+    posterior = (
+        db.query(models.Transacao.id)
+        .filter(
+            models.Transacao.ativo_id == asset.id,
+            models.Transacao.id != transaction.id,
+            models.Transacao.timestamp > transaction.timestamp,
+        )
+        .first()
+    )
+    if posterior:
+        recalculate_position(db, asset)
+        return
+    asset.quantidade_atual, asset.preco_medio = aplicar_movimento(
+        asset.quantidade_atual or 0.0,
+        asset.preco_medio or 0.0,
+        transaction.tipo,
+        transaction.valor,
+        transaction.quantidade,
+    )
+
+
 def create_transaction(db: Session, transaction_in: schemas.TransacaoCreate):
     """Cria uma transação e dispara a atualização do saldo do ativo."""
     transaction = models.Transacao(**transaction_in.model_dump())
@@ -252,11 +409,15 @@ def create_transaction(db: Session, transaction_in: schemas.TransacaoCreate):
                 )
                 asset.valor_liquido_estimado -= val_liq
 
+            # Quantidade e preço médio no mesmo commit da transação
+            db.flush()
+            update_position(db, asset, transaction)
             db.add(asset)
             db.commit()
         else:
-            # Para Renda Fixa, precisamos recalcular tudo devido aos juros compostos
-            db.commit()  # Salva a transação antes de recalcular
+            # Para Renda Fixa, aplica a transação ao livro de lotes e recalcula o saldo
+            db.flush()
+            register_transaction_in_ledger(db, asset, transaction)
             update_asset_balance(db, asset)
 
     db.refresh(transaction)
@@ -268,17 +429,159 @@ def delete_transaction(db: Session, transaction_id: str):
     if not t:
         raise Exception("Transação não encontrada")
 
-    asset_id = t.ativo_id
+    asset = get_asset_by_id(db, t.ativo_id)
+    is_renda_fixa = asset and asset.tipo_indexador not in ["B3", "CRYPTO", "USA"]
+
+    # Só reconstrói o livro se a exclusão afetar lotes já consumidos
+    replay = is_renda_fixa and not _drop_intact_lot(db, t)
+    if replay:
+        db.query(models.Lote).filter(models.Lote.ativo_id == asset.id).delete(
+            synchronize_session=False
+        )
     db.delete(t)
+    db.flush()
+    if replay:
+        rebuild_lot_ledger(db, asset)
+    if asset and not is_renda_fixa:
+        recalculate_position(db, asset)
     db.commit()
 
-    asset = get_asset_by_id(db, asset_id)
     if asset:
         update_asset_balance(db, asset)
 
     return {"message": "Transação excluída."}
 
 
+def _encode_cursor(transaction: models.Transacao) -> str:
+    bruto = json.dumps([transaction.timestamp.isoformat(), transaction.id])
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, transaction_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(timestamp), str(transaction_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def list_transactions(
+    db: Session,
+    user_username: str,
+    limite: int,
+    ativo_id: str = None,
+    tipo: str = None,
+    data_inicio: datetime = None,
+    data_fim: datetime = None,
+    cursor: str = None,
+):
+    """
+    Transações do usuário da mais recente para a mais antiga, paginadas por
+    cursor (keyset em (timestamp, id)): cada página é uma busca no índice a
+    partir do último item da anterior, sem OFFSET.
+    Retorna (itens, proximo_cursor).
+    """
+    query = (
+        db.query(models.Transacao)
+        .join(models.Ativo)
+        .filter(models.Ativo.owner_id == user_username)
+    )
+    if ativo_id:
+        query = query.filter(models.Transacao.ativo_id == ativo_id)
+    if tipo:
+        query = query.filter(models.Transacao.tipo == tipo)
+    if data_inicio:
+        query = query.filter(models.Transacao.timestamp >= data_inicio)
+    if data_fim:
+        query = query.filter(models.Transacao.timestamp <= data_fim)
+    if cursor:
+        query = query.filter(
+            tuple_(models.Transacao.timestamp, models.Transacao.id)
+            < tuple_(*_decode_cursor(cursor))
+        )
+
+    # Busca um item a mais só para saber se existe próxima página
+    itens = (
+        query.order_by(models.Transacao.timestamp.desc(), models.Transacao.id.desc())
+        .limit(limite + 1)
+        .all()
+    )
+    if len(itens) <= limite:
+        return itens, None
+    itens = itens[:limite]
+    return itens, _encode_cursor(itens[-1])
+
+
+COLUNAS_EXPORTACAO_TRANSACOES = [
+    ("id", "texto"),
+    ("ativo_id", "texto"),
+    ("ativo_nome", "texto"),
+    ("timestamp", "data_hora"),
+    ("tipo", "texto"),
+    ("valor", "real"),
+    ("quantidade", "real"),
+    ("rendimento_realizado", "real"),
+    ("iof_pago", "real"),
+    ("ir_pago", "real"),
+    ("valor_liquido", "real"),
+]
+
+COLUNAS_EXPORTACAO_PASSIVOS = [
+    ("id", "texto"),
+    ("nome", "texto"),
+    ("tipo", "texto"),
+    ("valor_original", "real"),
+    ("saldo_devedor", "real"),
+    ("taxa_juros_anual", "real"),
+    ("prazo_meses", "inteiro"),
+    ("valor_parcela", "real"),
+    ("data_inicio", "data_hora"),
+    ("status", "texto"),
+]
+
+
+def export_transactions_query(user_username: str):
+    """Transações do usuário em ordem cronológica, só colunas (sem objetos ORM)."""
+    T = models.Transacao
+    return (
+        select(
+            T.id,
+            T.ativo_id,
+            models.Ativo.nome,
+            T.timestamp,
+            T.tipo,
+            T.valor,
+            T.quantidade,
+            T.rendimento_realizado,
+            T.iof_pago,
+            T.ir_pago,
+            T.valor_liquido,
+        )
+        .join(models.Ativo)
+        .where(models.Ativo.owner_id == user_username)
+        .order_by(T.timestamp.asc(), T.id.asc())
+    )
+
+
+def export_passivos_query(user_username: str):
+    P = models.Passivo
+    return (
+        select(*(getattr(P, nome) for nome, _ in COLUNAS_EXPORTACAO_PASSIVOS))
+        .where(P.owner_id == user_username)
+        .order_by(P.data_inicio.asc(), P.id.asc())
+    )
+
+
+def get_first_transaction_date(db: Session, asset_id: str):
+    """Data da transação mais antiga do ativo (None se não houver transações)."""
+    primeira = (
+        db.query(func.min(models.Transacao.timestamp))
+        .filter(models.Transacao.ativo_id == asset_id)
+        .scalar()
+    )
+    return primeira.date() if primeira else None
+
+
 def delete_asset(db: Session, asset_id: str):
     asset = get_asset_by_id(db, asset_id)
     if not asset:
@@ -290,11 +593,15 @@ def delete_asset(db: Session, asset_id: str):
 
 def create_daily_snapshot_if_needed(db: Session, user_username: str):
     """Cria um registro histórico do saldo total do dia se ainda não existir."""
-    today = date.today()
+    # Intervalo [hoje 00:00, amanhã 00:00) em vez de func.date(), para usar o índice
+    inicio_dia = datetime.combine(date.today(), datetime.min.time())
     existing = (
-        db.query(models.Snapshot)
-        .filter(models.Snapshot.owner_id == user_username)
-        .filter(func.date(models.Snapshot.timestamp) == today)
+        db.query(history_models.Snapshot)
+        .filter(
+            history_models.Snapshot.owner_id == user_username,
+            history_models.Snapshot.timestamp >= inicio_dia,
+            history_models.Snapshot.timestamp < inicio_dia + timedelta(days=1),
+        )
         .first()
     )
 
@@ -304,7 +611,7 @@ def create_daily_snapshot_if_needed(db: Session, user_username: str):
     if existing:
         existing.valor_total_bruto = total_bruto
     else:
-        new_snap = models.Snapshot(
+        new_snap = history_models.Snapshot(
             owner_id=user_username,
             timestamp=datetime.now(),
             valor_total_bruto=total_bruto,
@@ -314,17 +621,13 @@ def create_daily_snapshot_if_needed(db: Session, user_username: str):
 
 
 def calculate_asset_quantity(db: Session, asset_id: str) -> float:
-    """Calcula a quantidade total de cotas/unidades (usado para RV)."""
-    transacoes = (
-        db.query(models.Transacao).filter(models.Transacao.ativo_id == asset_id).all()
+    """Quantidade total de cotas/unidades (usado para RV), mantida em quantidade_atual."""
+    quantidade = (
+        db.query(models.Ativo.quantidade_atual)
+        .filter(models.Ativo.id == asset_id)
+        .scalar()
     )
-    qtd = 0.0
-    for t in transacoes:
-        if t.tipo == "Aporte":
-            qtd += t.quantidade or 0.0
-        elif t.tipo == "Saque":
-            qtd -= t.quantidade or 0.0
-    return max(0.0, qtd)
+    return max(0.0, quantidade or 0.0)
 
 
 def simulate_withdrawal_fifo(
@@ -338,113 +641,27 @@ def simulate_withdrawal_fifo(
     if not asset:
         raise Exception("Ativo não encontrado")
 
-    taxa_efetiva = asset.valor_taxa
-    if asset.tipo_indexador == "CDI":
-        taxa_efetiva = CURRENT_CDI_RATE * (asset.valor_taxa / 100.0)
-
-    # 1. Reconstrói o estado atual (Virtualmente)
-    transacoes = (
-        db.query(models.Transacao)
-        .filter(models.Transacao.ativo_id == asset_id)
-        .order_by(models.Transacao.timestamp.asc())
-        .all()
-    )
-
-    lotes = []
+    # 1. Estado atual dos lotes (livro persistido), corrigido até hoje
     data_hoje = datetime.now()
-
-    # Processa histórico para chegar no saldo atual disponível por lote
-    for t in transacoes:
-        if t.tipo == "Aporte":
-            val_atual = calculate_future_value(
-                t.valor, t.timestamp, taxa_efetiva, data_hoje
-            )
-            fator_crescimento = val_atual / t.valor if t.valor > 0 else 1.0
-
-            lotes.append(
-                {
-                    "id": t.id,
-                    "data": t.timestamp,
-                    "principal_restante": t.valor,
-                    "fator_crescimento": fator_crescimento,
-                }
-            )
-
-        elif t.tipo == "Saque":
-            valor_a_deduzir = t.valor
-            for lote in lotes:
-                if valor_a_deduzir <= 0.001:
-                    break
-
-                # Calcula valor bruto atual deste lote específico
-                valor_bruto_lote = (
-                    lote["principal_restante"] * lote["fator_crescimento"]
-                )
-                if valor_bruto_lote <= 0.001:
-                    continue  # Lote vazio
-
-                if valor_a_deduzir >= valor_bruto_lote:
-                    valor_a_deduzir -= valor_bruto_lote
-                    lote["principal_restante"] = 0.0
-                else:
-                    # Descobre quanto de principal precisa reduzir para atingir o valor bruto do saque
-                    principal_consumido = valor_a_deduzir / lote["fator_crescimento"]
-                    lote["principal_restante"] -= principal_consumido
-                    valor_a_deduzir = 0.0
+    lotes = lot_engine.EstadoLotes.from_lotes(get_lot_ledger(db, asset))
+    fator = lot_engine.fatores_atuais(lotes, get_curva(asset), data_hoje)
+    db.commit()  # Persiste o livro caso tenha sido construído agora
 
     # 2. Simula o Novo Saque sobre os lotes restantes
-    valor_restante_saque = valor_saque_bruto
-    total_iof = 0.0
-    total_ir = 0.0
-    total_lucro = 0.0
-    detalhes = []
-
-    is_isento = (
-        "LCI" in str(asset.nome).upper()
-        or "LCA" in str(asset.nome).upper()
-        or "ISENTO" in str(asset.nome).upper()
+    saque = lot_engine.simular_saque(
+        lotes, fator, valor_saque_bruto, data_hoje, is_ativo_isento(asset)
     )
-
-    for lote in lotes:
-        if valor_restante_saque <= 0.001:
-            break
-        if lote["principal_restante"] <= 0.001:
-            continue
-
-        valor_bruto_lote = lote["principal_restante"] * lote["fator_crescimento"]
-
-        if valor_restante_saque >= valor_bruto_lote:
-            # Consome lote inteiro
-            qtd_sacada = valor_bruto_lote
-            principal_sacado = lote["principal_restante"]
-        else:
-            # Consome parcial
-            qtd_sacada = valor_restante_saque
-            principal_sacado = qtd_sacada / lote["fator_crescimento"]
-
-        lucro = qtd_sacada - principal_sacado
-        if lucro < 0:
-            lucro = 0
-
-        dias = (data_hoje - lote["data"]).days
-
-        # Impostos
-        aliq_iof = TABELA_IOF.get(dias, 0) / 100.0 if dias < 30 else 0.0
-        val_iof = lucro * aliq_iof
-
-        base_ir = lucro - val_iof
-        aliq_ir = 0.0 if is_isento else get_aliquota_ir(dias)
-        val_ir = base_ir * aliq_ir
-
-        total_iof += val_iof
-        total_ir += val_ir
-        total_lucro += lucro
-        valor_restante_saque -= qtd_sacada
-
-        detalhes.append(
-            f"Lote {lote['data'].strftime('%d/%m/%Y')}: Sacado R$ {qtd_sacada:.2f} "
-            f"(Lucro R$ {lucro:.2f}, IR: {aliq_ir*100:.1f}%)"
+    total_iof = saque.total_iof
+    total_ir = saque.total_ir
+    total_lucro = saque.total_lucro
+
+    detalhes = [
+        f"Lote {data.item().strftime('%d/%m/%Y')}: Sacado R$ {qtd_sacada:.2f} "
+        f"(Lucro R$ {lucro:.2f}, IR: {aliq_ir*100:.1f}%)"
+        for data, qtd_sacada, lucro, aliq_ir in zip(
+            saque.datas, saque.valores_sacados, saque.lucros, saque.aliquotas_ir
         )
+    ]
 
     valor_liquido_final = valor_saque_bruto - total_iof - total_ir
 
@@ -459,32 +676,157 @@ def simulate_withdrawal_fifo(
     )
 
 
-def refresh_all_assets_prices(db: Session):
-    """Atualiza preços de mercado (RV) e recalcula juros (RF)."""
+# Parâmetros por cláusula IN (limite de variáveis do SQLite)
+_TAMANHO_LISTA_IN = 500
+
+
+def _lotes_renda_fixa(db: Session, assets) -> dict:
+    """
+    Lotes vivos de todos os ativos de Renda Fixa em uma única consulta,
+    agrupados por ativo_id. Ativos com Aportes e sem livro têm o livro construído.
+    """
+    lotes_por_ativo = defaultdict(list)
+    lotes = (
+        db.query(models.Lote)
+        .join(models.Ativo)
+        .filter(
+            models.Ativo.tipo_indexador.in_(["CDI", "PRE", "IPCA"]),
+            models.Lote.principal_restante > lot_engine.EPSILON_SAQUE,
+        )
+        .order_by(models.Lote.data.asc(), models.Lote.id.asc())
+        .all()
+    )
+    for lote in lotes:
+        lotes_por_ativo[lote.ativo_id].append(lote)
+
+    # Só ativos sem lote vivo podem estar sem livro: a verificação fica
+    # restrita a eles, sem varrer lotes e transações de todos os usuários
+    sem_lote_vivo = [a for a in assets if a.id not in lotes_por_ativo]
+    if not sem_lote_vivo:
+        return lotes_por_ativo
+    ids = [a.id for a in sem_lote_vivo]
+    com_livro, com_aporte = set(), set()
+    for i in range(0, len(ids), _TAMANHO_LISTA_IN):
+        bloco = ids[i : i + _TAMANHO_LISTA_IN]
+        com_livro.update(
+            a
+            for (a,) in db.query(models.Lote.ativo_id)
+            .filter(models.Lote.ativo_id.in_(bloco))
+            .distinct()
+        )
+        com_aporte.update(
+            a
+            for (a,) in db.query(models.Transacao.ativo_id)
+            .filter(
+                models.Transacao.ativo_id.in_(bloco),
+                models.Transacao.tipo == "Aporte",
+            )
+            .distinct()
+        )
+    for asset in sem_lote_vivo:
+        if asset.id in com_aporte and asset.id not in com_livro:
+            lotes_por_ativo[asset.id] = [
+                l
+                for l in rebuild_lot_ledger(db, asset)
+                if l.principal_restante > lot_engine.EPSILON_SAQUE
+            ]
+    return lotes_por_ativo
+
+
+def refresh_all_assets_prices(db: Session, forcar_cotacoes: bool = False):
+    """
+    Atualiza preços de mercado (RV) e recalcula juros (RF) em uma única transação.
+    As cotações vêm do cache (dentro do TTL não há rede); forcar_cotacoes=True
+    ignora o TTL, como na atualização agendada.
+    Retorna as linhas alteradas e o tempo (s) de cada fase.
+    """
+    tempos = {}
+    inicio = time.perf_counter()
     assets = db.query(models.Ativo).all()
-    count = 0
-    for asset in assets:
-        if asset.tipo_indexador in ["B3", "CRYPTO", "USA"] and asset.ticker:
-            preco = price_service.get_price(asset.ticker, asset.tipo_indexador)
-            if preco > 0:
-                qtd = calculate_asset_quantity(db, asset.id)
-                asset.valor_atual_bruto = round(qtd * preco, 2)
-                # Para RV simplificado, assumimos liquido = bruto na atualização de preço
-                asset.valor_liquido_estimado = asset.valor_atual_bruto
-                db.add(asset)
-                count += 1
-        elif asset.tipo_indexador in ["CDI", "PRE", "IPCA"]:
-            update_asset_balance(db, asset)
-            count += 1
+    renda_fixa = [a for a in assets if a.tipo_indexador in ["CDI", "PRE", "IPCA"]]
+
+    # Busca todas as cotações de uma vez (um lote por provedor)
+    precos = price_service.get_prices(
+        (
+            (a.ticker, a.tipo_indexador)
+            for a in assets
+            if a.tipo_indexador in ["B3", "CRYPTO", "USA"] and a.ticker
+        ),
+        forcar=forcar_cotacoes,
+    )
+    tempos["cotacoes"] = time.perf_counter() - inicio
+
+    # Renda Variável: um único UPDATE (executemany por ticker) de quantidade * preço,
+    # só nas linhas cujo valor muda
+    inicio = time.perf_counter()
+    cotados = [
+        {"b_ticker": ticker, "b_tipo": tipo, "b_preco": preco}
+        for (ticker, tipo), preco in precos.items()
+        if preco > 0
+    ]
+    alteradas_rv = 0
+    if cotados:
+        tabela = models.Ativo.__table__
+        quantidade = case(
+            (tabela.c.quantidade_atual > 0, tabela.c.quantidade_atual), else_=0.0
+        )
+        valor = func.round(quantidade * bindparam("b_preco"), 2)
+        resultado = db.execute(
+            update(tabela).where(
+                tabela.c.ticker == bindparam("b_ticker"),
+                tabela.c.tipo_indexador == bindparam("b_tipo"),
+                or_(
+                    tabela.c.valor_atual_bruto.is_distinct_from(valor),
+                    tabela.c.valor_liquido_estimado.is_distinct_from(valor),
+                ),
+            )
+            # Para RV simplificado, assumimos liquido = bruto na atualização de preço
+            .values(valor_atual_bruto=valor, valor_liquido_estimado=valor),
+            cotados,
+        )
+        alteradas_rv = max(resultado.rowcount, 0)
+    tempos["renda_variavel"] = time.perf_counter() - inicio
 
+    # Renda Fixa: lotes de todos os ativos em uma consulta, saldos em memória
+    inicio = time.perf_counter()
+    lotes_por_ativo = _lotes_renda_fixa(db, renda_fixa)
+    tempos["carga_lotes"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    data_hoje = datetime.now()
+    linhas = []
+    for asset in renda_fixa:
+        saldo = _calcular_saldo_renda_fixa(
+            asset, lotes_por_ativo.get(asset.id, []), data_hoje
+        )
+        if any(getattr(asset, campo) != valor for campo, valor in saldo.items()):
+            linhas.append({"id": asset.id, **saldo})
+    tempos["calculo_renda_fixa"] = time.perf_counter() - inicio
+
+    # Um UPDATE em lote e um único commit
+    inicio = time.perf_counter()
+    if linhas:
+        db.execute(update(models.Ativo), linhas)
     db.commit()
-    return {"message": f"Atualizados: {count}"}
+    tempos["gravacao"] = time.perf_counter() - inicio
+
+    count = len(renda_fixa) + sum(
+        1
+        for a in assets
+        if a.tipo_indexador in ["B3", "CRYPTO", "USA"]
+        and precos.get((a.ticker, a.tipo_indexador), 0.0) > 0
+    )
+    return {
+        "message": f"Atualizados: {count}",
+        "linhas_alteradas": alteradas_rv + len(linhas),
+        "tempos": {fase: round(seg, 4) for fase, seg in tempos.items()},
+    }
 
 
 def get_portfolio_history(db: Session, user_username: str):
     return (
-        db.query(models.Snapshot)
-        .filter(models.Snapshot.owner_id == user_username)
-        .order_by(models.Snapshot.timestamp.asc())
+        db.query(history_models.Snapshot)
+        .filter(history_models.Snapshot.owner_id == user_username)
+        .order_by(history_models.Snapshot.timestamp.asc())
         .all()
     )
@@ -0,0 +1,76 @@
+"""
+Tempo da grade de cenários da calculadora (POST /calculator/grid) contra uma
+chamada de calcular_projecao_rf por célula, como o front-end fazia para
+montar os gráficos de sensibilidade.
+
+Uso (a partir de backend/):
+    python benchmarks/calculator_grid.py [--taxas 50] [--aportes 50] [--prazos 10]
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.modules.calculator import service  # noqa: E402
+from app.modules.calculator.schemas import GradeInput  # noqa: E402
+
+AMOSTRA_POR_CELULA = 300
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--taxas", type=int, default=50)
+    parser.add_argument("--aportes", type=int, default=50)
+    parser.add_argument("--prazos", type=int, default=10)
+    args = parser.parse_args()
+
+    grade = GradeInput(
+        valor_inicial=10_000.0,
+        taxas_anuais={"inicio": 5, "fim": 15, "quantidade": args.taxas},
+        aportes_mensais={"inicio": 0, "fim": 5_000, "quantidade": args.aportes},
+        prazos_meses={"inicio": 12, "fim": 360, "quantidade": args.prazos},
+        isento_ir=[False, True],
+    )
+
+    inicio = time.perf_counter()
+    resultado = service.simular_grade(grade)
+    duracao_grade = time.perf_counter() - inicio
+
+    eixos = (
+        resultado.taxas_anuais,
+        resultado.aportes_mensais,
+        resultado.prazos_meses,
+        resultado.isento_ir,
+    )
+    celulas = [
+        (t, a, p, k)
+        for t in range(len(eixos[0]))
+        for a in range(len(eixos[1]))
+        for p in range(len(eixos[2]))
+        for k in range(len(eixos[3]))
+    ]
+    amostra = random.Random(0).sample(celulas, min(AMOSTRA_POR_CELULA, len(celulas)))
+    inicio = time.perf_counter()
+    for t, a, p, k in amostra:
+        valor = service.calcular_projecao_rf(
+            grade.valor_inicial, eixos[1][a], eixos[2][p], eixos[0][t], eixos[3][k]
+        ).valor_liquido
+        assert valor == resultado.valor_liquido[t][a][p][k], (t, a, p, k)
+    por_celula = (time.perf_counter() - inicio) / len(amostra)
+
+    print(f"grade {args.taxas}x{args.aportes}x{args.prazos}x2 = {len(celulas)} células")
+    print(f"simular_grade: {duracao_grade * 1000:8.1f} ms")
+    print(
+        f"uma projeção por célula: {por_celula * 1000:.3f} ms/célula "
+        f"(~{por_celula * len(celulas):.1f}s para a grade; "
+        f"{len(amostra)} células conferidas, idênticas)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tempo das projeções da calculadora: soma mês a mês com um DadosMes por mês
+(implementação anterior de calcular_projecao_rf) contra o motor vetorizado
+(app/modules/calculator/projection_engine.py), que deve dar o mesmo
+resultado ao centavo.
+
+Uso (a partir de backend/):
+    python benchmarks/calculator_projection.py [--anos 50] [--repeticoes 200]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import timeit
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.modules.calculator import projection_engine, service  # noqa: E402
+from app.modules.calculator.schemas import DadosMes, ResultadoSimulacao  # noqa: E402
+
+
+def calcular_projecao_rf_mes_a_mes(
+    valor_inicial: float,
+    aporte_mensal: float,
+    periodo_meses: int,
+    taxa_juros_anual: float,
+    isento_ir: bool = False,
+) -> ResultadoSimulacao:
+    """calcular_projecao_rf antes do motor vetorizado."""
+    taxa_juros_mensal = (1 + taxa_juros_anual / 100) ** (1 / 12) - 1
+    patrimonio_atual = valor_inicial
+    total_investido = valor_inicial
+    dados_projecao = [
+        {
+            "mes": 0,
+            "patrimonio_bruto": round(patrimonio_atual, 2),
+            "total_investido": round(total_investido, 2),
+            "patrimonio_liquido": round(patrimonio_atual, 2),
+            "rendimento_mes": 0.0,
+        }
+    ]
+    for mes in range(1, periodo_meses + 1):
+        juros_mes = patrimonio_atual * taxa_juros_mensal
+        patrimonio_atual += juros_mes
+        patrimonio_atual += aporte_mensal
+        total_investido += aporte_mensal
+
+        lucro_bruto = patrimonio_atual - total_investido
+        imposto_pago = 0.0
+        if not isento_ir and lucro_bruto > 0:
+            imposto_pago = lucro_bruto * service.get_ir_rate(mes * 30)
+
+        dados_projecao.append(
+            {
+                "mes": mes,
+                "patrimonio_bruto": round(patrimonio_atual, 2),
+                "patrimonio_liquido": round(patrimonio_atual - imposto_pago, 2),
+                "total_investido": round(total_investido, 2),
+                "rendimento_mes": round(juros_mes, 2),
+            }
+        )
+
+    lucro_bruto = patrimonio_atual - total_investido
+    imposto_final = (
+        lucro_bruto * service.get_ir_rate(periodo_meses * 30)
+        if not isento_ir and lucro_bruto > 0
+        else 0.0
+    )
+    return ResultadoSimulacao(
+        valor_bruto=round(patrimonio_atual, 2),
+        total_investido=round(total_investido, 2),
+        lucro_bruto=round(lucro_bruto, 2),
+        imposto_pago=round(imposto_final, 2),
+        valor_liquido=round(patrimonio_atual - imposto_final, 2),
+        tipo="Isento" if isento_ir else "Tributável",
+        projecao_mensal=[DadosMes(**d) for d in dados_projecao],
+    )
+
+
+def _medir(funcao, repeticoes: int) -> float:
+    """Melhor tempo por chamada, em milissegundos."""
+    return min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--anos", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    cenario = (10_000.0, 1_500.0, args.anos * 12, 11.5, False)
+    anterior = calcular_projecao_rf_mes_a_mes(*cenario)
+    atual = service.calcular_projecao_rf(*cenario)
+    assert atual.model_dump() == anterior.model_dump(), "resultados divergentes"
+
+    print(f"projeção de {args.anos} anos ({cenario[2]} meses), resultados idênticos")
+    tempos = {
+        "mês a mês (anterior)": _medir(
+            lambda: calcular_projecao_rf_mes_a_mes(*cenario), args.repeticoes
+        ),
+        "calcular_projecao_rf": _medir(
+            lambda: service.calcular_projecao_rf(*cenario), args.repeticoes
+        ),
+        "só o motor (serie_mensal)": _medir(
+            lambda: projection_engine.serie_mensal(*cenario), args.repeticoes
+        ),
+    }
+    base = tempos["mês a mês (anterior)"]
+    for nome, ms in tempos.items():
+        print(f"{nome:>26}: {ms:8.3f} ms  ({base / ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
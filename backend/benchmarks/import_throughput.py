@@ -0,0 +1,128 @@
+"""
+Vazão da importação em lote (app/modules/investments/importer.py).
+
+Gera um extrato CSV com --anos anos de movimentações diárias em quatro
+ativos (Renda Fixa e Renda Variável), importa em um banco novo e compara
+com a criação uma a uma (service.create_transaction, o que POST
+/transactions faz por linha) sobre as primeiras --amostra linhas.
+
+Uso (a partir de backend/):
+    python benchmarks/import_throughput.py [--anos 5] [--amostra 500]
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+ATIVOS = [
+    ("CDB Pré", "PRE", 12.5, None),
+    ("LCI Pré", "PRE", 10.0, None),
+    ("PETR4", "B3", 0.0, "PETR4"),
+    ("VALE3", "B3", 0.0, "VALE3"),
+]
+
+
+def _linhas(anos: int, semente: int = 0) -> list:
+    """(índice do ativo, tipo, valor, quantidade, data) de cada dia útil."""
+    rnd = random.Random(semente)
+    data, fim = datetime(2020, 1, 2, 10), datetime(2020 + anos, 1, 2)
+    linhas = []
+    while data < fim:
+        if data.weekday() < 5:
+            for i in range(len(ATIVOS)):
+                tipo = "Aporte" if rnd.random() < 0.8 else "Saque"
+                valor = round(rnd.uniform(10, 500), 2)
+                linhas.append((i, tipo, valor, rnd.randint(1, 5), data))
+        data += timedelta(days=1)
+    return linhas
+
+
+def _criar_usuario(db, username: str) -> list:
+    from app.modules.auth.models import User
+    from app.modules.investments import models
+
+    db.add(User(username=username, hashed_password="x"))
+    ativos = [
+        models.Ativo(
+            owner_id=username,
+            nome=nome,
+            tipo_indexador=indexador,
+            valor_taxa=taxa,
+            ticker=ticker,
+        )
+        for nome, indexador, taxa, ticker in ATIVOS
+    ]
+    db.add_all(ativos)
+    db.commit()
+    return [a.id for a in ativos]
+
+
+def executar(anos: int, amostra: int):
+    sys.path.insert(0, str(BACKEND_DIR))
+    import app.main  # noqa: F401  cria as tabelas
+    from app.db.session import SessionLocal
+    from app.modules.investments import importer, schemas, service
+
+    linhas = _linhas(anos)
+    db = SessionLocal()
+
+    ids = _criar_usuario(db, "importacao")
+    csv = "ativo_id;tipo;valor;quantidade;timestamp\n" + "".join(
+        f"{ids[i]};{tipo};{str(valor).replace('.', ',')};{qtd};{data:%d/%m/%Y %H:%M}\n"
+        for i, tipo, valor, qtd, data in linhas
+    )
+    inicio = time.perf_counter()
+    relatorio, _ = importer.importar_transacoes(
+        db, "importacao", io.StringIO(csv), "csv"
+    )
+    duracao_lote = time.perf_counter() - inicio
+
+    ids = _criar_usuario(db, "sequencial")
+    inicio = time.perf_counter()
+    for i, tipo, valor, qtd, data in linhas[:amostra]:
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=ids[i], tipo=tipo, valor=valor, quantidade=qtd, timestamp=data
+            ),
+        )
+    duracao_sequencial = time.perf_counter() - inicio
+    db.close()
+
+    por_linha = duracao_sequencial / min(amostra, len(linhas))
+    print(f"{anos} anos, {len(linhas)} linhas, {len(ATIVOS)} ativos")
+    print(
+        f"importação em lote: {duracao_lote:6.2f}s "
+        f"({relatorio['linhas_importadas'] / duracao_lote:,.0f} linhas/s, "
+        f"{relatorio['total_erros']} erros)"
+    )
+    print(
+        f"uma a uma ({amostra} linhas): {duracao_sequencial:6.2f}s "
+        f"({1 / por_linha:,.0f} linhas/s; ~{por_linha * len(linhas):,.0f}s "
+        f"para o extrato todo, sem contar a reconstrução do histórico por linha)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--anos", type=int, default=5)
+    parser.add_argument("--amostra", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # O engine é criado na importação da aplicação: o banco vem do ambiente
+        os.environ["DATABASE_URL"] = f"sqlite:///{diretorio}/benchmark.db"
+        os.environ["ASYNC_DATABASE_URL"] = ""
+        executar(args.anos, args.amostra)
+
+
+if __name__ == "__main__":
+    main()
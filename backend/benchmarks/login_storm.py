@@ -0,0 +1,148 @@
+"""
+Latência do dashboard durante uma tempestade de logins.
+
+Sobe a API (uvicorn, banco novo em diretório temporário) e mede GET
+/investments/assets de um usuário já autenticado em repouso e enquanto
+--logins usuários fazem login ao mesmo tempo. Com o bcrypt no executor
+limitado (app/core/security.PasswordHasher), a latência do dashboard deve
+ficar estável; os logins excedentes recebem 503 em vez de ocupar o
+threadpool das rotas síncronas.
+
+Por padrão usa as rotas síncronas (ASYNC_DB_ROUTES=false), que dividem o
+threadpool com o login.
+
+Uso (a partir de backend/):
+    python benchmarks/login_storm.py [--logins 120] [--segundos 6]
+"""
+
+from pathlib import Path
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SENHA = "benchmark"
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _aguardar(url: str, processo: subprocess.Popen, limite: float = 30.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError("uvicorn encerrou durante a inicialização")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn não respondeu a tempo")
+
+
+def _percentis(latencias) -> str:
+    ordenadas = sorted(latencias)
+    p95 = ordenadas[int(len(ordenadas) * 0.95)]
+    return (
+        f"p50 {statistics.median(ordenadas) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  max {ordenadas[-1] * 1000:7.1f} ms  "
+        f"({len(ordenadas)} requests)"
+    )
+
+
+def medir(base_url: str, logins: int, segundos: float):
+    cliente = httpx.Client(base_url=base_url, timeout=300)
+    for i in range(logins + 1):
+        cliente.post(
+            "/api/v1/auth/register", json={"username": f"u{i}", "password": SENHA}
+        )
+    token = cliente.post(
+        "/api/v1/auth/token", data={"username": "u0", "password": SENHA}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def dashboard(duracao: float) -> list:
+        latencias = []
+        fim = time.monotonic() + duracao
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            resposta = cliente.get("/api/v1/investments/assets", headers=headers)
+            latencias.append(time.perf_counter() - inicio)
+            resposta.raise_for_status()
+            time.sleep(0.02)
+        return latencias
+
+    repouso = dashboard(segundos / 2)
+
+    status = []
+
+    def login(i: int):
+        with httpx.Client(base_url=base_url, timeout=300) as c:
+            resposta = c.post(
+                "/api/v1/auth/token", data={"username": f"u{i}", "password": SENHA}
+            )
+            status.append(resposta.status_code)
+
+    threads = [threading.Thread(target=login, args=(i,)) for i in range(1, logins + 1)]
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    tempestade = dashboard(segundos)
+    for t in threads:
+        t.join()
+    duracao = time.monotonic() - inicio
+
+    print(f"repouso:    {_percentis(repouso)}")
+    print(f"tempestade: {_percentis(tempestade)}")
+    contagem = {codigo: status.count(codigo) for codigo in sorted(set(status))}
+    print(f"logins: {contagem} em {duracao:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=120)
+    parser.add_argument("--segundos", type=float, default=6.0)
+    parser.add_argument(
+        "--async-routes", action="store_true", help="usa ASYNC_DB_ROUTES=true"
+    )
+    args = parser.parse_args()
+
+    porta = _porta_livre()
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{diretorio}/benchmark.db",
+            ASYNC_DATABASE_URL="",
+            ASYNC_DB_ROUTES="true" if args.async_routes else "false",
+            # Acima do número de logins simultâneos: o limite aqui é o do hasher
+            LOGIN_MAX_ATTEMPTS=str(args.logins + 1),
+        )
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta)],
+            cwd=BACKEND_DIR,
+            env=ambiente,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{porta}"
+            _aguardar(base_url + "/", processo)
+            medir(base_url, args.logins, args.segundos)
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    main()
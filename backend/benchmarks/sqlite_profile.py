@@ -0,0 +1,140 @@
+"""
+Benchmark de leitura/escrita concorrente no SQLite com os perfis de engine
+"basic" e "tuned" (Settings.SQLITE_PROFILE, ver app/db/session.py).
+
+Cada perfil roda em um processo próprio (o engine é criado na importação),
+sobre um banco novo em um diretório temporário: threads escritoras gravam
+snapshots com commit a cada linha enquanto threads leitoras consultam os
+últimos snapshots do usuário. Reporta operações por segundo e erros
+("database is locked").
+
+Uso (a partir de backend/):
+    python benchmarks/sqlite_profile.py [--segundos 5] [--escritores 8] [--leitores 8]
+"""
+
+from pathlib import Path
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PERFIS = ("basic", "tuned")
+USUARIO = "benchmark"
+
+
+def executar_perfil(segundos: float, escritores: int, leitores: int) -> dict:
+    """Roda a carga no processo atual, com o perfil definido pelo ambiente."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import app.main  # noqa: F401  cria as tabelas
+    from app.db.session import SessionLocal, engine
+    from app.modules.auth.models import User
+    from app.modules.history.models import Snapshot
+
+    db = SessionLocal()
+    db.add(User(username=USUARIO, hashed_password="x"))
+    db.commit()
+    db.close()
+
+    contagem = {"escritas": 0, "leituras": 0, "erros": 0}
+    trava = threading.Lock()
+    fim = time.monotonic() + segundos
+
+    def escrever(db):
+        db.add(Snapshot(owner_id=USUARIO, valor_total_bruto=random.random()))
+        db.commit()
+        return "escritas"
+
+    def ler(db):
+        (
+            db.query(Snapshot)
+            .filter(Snapshot.owner_id == USUARIO)
+            .order_by(Snapshot.timestamp.desc())
+            .limit(50)
+            .all()
+        )
+        return "leituras"
+
+    def laco(operacao):
+        while time.monotonic() < fim:
+            db = SessionLocal()
+            try:
+                chave = operacao(db)
+            except Exception:
+                db.rollback()
+                chave = "erros"
+            finally:
+                db.close()
+            with trava:
+                contagem[chave] += 1
+
+    threads = [
+        threading.Thread(target=laco, args=(escrever,)) for _ in range(escritores)
+    ]
+    threads += [threading.Thread(target=laco, args=(ler,)) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "escritas_por_segundo": round(contagem["escritas"] / segundos, 1),
+        "leituras_por_segundo": round(contagem["leituras"] / segundos, 1),
+        "erros": contagem["erros"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--perfil", choices=PERFIS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        # Processo filho: perfil e banco já vêm no ambiente
+        print(
+            json.dumps(executar_perfil(args.segundos, args.escritores, args.leitores))
+        )
+        return
+
+    print(
+        f"{args.escritores} escritores + {args.leitores} leitores, "
+        f"{args.segundos:.0f}s por perfil"
+    )
+    for perfil in PERFIS:
+        with tempfile.TemporaryDirectory() as diretorio:
+            ambiente = dict(
+                os.environ,
+                SQLITE_PROFILE=perfil,
+                DATABASE_URL=f"sqlite:///{diretorio}/benchmark.db",
+                ASYNC_DATABASE_URL="",
+            )
+            saida = subprocess.run(
+                [sys.executable, __file__, "--perfil", perfil]
+                + ["--segundos", str(args.segundos)]
+                + ["--escritores", str(args.escritores)]
+                + ["--leitores", str(args.leitores)],
+                env=ambiente,
+                cwd=BACKEND_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+        print(
+            f"{perfil:>6}: {resultado['escritas_por_segundo']:>8} escritas/s "
+            f"{resultado['leituras_por_segundo']:>8} leituras/s "
+            f"{resultado['erros']:>5} erros"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Configuração comum dos testes: banco SQLite temporário (criado antes de
+importar a aplicação, que lê DATABASE_URL na importação) e sessão por teste.
+"""
+
+import os
+import tempfile
+import uuid
+
+_DIRETORIO = tempfile.mkdtemp(prefix="pfm-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DIRETORIO}/testes.db"
+os.environ["ASYNC_DATABASE_URL"] = ""
+
+import pytest  # noqa: E402
+
+import app.main  # noqa: E402,F401  registra todos os modelos
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.rollback()
+        sessao.close()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    # Sem o bloco `with`: o lifespan (agendador, séries do BCB) não é executado
+    return TestClient(app.main.app)
+
+
+@pytest.fixture
+def usuario(db):
+    """Usuário de teste com um token válido; removido do cache ao final."""
+    from app.core.security import create_access_token
+    from app.modules.auth.models import User
+    from app.modules.auth.user_cache import user_cache
+
+    username = f"teste-{uuid.uuid4().hex[:8]}"
+    db.add(User(username=username, hashed_password="x"))
+    db.commit()
+    yield username, {"Authorization": f"Bearer {create_access_token(username)}"}
+    user_cache.invalidate(username)
@@ -0,0 +1,107 @@
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.core.security import pwd_context
+from app.modules.auth import throttle
+from app.modules.auth.models import User
+from app.modules.auth.throttle import LoginThrottle, login_throttle
+
+URL = "/api/v1/auth/token"
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(throttle.time, "monotonic", relogio)
+    return relogio
+
+
+def test_throttle_recusa_depois_do_limite_e_libera_ao_fim_da_janela(relogio):
+    limite = LoginThrottle(max_tentativas=3, janela_segundos=60)
+
+    assert [limite.permitir("ana") for _ in range(4)] == [True, True, True, False]
+    assert limite.permitir("bia")  # o limite é por username
+    assert limite.stats()["recusadas"] == 1
+
+    relogio.agora += 59
+    assert not limite.permitir("ana")
+    relogio.agora += 1
+    assert limite.permitir("ana")
+
+
+def test_throttle_limpar_zera_as_tentativas(relogio):
+    limite = LoginThrottle(max_tentativas=2, janela_segundos=60)
+    limite.permitir("ana")
+    limite.permitir("ana")
+    assert not limite.permitir("ana")
+
+    limite.limpar("ana")
+    assert limite.permitir("ana")
+
+
+def test_throttle_descarta_os_usuarios_menos_recentes(relogio):
+    limite = LoginThrottle(max_tentativas=1, janela_segundos=60, max_usuarios=2)
+    for username in ("ana", "bia", "caio"):
+        assert limite.permitir(username)
+
+    assert limite.stats()["usuarios"] == 2
+    assert limite.permitir("ana")  # "ana" foi descartada, o contador recomeça
+    assert not limite.permitir("caio")
+
+
+def _usuario_com_senha(db, senha, rounds):
+    """Usuário cuja senha foi gravada com `rounds` (barato e fora do custo atual)."""
+    username = f"login-{uuid.uuid4().hex[:8]}"
+    hashed = pwd_context.handler("bcrypt").using(rounds=rounds).hash(senha)
+    db.add(User(username=username, hashed_password=hashed))
+    db.commit()
+    return username
+
+
+def _login(client, username, senha):
+    return client.post(URL, data={"username": username, "password": senha})
+
+
+def test_login_bloqueia_apos_tentativas_e_sucesso_zera_o_contador(db, client):
+    username = _usuario_com_senha(db, "correta", 4)
+    try:
+        for _ in range(settings.LOGIN_MAX_ATTEMPTS - 1):
+            assert _login(client, username, "errada").status_code == 401
+        assert _login(client, username, "correta").status_code == 200
+
+        # Depois do sucesso a janela recomeça do zero
+        for _ in range(settings.LOGIN_MAX_ATTEMPTS):
+            assert _login(client, username, "errada").status_code == 401
+        resposta = _login(client, username, "correta")
+        assert resposta.status_code == 429
+        assert resposta.headers["Retry-After"] == str(
+            settings.LOGIN_ATTEMPT_WINDOW_SECONDS
+        )
+    finally:
+        login_throttle.limpar(username)
+
+
+def test_login_regrava_o_hash_gerado_com_outro_custo(db, client):
+    username = _usuario_com_senha(db, "segredo", 4)
+    antigo = db.get(User, username).hashed_password
+    assert pwd_context.needs_update(antigo)
+
+    assert _login(client, username, "segredo").status_code == 200
+
+    db.expire_all()
+    novo = db.get(User, username).hashed_password
+    assert novo != antigo
+    assert f"${settings.PASSWORD_HASH_ROUNDS:02d}$" in novo
+    assert not pwd_context.needs_update(novo)
+    assert pwd_context.verify("segredo", novo)
+    login_throttle.limpar(username)
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.core import business_days
+from app.core.business_days import dias_uteis
+
+
+def _dias_uteis_referencia(inicio: date, fim: date) -> int:
+    """Contagem dia a dia em [inicio, fim) com a lista de feriados do ano."""
+    dias = 0
+    d = inicio
+    while d < fim:
+        if d.weekday() < 5 and d not in business_days.feriados(d.year):
+            dias += 1
+        d += timedelta(days=1)
+    return dias
+
+
+@pytest.mark.parametrize(
+    "inicio, fim, esperado",
+    [
+        # Carnaval 2024 (segunda 12/02 e terça 13/02)
+        (date(2024, 2, 9), date(2024, 2, 14), 1),
+        (date(2024, 2, 12), date(2024, 2, 14), 0),
+        (date(2024, 2, 13), date(2024, 2, 15), 1),
+        # Sexta-feira Santa 2024 (29/03)
+        (date(2024, 3, 28), date(2024, 4, 1), 1),
+        (date(2024, 3, 28), date(2024, 4, 2), 2),
+        # Intervalo começando no feriado (01/01) e terminando (exclusivo) no Natal
+        (date(2025, 1, 1), date(2025, 1, 3), 1),
+        (date(2024, 12, 24), date(2024, 12, 25), 1),
+        (date(2024, 12, 24), date(2024, 12, 26), 1),
+        # Corpus Christi 2025 (19/06)
+        (date(2025, 6, 18), date(2025, 6, 23), 2),
+        # Virada de ano: 31/12 é dia útil, 01/01 não
+        (date(2024, 12, 31), date(2025, 1, 2), 1),
+    ],
+)
+def test_dias_uteis_nas_bordas_dos_feriados(inicio, fim, esperado):
+    assert int(dias_uteis(inicio, fim)) == esperado
+    assert _dias_uteis_referencia(inicio, fim) == esperado
+
+
+def test_consciencia_negra_so_e_feriado_a_partir_de_2024():
+    assert business_days.calendario.is_dia_util(date(2023, 11, 20))
+    assert not business_days.calendario.is_dia_util(date(2024, 11, 20))
+
+
+def test_intervalo_invertido_e_negativo():
+    assert int(dias_uteis(date(2024, 2, 14), date(2024, 2, 9))) == -1
+
+
+def test_vetorizado_igual_a_contagem_dia_a_dia():
+    rng = np.random.default_rng(0)
+    base = date(2023, 1, 1)
+    inicios = [base + timedelta(days=int(d)) for d in rng.integers(0, 730, 200)]
+    fins = [
+        i + timedelta(days=int(d)) for i, d in zip(inicios, rng.integers(0, 90, 200))
+    ]
+
+    contagens = dias_uteis(
+        np.array(inicios, dtype="datetime64[D]"), np.array(fins, dtype="datetime64[D]")
+    )
+    assert contagens.tolist() == [
+        _dias_uteis_referencia(i, f) for i, f in zip(inicios, fins)
+    ]
+
+
+def test_datas_fora_do_calendario_pre_computado():
+    # Natal de 1990 fora do intervalo pré-computado: cai no np.busday_count
+    inicio, fim = date(1990, 12, 24), date(1990, 12, 27)
+    assert int(dias_uteis(inicio, fim)) == 2
+    assert _dias_uteis_referencia(inicio, fim) == 2
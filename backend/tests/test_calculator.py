@@ -0,0 +1,173 @@
+import random
+
+import pytest
+
+from app.modules.calculator import service
+
+
+def _projecao_mes_a_mes(
+    valor_inicial, aporte_mensal, periodo_meses, taxa_juros_anual, isento_ir
+):
+    """Referência: a soma mês a mês que o motor vetorizado substituiu."""
+    taxa_juros_mensal = (1 + taxa_juros_anual / 100) ** (1 / 12) - 1
+    patrimonio_atual = valor_inicial
+    total_investido = valor_inicial
+    meses = [
+        {
+            "mes": 0,
+            "patrimonio_bruto": round(patrimonio_atual, 2),
+            "patrimonio_liquido": round(patrimonio_atual, 2),
+            "total_investido": round(total_investido, 2),
+            "rendimento_mes": 0.0,
+        }
+    ]
+    for mes in range(1, periodo_meses + 1):
+        juros_mes = patrimonio_atual * taxa_juros_mensal
+        patrimonio_atual += juros_mes
+        patrimonio_atual += aporte_mensal
+        total_investido += aporte_mensal
+        lucro_bruto = patrimonio_atual - total_investido
+        imposto_pago = 0.0
+        if not isento_ir and lucro_bruto > 0:
+            imposto_pago = lucro_bruto * service.get_ir_rate(mes * 30)
+        meses.append(
+            {
+                "mes": mes,
+                "patrimonio_bruto": round(patrimonio_atual, 2),
+                "patrimonio_liquido": round(patrimonio_atual - imposto_pago, 2),
+                "total_investido": round(total_investido, 2),
+                "rendimento_mes": round(juros_mes, 2),
+            }
+        )
+
+    lucro_bruto = patrimonio_atual - total_investido
+    imposto_final = (
+        lucro_bruto * service.get_ir_rate(periodo_meses * 30)
+        if not isento_ir and lucro_bruto > 0
+        else 0.0
+    )
+    return {
+        "valor_bruto": round(patrimonio_atual, 2),
+        "total_investido": round(total_investido, 2),
+        "lucro_bruto": round(lucro_bruto, 2),
+        "imposto_pago": round(imposto_final, 2),
+        "valor_liquido": round(patrimonio_atual - imposto_final, 2),
+        "tipo": "Isento" if isento_ir else "Tributável",
+        "projecao_mensal": meses,
+    }
+
+
+def _cenarios(n, semente=1):
+    rnd = random.Random(semente)
+    for _ in range(n):
+        yield (
+            round(rnd.uniform(0, 1e6), 2),
+            round(rnd.uniform(0, 1e4), 2),
+            rnd.randint(0, 600),
+            round(rnd.choice([0.0, rnd.uniform(-5, 40)]), 2),
+            rnd.random() < 0.3,
+        )
+
+
+@pytest.mark.parametrize(
+    "cenario",
+    [
+        (1000.0, 100.0, 12, 10.0, False),
+        (0.0, 500.0, 600, 12.0, False),
+        (50_000.0, 0.0, 360, 0.0, False),
+        (10_000.0, 1_000.0, 120, -3.0, False),
+        (10_000.0, 1_000.0, 0, 10.0, True),
+        (1_234.56, 789.01, 181, 13.75, True),
+    ],
+)
+def test_projecao_igual_a_soma_mes_a_mes(cenario):
+    resultado = service.calcular_projecao_rf(*cenario).model_dump()
+    assert resultado == _projecao_mes_a_mes(*cenario)
+
+
+def test_projecao_igual_a_soma_mes_a_mes_em_cenarios_aleatorios():
+    divergentes = [
+        cenario
+        for cenario in _cenarios(1_000)
+        if service.calcular_projecao_rf(*cenario).model_dump()
+        != _projecao_mes_a_mes(*cenario)
+    ]
+    assert divergentes == []
+
+
+def test_grade_igual_a_projecao_de_cada_celula():
+    from app.modules.calculator.schemas import GradeInput
+
+    grade = GradeInput(
+        valor_inicial=5_000.0,
+        taxas_anuais=[0.0, 6.5, 13.75],
+        aportes_mensais={"inicio": 0, "fim": 2_000, "quantidade": 3},
+        prazos_meses=[0, 6, 181, 360],
+        isento_ir=[False, True],
+        series=[{"taxa": 2, "aporte": 1, "prazo": 3, "isento": 0}],
+    )
+
+    resultado = service.simular_grade(grade)
+
+    assert resultado.aportes_mensais == [0.0, 1_000.0, 2_000.0]
+    for t, taxa in enumerate(resultado.taxas_anuais):
+        for a, aporte in enumerate(resultado.aportes_mensais):
+            for p, prazo in enumerate(resultado.prazos_meses):
+                for k, isento in enumerate(resultado.isento_ir):
+                    esperado = _projecao_mes_a_mes(5_000.0, aporte, prazo, taxa, isento)
+                    assert (
+                        resultado.valor_liquido[t][a][p][k] == esperado["valor_liquido"]
+                    )
+    (serie,) = resultado.series
+    assert serie.resultado.model_dump() == _projecao_mes_a_mes(
+        5_000.0, 1_000.0, 360, 13.75, False
+    )
+
+
+def test_grade_50x50x10_pela_rota(client):
+    resposta = client.post(
+        "/api/v1/calculator/grid",
+        json={
+            "valor_inicial": 10_000,
+            "taxas_anuais": {"inicio": 5, "fim": 15, "quantidade": 50},
+            "aportes_mensais": {"inicio": 0, "fim": 5_000, "quantidade": 50},
+            "prazos_meses": {"inicio": 12, "fim": 360, "quantidade": 10},
+            "isento_ir": [False, True],
+        },
+    )
+
+    assert resposta.status_code == 200
+    valor_liquido = resposta.json()["valor_liquido"]
+    assert (len(valor_liquido), len(valor_liquido[0]), len(valor_liquido[0][0])) == (
+        50,
+        50,
+        10,
+    )
+    assert len(valor_liquido[0][0][0]) == 2
+
+
+@pytest.mark.parametrize(
+    "corpo",
+    [
+        # Acima de CALCULATOR_GRID_MAX_CELLS
+        {
+            "taxas_anuais": {"inicio": 1, "fim": 20, "quantidade": 1_000},
+            "aportes_mensais": {"inicio": 0, "fim": 1_000, "quantidade": 1_000},
+            "prazos_meses": [12],
+        },
+        # Célula fora da grade
+        {
+            "taxas_anuais": [10],
+            "aportes_mensais": [100],
+            "prazos_meses": [12],
+            "series": [{"taxa": 1, "aporte": 0, "prazo": 0}],
+        },
+        # Eixo vazio
+        {"taxas_anuais": [], "aportes_mensais": [100], "prazos_meses": [12]},
+    ],
+)
+def test_grade_invalida_retorna_400(client, corpo):
+    resposta = client.post(
+        "/api/v1/calculator/grid", json={"valor_inicial": 1_000, **corpo}
+    )
+    assert resposta.status_code == 400
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.session import Base
+from app.modules.investments.cdi_provider import (
+    TAXA_FALLBACK,
+    CdiRateProvider,
+    TaxaCdi,
+)
+
+
+@pytest.fixture
+def sessoes():
+    """Banco em memória só para a taxa persistida (isolado dos demais testes)."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _falha():
+    return None
+
+
+def _bcb(taxa, referencia=date(2025, 6, 18)):
+    return lambda: TaxaCdi(taxa, referencia, datetime(2025, 6, 18, 20, 0))
+
+
+def test_sem_taxa_persistida_usa_o_fallback(sessoes):
+    provider = CdiRateProvider(fetcher=_falha, session_factory=sessoes)
+
+    assert provider.refresh() is False
+    assert provider.get() == TaxaCdi(TAXA_FALLBACK, None)
+
+
+def test_falha_da_fonte_apos_restart_usa_a_ultima_taxa_persistida(sessoes):
+    CdiRateProvider(fetcher=_bcb(14.9), session_factory=sessoes).refresh()
+
+    # Novo processo: a fonte falha, vale a taxa gravada (não o fallback)
+    provider = CdiRateProvider(fetcher=_falha, session_factory=sessoes)
+    assert provider.refresh() is False
+    atual = provider.get()
+    assert atual.taxa == 14.9
+    assert atual.data_referencia == date(2025, 6, 18)
+
+
+def test_taxa_invalida_da_fonte_mantem_a_atual(sessoes):
+    CdiRateProvider(fetcher=_bcb(14.9), session_factory=sessoes).refresh()
+    provider = CdiRateProvider(fetcher=_bcb(0.0), session_factory=sessoes)
+
+    assert provider.refresh() is False
+    assert provider.taxa == 14.9
+
+
+def test_load_nao_sobrescreve_taxa_ja_atualizada_da_fonte(sessoes):
+    provider = CdiRateProvider(fetcher=_bcb(15.0), session_factory=sessoes)
+    provider.refresh()
+
+    # Outra thread grava uma taxa mais antiga; load() não a usa
+    CdiRateProvider(
+        fetcher=_bcb(10.0, date(2024, 1, 1)), session_factory=sessoes
+    ).refresh()
+    assert provider.load().taxa == 15.0
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+
+@pytest.mark.skipif(
+    settings.SQLITE_PROFILE != "tuned", reason="pragmas só no perfil tuned"
+)
+def test_perfil_tuned_aplica_os_pragmas_em_cada_conexao():
+    with engine.connect() as conn:
+
+        def pragma(nome):
+            return conn.execute(text(f"PRAGMA {nome}")).scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert pragma("cache_size") == -settings.SQLITE_CACHE_SIZE_KB
+        assert (
+            pragma("synchronous")
+            == {"OFF": 0, "NORMAL": 1, "FULL": 2}[settings.SQLITE_SYNCHRONOUS]
+        )
@@ -0,0 +1,99 @@
+import csv
+import io
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core import export
+from app.modules.auth.models import User
+from app.modules.investments import models, service
+
+
+def _usuario_com_transacoes(db, username, n):
+    db.add(User(username=username, hashed_password="x"))
+    ativo = models.Ativo(owner_id=username, nome="CDB", tipo_indexador="PRE")
+    db.add(ativo)
+    db.flush()
+    inicio = datetime(2020, 1, 1)
+    db.execute(
+        insert(models.Transacao),
+        [
+            {
+                "ativo_id": ativo.id,
+                "tipo": "Aporte",
+                "valor": 100.0 + i,
+                "quantidade": 0.0,
+                "timestamp": inicio + timedelta(minutes=i),
+            }
+            for i in range(n)
+        ],
+    )
+    db.commit()
+
+
+def _pico_exportacao(username):
+    """Pico de memória (bytes) para gerar todo o CSV das transações do usuário."""
+    consulta = service.export_transactions_query(username)
+    tracemalloc.start()
+    try:
+        total = 0
+        for bloco in export.csv_em_blocos(
+            service.COLUNAS_EXPORTACAO_TRANSACOES, export.ler_linhas(consulta), 1000
+        ):
+            total += len(bloco)
+        return tracemalloc.get_traced_memory()[1], total
+    finally:
+        tracemalloc.stop()
+
+
+def test_exportacao_csv_em_memoria_constante(db):
+    _usuario_com_transacoes(db, "export-pequeno", 2_000)
+    _usuario_com_transacoes(db, "export-grande", 40_000)
+
+    pico_pequeno, bytes_pequeno = _pico_exportacao("export-pequeno")
+    pico_grande, bytes_grande = _pico_exportacao("export-grande")
+
+    # 20x mais linhas e saída 20x maior, com praticamente o mesmo pico
+    assert bytes_grande > 15 * bytes_pequeno
+    assert pico_grande < 1.5 * pico_pequeno
+    assert pico_grande < bytes_grande / 2
+
+
+def test_exportacao_csv_pela_rota(client, db, usuario):
+    username, headers = usuario
+    ativo = models.Ativo(owner_id=username, nome="CDB", tipo_indexador="PRE")
+    db.add(ativo)
+    db.flush()
+    db.add_all(
+        models.Transacao(
+            ativo_id=ativo.id,
+            tipo="Aporte",
+            valor=float(i),
+            timestamp=datetime(2024, 1, 1 + i),
+        )
+        for i in range(1, 4)
+    )
+    db.commit()
+
+    resposta = client.get("/api/v1/investments/export/transactions", headers=headers)
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/csv")
+    linhas = list(csv.DictReader(io.StringIO(resposta.text)))
+    assert [l["valor"] for l in linhas] == ["1.0", "2.0", "3.0"]
+    assert {l["ativo_nome"] for l in linhas} == {"CDB"}
+
+
+def test_exportacao_parquet_em_row_groups(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    colunas = [("id", "inteiro"), ("valor", "real"), ("data", "data_hora")]
+    linhas = ((i, i / 2, datetime(2024, 1, 1)) for i in range(2_500))
+
+    arquivo = b"".join(export.parquet_em_grupos(colunas, linhas, 1_000))
+
+    tabela = pq.ParquetFile(io.BytesIO(arquivo))
+    assert tabela.metadata.num_rows == 2_500
+    assert tabela.metadata.num_row_groups == 3
+    assert tabela.read().column("valor").to_pylist()[-1] == 2_499 / 2
@@ -0,0 +1,148 @@
+from datetime import date
+
+from app.modules.history.jobs import HistoryRebuildQueue
+
+
+def test_pedidos_do_mesmo_usuario_sao_agrupados(usuario):
+    username, _ = usuario
+    fila = HistoryRebuildQueue(debounce_segundos=60, max_workers=1)
+
+    fila.schedule(username, date(2024, 3, 1))
+    fila.schedule(username, date(2024, 1, 1))
+    assert fila.stats()["pendentes"] == 1
+
+    # shutdown executa os pendentes antes de encerrar
+    fila.shutdown()
+    stats = fila.stats()
+    assert stats["execucoes"] == 1
+    assert stats["coalescidas"] == 1
+    assert stats["ultima_execucao"]["a_partir_de"] == "2024-01-01"
+
+
+def test_stats_nao_expoem_o_usuario(usuario, client):
+    username, headers = usuario
+    fila = HistoryRebuildQueue(debounce_segundos=0, max_workers=1)
+    fila.schedule(username)
+    fila.shutdown()
+
+    ultima = fila.stats()["ultima_execucao"]
+    assert ultima is not None
+    assert username not in str(ultima)
+
+    resposta = client.get("/api/v1/history/queue", headers=headers)
+    assert resposta.status_code == 200
+    assert "usuario" not in (resposta.json()["ultima_execucao"] or {})
+
+
+def test_rebuild_em_shards_com_processos_grava_o_historico(db):
+    from datetime import datetime
+
+    from app.modules.auth.models import User
+    from app.modules.history.jobs import rebuild_users_in_shards
+    from app.modules.history.models import Snapshot
+    from app.modules.investments import models
+
+    usernames = [f"shard-{i}" for i in range(4)]
+    for username in usernames:
+        db.add(User(username=username, hashed_password="x"))
+        ativo = models.Ativo(
+            owner_id=username, nome="CDB", tipo_indexador="PRE", valor_taxa=10.0
+        )
+        db.add(ativo)
+        db.flush()
+        db.add(
+            models.Transacao(
+                ativo_id=ativo.id,
+                tipo="Aporte",
+                valor=1000.0,
+                timestamp=datetime(2024, 1, 2, 10),
+            )
+        )
+    db.commit()
+
+    resultado = rebuild_users_in_shards(usernames, shard_size=1, max_processes=2)
+
+    assert resultado == {"usuarios": 4, "falhas": 0, "shards": 4}
+    for username in usernames:
+        snapshots = db.query(Snapshot).filter(Snapshot.owner_id == username).all()
+        assert snapshots, username
+        assert snapshots[0].total_aportes == 1000.0
+
+
+def test_rebuild_em_shards_nao_conta_usuarios_com_falha(monkeypatch, usuario):
+    from app.modules.history import jobs, service
+
+    username, _ = usuario
+
+    def falhar(db, user_username, a_partir_de=None):
+        if user_username == "falha":
+            raise RuntimeError("erro simulado")
+        return True
+
+    monkeypatch.setattr(service, "rebuild_user_history", falhar)
+
+    resultado = jobs.rebuild_users_in_shards([username, "falha"], shard_size=50)
+
+    assert resultado == {"usuarios": 1, "falhas": 1, "shards": 1}
+
+
+def test_rebuild_now_absorve_o_pedido_pendente(usuario):
+    username, _ = usuario
+    fila = HistoryRebuildQueue(debounce_segundos=60, max_workers=1)
+    fila.schedule(username, date(2024, 1, 1))
+
+    assert fila.rebuild_now(username, date(2024, 6, 1))
+    stats = fila.stats()
+    assert stats["pendentes"] == 0
+    assert stats["execucoes"] == 1
+    assert stats["ultima_execucao"]["a_partir_de"] == "2024-01-01"
+    fila.shutdown()
+    assert fila.stats()["execucoes"] == 1
+
+
+def test_rebuild_now_espera_a_execucao_da_fila(monkeypatch, usuario):
+    import threading
+
+    from app.modules.history import service
+
+    username, _ = usuario
+    liberar = threading.Event()
+    em_andamento = []
+    simultaneas = []
+
+    def rebuild_user_history(db, user_username, a_partir_de=None):
+        em_andamento.append(a_partir_de)
+        simultaneas.append(len(em_andamento))
+        if a_partir_de is not None:
+            liberar.wait(5)
+        em_andamento.pop()
+        return True
+
+    monkeypatch.setattr(service, "rebuild_user_history", rebuild_user_history)
+    fila = HistoryRebuildQueue(debounce_segundos=0, max_workers=1)
+    fila.schedule(username, date(2024, 1, 1))
+    while not em_andamento:
+        threading.Event().wait(0.01)
+
+    imediata = threading.Thread(target=fila.rebuild_now, args=(username,))
+    imediata.start()
+    imediata.join(0.2)
+    assert imediata.is_alive()
+
+    liberar.set()
+    imediata.join(5)
+    fila.shutdown()
+    assert simultaneas == [1, 1]
+    assert fila.stats()["execucoes"] == 2
+
+
+def test_rota_rebuild_passa_pela_fila(usuario, client):
+    from app.modules.history.jobs import history_queue
+
+    username, headers = usuario
+    history_queue.schedule(username, date(2024, 1, 1))
+
+    resposta = client.post("/api/v1/history/rebuild", headers=headers)
+
+    assert resposta.status_code == 200
+    assert username not in history_queue._pendentes
@@ -0,0 +1,25 @@
+def test_rota_async_reconstroi_fora_do_event_loop(client, usuario, monkeypatch):
+    import asyncio
+
+    from app.modules.history import service
+
+    username, headers = usuario
+    reconstrucoes = []
+    original = service.rebuild_user_history
+
+    def rebuild_user_history(db, user_username, a_partir_de=None):
+        try:
+            asyncio.get_running_loop()
+            reconstrucoes.append("event loop")
+        except RuntimeError:
+            reconstrucoes.append("threadpool")
+        return original(db, user_username, a_partir_de)
+
+    monkeypatch.setattr(service, "rebuild_user_history", rebuild_user_history)
+
+    resposta = client.get("/api/v1/history/", headers=headers)
+
+    assert resposta.status_code == 200
+    assert reconstrucoes == ["threadpool"]
+    (snapshot,) = resposta.json()
+    assert snapshot["valor_total_investido"] == 0.0
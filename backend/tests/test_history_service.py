@@ -0,0 +1,230 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.modules.history import service as history_service
+from app.modules.investments import lot_engine, models, schemas, service
+
+
+def _ativo_pre(db, username, movimentos, taxa=12.0):
+    """Ativo prefixado com as transações dadas via create_transaction (livro de lotes)."""
+    ativo = models.Ativo(
+        owner_id=username, nome="CDB Pré", tipo_indexador="PRE", valor_taxa=taxa
+    )
+    db.add(ativo)
+    db.commit()
+    for tipo, valor, timestamp in movimentos:
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=ativo.id, tipo=tipo, valor=valor, timestamp=timestamp
+            ),
+        )
+    db.refresh(ativo)
+    return ativo
+
+
+def _snapshot_de_hoje(db, username):
+    return next(
+        s
+        for s in history_service.get_history(db, username)
+        if s.timestamp.date() == date.today()
+    )
+
+
+def test_snapshot_de_hoje_igual_ao_saldo_do_livro_de_lotes(db, usuario):
+    # Saques pelo valor corrigido (FIFO): o histórico usa a mesma regra do livro
+    username, _ = usuario
+    ativo = _ativo_pre(
+        db,
+        username,
+        [
+            ("Aporte", 1000.0, datetime(2024, 1, 2)),
+            ("Aporte", 1000.0, datetime(2024, 3, 1)),
+            ("Saque", 1500.0, datetime(2024, 9, 2)),
+            ("Aporte", 500.0, datetime(2025, 1, 2)),
+            ("Saque", 300.0, datetime(2025, 6, 2)),
+        ],
+    )
+
+    assert history_service.rebuild_user_history(db, username)
+    snapshot = _snapshot_de_hoje(db, username)
+    assert snapshot.valor_total_bruto == ativo.valor_atual_bruto
+    principal = sum(l.principal_restante for l in service.get_lotes(db, ativo.id))
+    assert snapshot.valor_total_investido == round(principal, 2)
+
+
+def _linhas_referencia(transacoes, ativos, sorted_dates):
+    """
+    Implementação de referência no formato anterior ao sweep: para cada data,
+    refiltra as transações de cada ativo e refaz os lotes do zero. Saques
+    consomem os lotes mais antigos pelo valor corrigido (regra do livro de lotes).
+    """
+    linhas = []
+    for data_alvo in sorted_dates:
+        ref = datetime(data_alvo.year, data_alvo.month, data_alvo.day, 23, 59, 59)
+        bruto = investido = aportes = saques = 0.0
+        for t in transacoes:
+            if t.timestamp.date() == data_alvo:
+                if t.tipo == "Aporte":
+                    aportes += t.valor
+                elif t.tipo == "Saque":
+                    saques += t.valor
+
+        for ativo in ativos:
+            txs = [
+                t for t in transacoes if t.ativo_id == ativo.id and t.timestamp <= ref
+            ]
+            if not txs:
+                continue
+            if ativo.tipo_indexador in ["B3", "CRYPTO", "USA"]:
+                custo = sum(t.valor if t.tipo == "Aporte" else -t.valor for t in txs)
+                if data_alvo == date.today() and ativo.valor_atual_bruto > 0:
+                    bruto += ativo.valor_atual_bruto
+                else:
+                    bruto += max(0, custo)
+                investido += max(0, custo)
+                continue
+
+            lotes = []  # [data, principal_restante]
+            for t in txs:
+                if t.tipo == "Aporte":
+                    lotes.append([t.timestamp, t.valor])
+                    continue
+                restante = t.valor
+                for lote in lotes:
+                    if restante <= lot_engine.EPSILON_SAQUE:
+                        break
+                    corrigido = service.calculate_future_value(
+                        lote[1], lote[0], ativo.valor_taxa, t.timestamp
+                    )
+                    if corrigido <= 0:
+                        continue
+                    consumido = min(corrigido, restante)
+                    lote[1] -= lote[1] * consumido / corrigido
+                    restante -= consumido
+            bruto += sum(
+                service.calculate_future_value(p, d, ativo.valor_taxa, ref)
+                for d, p in lotes
+            )
+            investido += sum(p for _, p in lotes)
+
+        linhas.append(
+            {
+                "timestamp": ref,
+                "valor_total_bruto": round(bruto, 2),
+                "valor_total_investido": round(investido, 2),
+                "total_aportes": round(aportes, 2),
+                "total_saques": round(saques, 2),
+            }
+        )
+    return linhas
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_sweep_igual_a_referencia_por_data(semente):
+    rng = np.random.default_rng(semente)
+    ativos = [
+        SimpleNamespace(
+            id=f"a{i}",
+            tipo_indexador=tipo,
+            valor_taxa=round(float(rng.uniform(0, 14)), 2),
+            valor_atual_bruto=round(float(rng.uniform(0, 3000)), 2),
+        )
+        for i, tipo in enumerate(["PRE", "PRE", "IPCA", "B3"])
+    ]
+    # IPCA fica fora da comparação (curva do índice); o ativo sem transações
+    # confirma que ele não entra nos totais
+    com_transacoes = [a for a in ativos if a.tipo_indexador != "IPCA"]
+
+    inicio = datetime(2023, 1, 2)
+    transacoes = []
+    aportado = {a.id: 0.0 for a in ativos}
+    for i, minuto in enumerate(np.sort(rng.integers(0, 2 * 365 * 24 * 60, 60))):
+        ativo = com_transacoes[int(rng.integers(len(com_transacoes)))]
+        timestamp = inicio + timedelta(minutes=int(minuto))
+        if aportado[ativo.id] == 0 or rng.random() < 0.6:
+            valor = round(float(rng.uniform(10, 5000)), 2)
+            aportado[ativo.id] += valor
+            tipo = "Aporte"
+        else:
+            valor = round(float(rng.uniform(1, 0.5 * aportado[ativo.id])), 2)
+            tipo = "Saque"
+        transacoes.append(
+            SimpleNamespace(
+                id=f"t{i}",
+                ativo_id=ativo.id,
+                tipo=tipo,
+                valor=valor,
+                timestamp=timestamp,
+            )
+        )
+
+    sorted_dates = sorted({t.timestamp.date() for t in transacoes} | {date.today()})
+    assert history_service._calcular_snapshots(
+        transacoes, ativos, sorted_dates
+    ) == _linhas_referencia(transacoes, ativos, sorted_dates)
+
+
+def _snapshots(db, username):
+    return [
+        (
+            s.timestamp,
+            s.valor_total_bruto,
+            s.valor_total_investido,
+            s.total_aportes,
+            s.total_saques,
+        )
+        for s in history_service.get_history(db, username)
+    ]
+
+
+def _incremental_e_completo(db, username, a_partir_de):
+    """Snapshots após o rebuild incremental e após um rebuild completo."""
+    assert history_service.rebuild_user_history(db, username, a_partir_de)
+    incremental = _snapshots(db, username)
+    assert history_service.rebuild_user_history(db, username)
+    return incremental, _snapshots(db, username)
+
+
+MOVIMENTOS = [
+    ("Aporte", 1000.0, datetime(2024, 1, 2)),
+    ("Aporte", 2000.0, datetime(2024, 2, 5)),
+    ("Saque", 700.0, datetime(2024, 4, 1)),
+    ("Aporte", 300.0, datetime(2024, 6, 3)),
+    ("Saque", 1500.0, datetime(2024, 9, 2)),
+]
+
+
+def test_rebuild_incremental_igual_ao_completo_apos_insercao(db, usuario):
+    username, _ = usuario
+    ativo = _ativo_pre(db, username, MOVIMENTOS)
+    assert history_service.rebuild_user_history(db, username)
+
+    # Aporte retroativo, anterior a dois saques já registrados
+    service.create_transaction(
+        db,
+        schemas.TransacaoCreate(
+            ativo_id=ativo.id,
+            tipo="Aporte",
+            valor=450.0,
+            timestamp=datetime(2024, 3, 4),
+        ),
+    )
+    incremental, completo = _incremental_e_completo(db, username, date(2024, 3, 4))
+    assert incremental == completo
+    assert any(s[0].date() == date(2024, 3, 4) for s in completo)
+
+
+def test_rebuild_incremental_igual_ao_completo_apos_exclusao(db, usuario):
+    username, _ = usuario
+    ativo = _ativo_pre(db, username, MOVIMENTOS)
+    assert history_service.rebuild_user_history(db, username)
+
+    aporte = next(t for t in ativo.transacoes if t.timestamp == datetime(2024, 2, 5))
+    service.delete_transaction(db, aporte.id)
+    incremental, completo = _incremental_e_completo(db, username, date(2024, 2, 5))
+    assert incremental == completo
+    assert all(s[0].date() != date(2024, 2, 5) for s in completo)
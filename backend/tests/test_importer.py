@@ -0,0 +1,264 @@
+import io
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.modules.auth.models import User
+from app.modules.investments import importer, models, schemas, service
+
+
+def _novo_usuario(db, username):
+    db.add(User(username=username, hashed_password="x"))
+    ativos = [
+        models.Ativo(
+            owner_id=username, nome="CDB Pré", tipo_indexador="PRE", valor_taxa=12.5
+        ),
+        models.Ativo(
+            owner_id=username,
+            nome="PETR4",
+            categoria="Ações",
+            tipo_indexador="B3",
+            ticker="PETR4",
+        ),
+    ]
+    db.add_all(ativos)
+    db.commit()
+    return ativos
+
+
+def _linhas(n=200, semente=1):
+    rnd = random.Random(semente)
+    data = datetime(2021, 1, 4, 10)
+    linhas = []
+    for k in range(n):
+        data += timedelta(hours=rnd.randint(1, 100))
+        tipo = "Aporte" if k < 4 or rnd.random() < 0.75 else "Saque"
+        linhas.append(
+            (k % 2, tipo, round(rnd.uniform(10, 500), 2), rnd.randint(1, 5), data)
+        )
+    return linhas
+
+
+def _estado(db, ativos):
+    db.expire_all()
+    resultado = []
+    for ativo in ativos:
+        a = db.get(models.Ativo, ativo.id)
+        lotes = sorted(
+            round(l.principal_restante, 6)
+            for l in db.query(models.Lote).filter(models.Lote.ativo_id == a.id)
+        )
+        resultado.append(
+            (
+                round(a.valor_atual_bruto, 6),
+                round(a.imposto_estimado or 0.0, 6),
+                round(a.quantidade_atual or 0.0, 6),
+                round(a.preco_medio or 0.0, 6),
+                lotes,
+            )
+        )
+    return resultado
+
+
+def test_importacao_csv_igual_a_criacao_uma_a_uma(db):
+    linhas = _linhas()
+
+    sequencial = _novo_usuario(db, "import-seq")
+    for i, tipo, valor, quantidade, data in linhas:
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=sequencial[i].id,
+                tipo=tipo,
+                valor=valor,
+                quantidade=quantidade,
+                timestamp=data,
+            ),
+        )
+
+    em_lote = _novo_usuario(db, "import-lote")
+    csv = "ativo_id;tipo;valor;quantidade;timestamp\n" + "".join(
+        f"{em_lote[i].id};{tipo};{str(valor).replace('.', ',')};{quantidade};"
+        f"{data:%d/%m/%Y %H:%M}\n"
+        for i, tipo, valor, quantidade, data in linhas
+    )
+    relatorio, primeira_data = importer.importar_transacoes(
+        db, "import-lote", io.StringIO(csv), "csv"
+    )
+
+    assert relatorio["linhas_importadas"] == len(linhas)
+    assert relatorio["total_erros"] == 0
+    assert relatorio["ativos_recalculados"] == 2
+    assert relatorio["linhas_por_segundo"] > 0
+    assert primeira_data == linhas[0][4].date()
+    assert _estado(db, em_lote) == _estado(db, sequencial)
+
+
+def test_linhas_invalidas_sao_relatadas_e_as_validas_gravadas(db):
+    ativo, _ = _novo_usuario(db, "import-erros")
+    csv = (
+        "ativo_id,tipo,valor,timestamp\n"
+        f"{ativo.id},Aporte,100.50,2024-01-02\n"
+        "inexistente,Aporte,1,2024-01-02\n"
+        f"{ativo.id},Resgate,1,2024-01-02\n"
+        f"{ativo.id},Aporte,abc,2024-01-02\n"
+        f"{ativo.id},Aporte,1,31/02/2024\n"
+        f"{ativo.id},Aporte,-5,2024-01-02\n"
+    )
+
+    relatorio, _ = importer.importar_transacoes(
+        db, "import-erros", io.StringIO(csv), "csv"
+    )
+
+    assert relatorio["linhas_lidas"] == 6
+    assert relatorio["linhas_importadas"] == 1
+    assert [e["linha"] for e in relatorio["erros"]] == [3, 4, 5, 6, 7]
+    valores = [
+        t.valor
+        for t in db.query(models.Transacao).filter(
+            models.Transacao.ativo_id == ativo.id
+        )
+    ]
+    assert valores == [100.50]
+
+
+OFX = (
+    "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+    "<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20240105120000[-3:BRT]\n"
+    "<TRNAMT>150,00\n<FITID>1\n</STMTTRN>\n"
+    "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110<TRNAMT>-20.5<FITID>2</STMTTRN>\n"
+    "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+)
+
+
+@pytest.mark.parametrize("bloco", [7, 64 * 1024])
+def test_ofx_lido_em_blocos(monkeypatch, bloco):
+    monkeypatch.setattr(importer, "_TAMANHO_BLOCO_OFX", bloco)
+
+    lancamentos = list(importer.ler_ofx(io.StringIO(OFX)))
+
+    assert [campos["TRNAMT"] for _, campos in lancamentos] == ["150,00", "-20.5"]
+    assert [campos["DTPOSTED"] for _, campos in lancamentos] == [
+        "20240105120000[-3:BRT]",
+        "20240110",
+    ]
+
+
+def test_importacao_ofx_pela_rota(client, db, usuario):
+    username, headers = usuario
+    ativo = models.Ativo(
+        owner_id=username, nome="CDB Pré", tipo_indexador="PRE", valor_taxa=10
+    )
+    db.add(ativo)
+    db.commit()
+
+    resposta = client.post(
+        "/api/v1/investments/transactions/import",
+        params={"ativo_id": ativo.id},
+        files={"arquivo": ("extrato.ofx", OFX.encode(), "text/plain")},
+        headers=headers,
+    )
+
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["linhas_importadas"] == 2
+    db.expire_all()
+    transacoes = (
+        db.query(models.Transacao.tipo, models.Transacao.valor)
+        .filter(models.Transacao.ativo_id == ativo.id)
+        .order_by(models.Transacao.timestamp)
+        .all()
+    )
+    assert [tuple(t) for t in transacoes] == [("Aporte", 150.0), ("Saque", 20.5)]
+
+
+@pytest.mark.parametrize(
+    "bruto, esperado",
+    [
+        ("1.234,56", 1234.56),
+        ("1,000.50", 1000.50),
+        ("R$ 1.234.567,89", 1234567.89),
+        ("-1,234.56", -1234.56),
+        ("150,00", 150.0),
+        ("-20.5", -20.5),
+        ("1.234.567", 1234567.0),
+        ("1,234,567", 1234567.0),
+        ("1234", 1234.0),
+    ],
+)
+def test_parse_valor_detecta_o_separador_decimal(bruto, esperado):
+    assert importer._parse_valor(bruto) == esperado
+
+
+@pytest.mark.parametrize(
+    "bruto", ["1.2,3", "12,34,56.7", "1.23,4", "abc", "", "nan", "inf", "-inf", "1e400"]
+)
+def test_parse_valor_recusa_formato_misto_e_nao_finito(bruto):
+    with pytest.raises(importer.ErroLinha):
+        importer._parse_valor(bruto)
+
+
+@pytest.mark.parametrize("bruto", ["1.000", "1,000", "-25.500", "R$ 999,999"])
+def test_parse_valor_ambiguo_sem_separador_decimal(bruto):
+    with pytest.raises(importer.ErroLinha, match="ambíguo"):
+        importer._parse_valor(bruto)
+
+
+@pytest.mark.parametrize(
+    "bruto, separador, esperado",
+    [
+        ("1.000", ",", 1000.0),
+        ("1,000", ",", 1.0),
+        ("1,000", ".", 1000.0),
+        ("1.000", ".", 1.0),
+        ("1.234.567,89", ",", 1234567.89),
+        ("0.125", None, 0.125),
+        ("12.3456", None, 12.3456),
+    ],
+)
+def test_parse_valor_com_separador_decimal(bruto, separador, esperado):
+    assert importer._parse_valor(bruto, separador) == esperado
+
+
+def test_nan_nao_chega_ao_banco(db):
+    ativo, _ = _novo_usuario(db, "import-nan")
+    csv = (
+        "ativo_id,tipo,valor,timestamp\n"
+        f"{ativo.id},Aporte,nan,2024-01-02\n"
+        f"{ativo.id},Aporte,inf,2024-01-02\n"
+        f"{ativo.id},Aporte,10,2024-01-02\n"
+    )
+
+    relatorio, _ = importer.importar_transacoes(
+        db, "import-nan", io.StringIO(csv), "csv"
+    )
+
+    assert relatorio["linhas_importadas"] == 1
+    assert [e["linha"] for e in relatorio["erros"]] == [2, 3]
+
+
+def test_separador_decimal_do_arquivo_pela_rota(client, db, usuario):
+    username, headers = usuario
+    ativo = models.Ativo(owner_id=username, nome="CDB", tipo_indexador="PRE")
+    db.add(ativo)
+    db.commit()
+    csv = f"ativo_id;tipo;valor;timestamp\n{ativo.id};Aporte;1.000;02/01/2024\n"
+
+    def importar(**params):
+        return client.post(
+            "/api/v1/investments/transactions/import",
+            params=params,
+            files={"arquivo": ("extrato.csv", csv.encode(), "text/csv")},
+            headers=headers,
+        )
+
+    assert importar().json()["total_erros"] == 1
+    assert importar(separador_decimal=";").status_code == 400
+    assert importar(separador_decimal=",").json()["linhas_importadas"] == 1
+    db.expire_all()
+    (valor,) = (
+        db.query(models.Transacao.valor)
+        .filter(models.Transacao.ativo_id == ativo.id)
+        .one()
+    )
+    assert valor == 1000.0
@@ -0,0 +1,64 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.business_days import dias_uteis
+from app.modules.investments.index_series import CurvaIpca
+
+# Janeiro/2024 +1%, fevereiro/2024 (29 dias) +2%; depois, 0,5% a.m. projetado
+PROJETADA = 0.005
+
+
+def _curva(taxa_real=0.0):
+    return CurvaIpca(
+        primeiro_mes=np.datetime64("2024-01", "M"),
+        variacoes=np.array([0.01, 0.02]),
+        variacao_projetada=PROJETADA,
+        taxa_real=taxa_real,
+    )
+
+
+@pytest.mark.parametrize(
+    "dia, esperado",
+    [
+        (date(2024, 1, 1), 1.0),
+        (date(2024, 1, 16), 1.01 ** (15 / 31)),
+        (date(2024, 1, 31), 1.01 ** (30 / 31)),
+        (date(2024, 2, 1), 1.01),
+        (date(2024, 2, 15), 1.01 * 1.02 ** (14 / 29)),
+        (date(2024, 3, 1), 1.01 * 1.02),
+        # Meses sem variação publicada usam a projeção, também pro rata
+        (date(2024, 3, 11), 1.01 * 1.02 * (1 + PROJETADA) ** (10 / 31)),
+        (date(2024, 4, 11), 1.01 * 1.02 * (1 + PROJETADA) ** (1 + 10 / 30)),
+        # Antes do início da série: projeção retroativa
+        (date(2023, 12, 16), (1 + PROJETADA) ** (-1 + 15 / 31)),
+    ],
+)
+def test_indice_interpolado_pro_rata_pelos_dias_corridos(dia, esperado):
+    assert _curva().indice(np.datetime64(dia, "D")) == pytest.approx(
+        esperado, rel=1e-12
+    )
+
+
+def test_indice_e_continuo_e_crescente_na_virada_do_mes():
+    dias = np.arange(
+        np.datetime64("2024-01-01"), np.datetime64("2024-05-01"), dtype="datetime64[D]"
+    )
+    indice = _curva().indice(dias)
+    assert np.all(np.diff(indice) > 0)
+    # Nenhum salto: o passo diário nunca passa do maior fator diário do período
+    assert np.max(indice[1:] / indice[:-1]) <= 1.02 ** (1 / 29) + 1e-12
+
+
+def test_fator_combina_inflacao_pro_rata_e_taxa_real():
+    inicio = np.array([np.datetime64("2024-01-16", "us")])
+    fim = np.array([np.datetime64("2024-02-15", "us")])
+    inflacao = (1.01 * 1.02 ** (14 / 29)) / 1.01 ** (15 / 31)
+    uteis = int(dias_uteis(date(2024, 1, 16), date(2024, 2, 15)))
+    juros = 1.06 ** (uteis / 252)
+
+    assert _curva().fatores(inicio, fim)[0] == pytest.approx(inflacao, rel=1e-12)
+    assert _curva(6.0).fatores(inicio, fim)[0] == pytest.approx(
+        inflacao * juros, rel=1e-12
+    )
@@ -0,0 +1,179 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.modules.investments import lot_engine, models, schemas, service
+from app.modules.investments.index_series import CurvaIpca
+
+
+def _ativo_com_lotes(db, principais, data=datetime(2024, 1, 1)):
+    ativo = models.Ativo(nome="Tesouro IPCA+", tipo_indexador="IPCA")
+    db.add(ativo)
+    db.flush()
+    for i, principal in enumerate(principais):
+        db.add(
+            models.Lote(
+                ativo_id=ativo.id,
+                transacao_id=f"aporte-{i}",
+                data=data,
+                principal_restante=principal,
+            )
+        )
+    db.flush()
+    return ativo
+
+
+def test_lotes_cabeca_com_deflacao_cobrem_pelo_valor_corrigido(db):
+    # 16 lotes (a primeira página) têm principal 16000 >= 15900, mas valor
+    # corrigido de só 15788: é preciso carregar a página seguinte.
+    ativo = _ativo_com_lotes(db, [1000.0] * 40)
+    curva = CurvaIpca(
+        primeiro_mes=np.datetime64("2024-01", "M"),
+        variacoes=np.array([-0.01325]),
+        variacao_projetada=0.0,
+        taxa_real=0.0,
+    )
+    data_saque = datetime(2024, 2, 1)
+
+    lotes = service._get_lotes_cabeca(db, ativo.id, 15900.0, curva, data_saque)
+    assert len(lotes) > 16
+
+    estado = lot_engine.EstadoLotes.from_lotes(lotes)
+    lot_engine.aplicar_saque(estado, 15900.0, data_saque, curva)
+    assert estado.principal_restante[:16].tolist() == [0.0] * 16
+    assert 0 < estado.principal_restante[16] < 1000.0
+
+
+def _consultas_distinct(chamada):
+    from sqlalchemy import event
+
+    from app.db.session import engine
+
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if "DISTINCT" in statement:
+            consultas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        resultado = chamada()
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+    return resultado, consultas
+
+
+def test_lotes_renda_fixa_constroi_livro_ausente_so_dos_ativos_pedidos(db):
+    com_livro = _ativo_com_lotes(db, [100.0])
+    sem_livro = models.Ativo(nome="CDB Pré", tipo_indexador="PRE", valor_taxa=10.0)
+    db.add(sem_livro)
+    db.flush()
+    db.add(
+        models.Transacao(
+            ativo_id=sem_livro.id,
+            tipo="Aporte",
+            valor=250.0,
+            timestamp=datetime(2024, 1, 2),
+        )
+    )
+    db.flush()
+
+    lotes, consultas = _consultas_distinct(
+        lambda: service._lotes_renda_fixa(db, [com_livro, sem_livro])
+    )
+
+    assert [l.principal_restante for l in lotes[sem_livro.id]] == [250.0]
+    assert [l.principal_restante for l in lotes[com_livro.id]] == [100.0]
+    # Livro e Aportes verificados só para o ativo sem lote vivo
+    assert len(consultas) == 2
+    assert all("IN (" in c for c in consultas)
+
+
+def test_lotes_renda_fixa_sem_verificacao_quando_todos_tem_lote_vivo(db):
+    ativo = _ativo_com_lotes(db, [100.0, 200.0])
+
+    lotes, consultas = _consultas_distinct(
+        lambda: service._lotes_renda_fixa(db, [ativo])
+    )
+
+    assert len(lotes[ativo.id]) == 2
+    assert consultas == []
+
+
+def _ativo_pre_com_saque(db, data_saque):
+    ativo = models.Ativo(nome="CDB Pré", tipo_indexador="PRE", valor_taxa=10.0)
+    db.add(ativo)
+    db.commit()
+    for tipo, valor, timestamp in [
+        ("Aporte", 1000.0, datetime(2024, 1, 2)),
+        ("Saque", 400.0, data_saque),
+    ]:
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=ativo.id, tipo=tipo, valor=valor, timestamp=timestamp
+            ),
+        )
+    return ativo
+
+
+def test_rebuild_index_ledgers_refaz_so_livros_com_saque_na_faixa(db):
+    recente = _ativo_pre_com_saque(db, datetime(2024, 7, 1))
+    antigo = _ativo_pre_com_saque(db, datetime(2024, 2, 1))
+    esperado = service.get_lotes(db, recente.id)[0].principal_restante
+    saldo = recente.valor_atual_bruto
+
+    # Lotes gravados com fatores que a série atualizada substituiu
+    for ativo in (recente, antigo):
+        lote = service.get_lotes(db, ativo.id)[0]
+        lote.principal_restante = 1.0
+        ativo.valor_atual_bruto = 0.0
+    db.commit()
+
+    assert service.rebuild_index_ledgers(db, "PRE", date(2024, 6, 1)) >= 1
+
+    assert service.get_lotes(db, recente.id)[0].principal_restante == esperado
+    assert recente.valor_atual_bruto == saldo
+    assert service.get_lotes(db, antigo.id)[0].principal_restante == 1.0
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_posicao_incremental_igual_a_recalculate_position(db, semente):
+    rng = np.random.default_rng(semente)
+    ativo = models.Ativo(nome="PETR4", tipo_indexador="B3", ticker="PETR4")
+    db.add(ativo)
+    db.commit()
+
+    ultima = datetime(2024, 1, 2, 10, 0)
+    usadas = set()
+    for i in range(40):
+        # ~20% retroativas (exigem recalcular a posição); timestamps distintos
+        if i and rng.random() < 0.2:
+            timestamp = ultima - timedelta(minutes=int(rng.integers(1, 60 * 24 * 90)))
+        else:
+            timestamp = ultima + timedelta(minutes=int(rng.integers(1, 60 * 24 * 10)))
+            ultima = timestamp
+        if timestamp in usadas:
+            continue
+        usadas.add(timestamp)
+
+        cotas = float(rng.integers(1, 200))
+        tipo = "Aporte" if i == 0 or rng.random() < 0.65 else "Saque"
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=ativo.id,
+                tipo=tipo,
+                valor=round(cotas * float(rng.uniform(5, 60)), 2),
+                quantidade=cotas,
+                timestamp=timestamp,
+            ),
+        )
+        db.refresh(ativo)
+        incremental = (ativo.quantidade_atual, ativo.preco_medio)
+
+        service.recalculate_position(db, ativo)
+        assert incremental == pytest.approx(
+            (ativo.quantidade_atual, ativo.preco_medio), rel=1e-12
+        )
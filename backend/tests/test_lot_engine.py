@@ -0,0 +1,176 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.modules.investments import lot_engine
+from app.modules.investments.index_series import CurvaIpca
+
+# Um mês de deflação de 1,325%: fator 0,98675 de 01/01 a 01/02
+DEFLACAO = -0.01325
+
+
+def _curva_deflacao():
+    return CurvaIpca(
+        primeiro_mes=np.datetime64("2024-01", "M"),
+        variacoes=np.array([DEFLACAO]),
+        variacao_projetada=0.0,
+        taxa_real=0.0,
+    )
+
+
+def _estado(principais, data=datetime(2024, 1, 1)):
+    n = len(principais)
+    return lot_engine.EstadoLotes(
+        ids=[f"t{i}" for i in range(n)],
+        datas=np.array([data] * n, dtype="datetime64[us]"),
+        principal_restante=np.array(principais, dtype=float),
+        fator=np.ones(n),
+    )
+
+
+def test_fator_com_deflacao_fica_abaixo_de_um():
+    fator = lot_engine.fatores_crescimento(
+        np.array([datetime(2024, 1, 1)], dtype="datetime64[us]"),
+        np.array([1000.0]),
+        _curva_deflacao(),
+        datetime(2024, 2, 1),
+    )
+    assert fator[0] == pytest.approx(1 + DEFLACAO)
+
+
+def test_saque_com_deflacao_alcanca_lote_alem_do_principal():
+    # Principal acumulado dos três primeiros lotes cobre o saque (2001 >= 2000),
+    # mas o valor corrigido não (1974,49): o quarto lote precisa ser consumido.
+    estado = _estado([1000, 1000, 1, 1000])
+
+    alterados = lot_engine.aplicar_saque(
+        estado, 2000.0, datetime(2024, 2, 1), _curva_deflacao()
+    )
+
+    assert list(alterados) == [0, 1, 2, 3]
+    assert estado.principal_restante[:3].tolist() == [0.0, 0.0, 0.0]
+    # 2000 - 2001 * 0,98675 = 25,51 saem do quarto lote: restam ~974,14
+    restante = 1000 - (2000 - 2001 * (1 + DEFLACAO)) / (1 + DEFLACAO)
+    assert estado.principal_restante[3] == pytest.approx(restante)
+    assert estado.principal_restante[3] < 1000
+    assert estado.fator[3] == pytest.approx(1 + DEFLACAO)
+
+
+def test_saque_com_deflacao_igual_ao_replay_completo():
+    datas = [datetime(2024, 1, 1)] * 4 + [datetime(2024, 2, 1)]
+    colunas = lot_engine.ColunasTransacoes(
+        ids=["a0", "a1", "a2", "a3", "s0"],
+        is_aporte=np.array([True, True, True, True, False]),
+        valores=np.array([1000.0, 1000.0, 1.0, 1000.0, 2000.0]),
+        datas=np.array(datas, dtype="datetime64[us]"),
+    )
+
+    estado = lot_engine.reconstruir_lotes(colunas, _curva_deflacao())
+
+    assert estado.principal_restante[:3].tolist() == [0.0, 0.0, 0.0]
+    assert round(estado.principal_restante[3], 2) == 974.14
+
+
+def test_saque_maior_que_o_saldo_consome_todos_os_lotes():
+    estado = _estado([1000, 1000])
+
+    alterados = lot_engine.aplicar_saque(
+        estado, 5000.0, datetime(2024, 2, 1), _curva_deflacao()
+    )
+
+    assert list(alterados) == [0, 1]
+    assert estado.principal_restante.tolist() == [0.0, 0.0]
+
+
+def test_saque_sem_deflacao_corrige_so_a_cabeca():
+    chamadas = []
+
+    class CurvaContada(lot_engine.CurvaPrefixada):
+        def fatores(self, datas, datas_referencia):
+            chamadas.append(len(datas))
+            return super().fatores(datas, datas_referencia)
+
+    estado = _estado([100.0] * 1000)
+
+    lot_engine.aplicar_saque(estado, 250.0, datetime(2024, 2, 1), CurvaContada(10.0))
+
+    # 250 cabe no principal dos 3 primeiros lotes; o fator >= 1 basta com eles
+    assert chamadas == [3]
+    assert estado.principal_restante[3:].tolist() == [100.0] * 997
+
+
+def _replay_referencia(transacoes, taxa, data_referencia):
+    """
+    Implementação de referência, uma transação e um lote por vez (sem NumPy):
+    cada Saque consome os lotes mais antigos pelo valor corrigido na data dele.
+    """
+    from app.modules.investments.service import calculate_future_value
+
+    lotes = []  # [data, principal_restante]
+    for tipo, valor, data in transacoes:
+        if tipo == "Aporte":
+            lotes.append([data, valor])
+            continue
+        restante = valor
+        for lote in lotes:
+            if restante <= lot_engine.EPSILON_SAQUE:
+                break
+            if lote[1] <= lot_engine.EPSILON_SAQUE:
+                continue
+            corrigido = calculate_future_value(lote[1], lote[0], taxa, data)
+            if corrigido <= restante:
+                restante -= corrigido
+                lote[1] = 0.0
+            else:
+                lote[1] -= restante * lote[1] / corrigido
+                restante = 0.0
+
+    saldo = sum(
+        calculate_future_value(principal, data, taxa, data_referencia)
+        for data, principal in lotes
+        if principal > lot_engine.EPSILON_SAQUE
+    )
+    return [principal for _, principal in lotes], saldo
+
+
+def _historico_aleatorio(rng, n):
+    """Aportes e saques em datas/horas aleatórias (saques até 120% do aportado)."""
+    inicio = np.datetime64("2022-01-03T00:00", "m")
+    minutos = np.sort(rng.integers(0, 3 * 365 * 24 * 60, n))
+    transacoes = []
+    aportado = 0.0
+    for i, minuto in enumerate(minutos):
+        data = (inicio + np.timedelta64(int(minuto), "m")).item()
+        if i == 0 or rng.random() < 0.6:
+            valor = round(float(rng.uniform(10, 5000)), 2)
+            aportado += valor
+            transacoes.append(("Aporte", valor, data))
+        else:
+            valor = round(float(rng.uniform(1, 0.4 * aportado)), 2)
+            transacoes.append(("Saque", valor, data))
+    return transacoes
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_motor_vetorizado_igual_a_referencia_por_transacao(semente):
+    rng = np.random.default_rng(semente)
+    transacoes = _historico_aleatorio(rng, int(rng.integers(2, 80)))
+    taxa = round(float(rng.uniform(0, 15)), 2)
+    data_referencia = datetime(2025, 6, 30, 12, 0)
+
+    colunas = lot_engine.ColunasTransacoes(
+        ids=[f"t{i}" for i in range(len(transacoes))],
+        is_aporte=np.array([t == "Aporte" for t, _, _ in transacoes]),
+        valores=np.array([v for _, v, _ in transacoes], dtype=float),
+        datas=np.array([d for _, _, d in transacoes], dtype="datetime64[us]"),
+    )
+    estado = lot_engine.reconstruir_lotes(colunas, taxa)
+    fator = lot_engine.fatores_atuais(estado, taxa, data_referencia)
+    saldo, _ = lot_engine.calcular_impostos(estado, fator, data_referencia, False)
+
+    principais, saldo_referencia = _replay_referencia(transacoes, taxa, data_referencia)
+    assert np.round(estado.principal_restante, 2).tolist() == [
+        round(p, 2) for p in principais
+    ]
+    assert round(saldo, 2) == round(saldo_referencia, 2)
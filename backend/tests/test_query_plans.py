@@ -0,0 +1,160 @@
+"""
+Regressão dos planos de consulta: as consultas quentes precisam buscar pelos
+índices da migração 009 (SEARCH ... USING INDEX), nunca varrer a tabela.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event
+
+from app.db.session import SessionLocal, engine
+from app.modules.auth.models import User
+from app.modules.auth.user_cache import UsuarioAutenticado
+from app.modules.history import models as history_models
+from app.modules.history import service as history_service
+from app.modules.investments import models, schemas, service
+from app.modules.investments.routes import list_assets
+
+USUARIO = "planos"
+TABELAS = ("ativos", "transacoes", "snapshots", "passivos", "lotes")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def banco_migrado():
+    """Desfaz e refaz a migração 009 sobre o banco de teste."""
+    config = Config()
+    config.set_main_option(
+        "script_location", str(Path(__file__).resolve().parents[1] / "alembic")
+    )
+    command.stamp(config, "head")
+    command.downgrade(config, "008")
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="module")
+def ativo(banco_migrado):
+    db = SessionLocal()
+    db.add(User(username=USUARIO, hashed_password="x"))
+    ativo = models.Ativo(
+        owner_id=USUARIO, nome="CDB Pré", tipo_indexador="PRE", valor_taxa=12.0
+    )
+    db.add(ativo)
+    db.commit()
+    data = datetime(2024, 1, 2, 10)
+    for i in range(5):
+        service.create_transaction(
+            db,
+            schemas.TransacaoCreate(
+                ativo_id=ativo.id,
+                tipo="Saque" if i == 3 else "Aporte",
+                valor=100.0,
+                quantidade=0,
+                timestamp=data + timedelta(days=30 * i),
+            ),
+        )
+    db.add(history_models.Snapshot(owner_id=USUARIO, timestamp=data))
+    db.commit()
+    ativo_id = ativo.id
+    db.close()
+    return ativo_id
+
+
+def _planos(db, chamada):
+    """Executa chamada() e devolve o EXPLAIN QUERY PLAN de cada SELECT emitido."""
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            consultas.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        chamada()
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    conexao = db.connection()
+    return [
+        (
+            sql,
+            [
+                linha[-1]
+                for linha in conexao.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + sql, parametros
+                )
+            ],
+        )
+        for sql, parametros in consultas
+    ]
+
+
+def _assert_usa_indices(planos, esperados):
+    """Nenhuma varredura das tabelas quentes e cada índice esperado usado."""
+    usados = set()
+    for sql, detalhes in planos:
+        for detalhe in detalhes:
+            for tabela in TABELAS:
+                assert not detalhe.startswith(
+                    f"SCAN {tabela}"
+                ), f"{detalhe!r} em: {sql}"
+            if detalhe.startswith("SEARCH") and "USING" in detalhe:
+                usados.add(detalhe)
+    for tabela, indice in esperados:
+        assert any(
+            d.startswith(f"SEARCH {tabela} USING") and f"INDEX {indice} " in d + " "
+            for d in usados
+        ), f"{tabela} sem {indice}: {sorted(usados)}"
+
+
+def test_update_asset_balance(db, ativo):
+    asset = db.get(models.Ativo, ativo)
+    planos = _planos(db, lambda: service.update_asset_balance(db, asset))
+    _assert_usa_indices(planos, [("lotes", "ix_lotes_ativo_id")])
+
+
+def test_rebuild_user_history_join(db, ativo):
+    planos = _planos(db, lambda: history_service.rebuild_user_history(db, USUARIO))
+    _assert_usa_indices(
+        planos,
+        [
+            ("ativos", "ix_ativos_owner_id"),
+            ("transacoes", "ix_transacoes_ativo_id_timestamp"),
+        ],
+    )
+
+
+def test_get_history(db, ativo):
+    planos = _planos(db, lambda: history_service.get_history(db, USUARIO))
+    _assert_usa_indices(planos, [("snapshots", "ix_snapshots_owner_id_timestamp")])
+
+
+@pytest.mark.parametrize("incluir_transacoes", [False, True])
+def test_list_assets(db, ativo, incluir_transacoes):
+    usuario = UsuarioAutenticado(username=USUARIO)
+    planos = _planos(
+        db,
+        lambda: list_assets(
+            incluir_transacoes=incluir_transacoes, db=db, current_user=usuario
+        ),
+    )
+    esperados = [("ativos", "ix_ativos_owner_id")]
+    if incluir_transacoes:
+        esperados.append(("transacoes", "ix_transacoes_ativo_id_timestamp"))
+    _assert_usa_indices(planos, esperados)
+
+
+def test_create_daily_snapshot_if_needed(db, ativo):
+    planos = _planos(db, lambda: service.create_daily_snapshot_if_needed(db, USUARIO))
+    _assert_usa_indices(
+        planos,
+        [
+            ("snapshots", "ix_snapshots_owner_id_timestamp"),
+            ("ativos", "ix_ativos_owner_id"),
+        ],
+    )
+    snapshot = next(sql for sql, _ in planos if "FROM snapshots" in sql)
+    assert "date(" not in snapshot.lower()
@@ -0,0 +1,82 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.modules.investments.quote_cache import QuoteCache
+
+
+class _Provedor:
+    """Fetcher falso: devolve o preço atual de cada chave e conta as chamadas."""
+
+    def __init__(self, precos):
+        self.precos = precos
+        self.chamadas = []
+
+    def __call__(self, chaves):
+        chaves = set(chaves)
+        self.chamadas.append(chaves)
+        return {c: self.precos[c] for c in chaves if c in self.precos}
+
+
+def _chave():
+    return ("yahoo", f"T{uuid.uuid4().hex[:8].upper()}.SA")
+
+
+def _aguardar_revalidacao(cache):
+    cache._executor.submit(lambda: None).result(timeout=5)
+
+
+def test_dentro_do_ttl_nao_vai_a_rede():
+    chave = _chave()
+    provedor = _Provedor({chave: 10.0})
+    cache = QuoteCache(provedor, ttl_segundos=60, max_entradas=10)
+
+    assert cache.get_many([chave]) == {chave: 10.0}
+    provedor.precos[chave] = 11.0
+    assert cache.get_many([chave]) == {chave: 10.0}
+
+    assert len(provedor.chamadas) == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["stale_hits"]) == (1, 1, 0)
+
+
+def test_vencida_e_servida_e_revalidada_em_segundo_plano():
+    chave = _chave()
+    provedor = _Provedor({chave: 10.0})
+    cache = QuoteCache(provedor, ttl_segundos=60, max_entradas=10)
+    cache.get_many([chave])
+
+    # Entrada fora do TTL: a resposta usa o preço antigo, sem esperar a rede
+    cache._entradas[chave] = (10.0, datetime.now() - timedelta(seconds=61))
+    provedor.precos[chave] = 12.0
+    assert cache.get_many([chave]) == {chave: 10.0}
+    assert cache.stats()["stale_hits"] == 1
+
+    _aguardar_revalidacao(cache)
+    assert len(provedor.chamadas) == 2
+    assert cache.get_many([chave]) == {chave: 12.0}
+    assert cache.stats()["hits"] == 1
+
+
+def test_forcar_ignora_o_ttl():
+    chave = _chave()
+    provedor = _Provedor({chave: 10.0})
+    cache = QuoteCache(provedor, ttl_segundos=60, max_entradas=10)
+    cache.get_many([chave])
+    provedor.precos[chave] = 13.0
+
+    assert cache.get_many([chave], forcar=True) == {chave: 13.0}
+    assert len(provedor.chamadas) == 2
+
+
+def test_despeja_a_entrada_usada_ha_mais_tempo():
+    a, b, c = _chave(), _chave(), _chave()
+    provedor = _Provedor({a: 1.0, b: 2.0, c: 3.0})
+    cache = QuoteCache(provedor, ttl_segundos=60, max_entradas=2)
+
+    cache.get_many([a])
+    cache.get_many([b])
+    cache.get_many([a])  # a volta a ser a mais recente
+    cache.get_many([c])
+
+    assert list(cache._entradas) == [a, c]
+    assert cache.stats()["evictions"] == 1
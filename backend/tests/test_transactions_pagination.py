@@ -0,0 +1,86 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.modules.investments import models
+
+URL = "/api/v1/investments/transactions"
+
+
+def _ativo_com_transacoes(db, username):
+    """Dez transações, sete delas com o mesmo timestamp."""
+    ativo = models.Ativo(owner_id=username, nome="CDB", tipo_indexador="PRE")
+    db.add(ativo)
+    db.flush()
+    mesmo_instante = datetime(2024, 5, 10, 12, 0)
+    timestamps = [mesmo_instante] * 7 + [
+        datetime(2024, 5, 11),
+        datetime(2024, 5, 9),
+        datetime(2024, 1, 2),
+    ]
+    transacoes = [
+        models.Transacao(
+            ativo_id=ativo.id, tipo="Aporte", valor=100.0 + i, timestamp=timestamp
+        )
+        for i, timestamp in enumerate(timestamps)
+    ]
+    db.add_all(transacoes)
+    db.commit()
+    return transacoes
+
+
+def _todas_as_paginas(client, headers, limite):
+    ids, paginas, cursor = [], 0, None
+    while True:
+        params = {"limite": limite}
+        if cursor:
+            params["cursor"] = cursor
+        resposta = client.get(URL, headers=headers, params=params)
+        assert resposta.status_code == 200
+        corpo = resposta.json()
+        ids += [t["id"] for t in corpo["itens"]]
+        paginas += 1
+        cursor = corpo["proximo_cursor"]
+        if cursor is None:
+            return ids, paginas
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3, 7, 10])
+def test_paginas_com_timestamps_iguais_nao_repetem_nem_pulam(
+    db, client, usuario, limite
+):
+    username, headers = usuario
+    transacoes = _ativo_com_transacoes(db, username)
+
+    ids, paginas = _todas_as_paginas(client, headers, limite)
+
+    esperado = [
+        t.id
+        for t in sorted(transacoes, key=lambda t: (t.timestamp, t.id), reverse=True)
+    ]
+    assert ids == esperado
+    assert paginas == -(-len(transacoes) // limite)
+
+
+def _b64(texto):
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "isto não é base64",
+        _b64("não é json"),
+        _b64(json.dumps({"timestamp": "2024-05-10T12:00:00"})),
+        _b64(json.dumps(["2024-05-10T12:00:00", "id", "extra"])),
+        _b64(json.dumps(["ontem", "id"])),
+        _b64(json.dumps([1715342400, "id"])),
+    ],
+)
+def test_cursor_malformado_retorna_400(client, usuario, cursor):
+    _, headers = usuario
+    resposta = client.get(URL, headers=headers, params={"cursor": cursor})
+    assert resposta.status_code == 400
+    assert resposta.json()["detail"] == "Cursor inválido"
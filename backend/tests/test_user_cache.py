@@ -0,0 +1,82 @@
+"""
+Contagem de consultas em `users` numa sequência típica do dashboard: com o
+cache de usuários, o SELECT só acontece na primeira request autenticada.
+"""
+
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.db.async_session import get_async_engine
+from app.db.session import engine
+from app.modules.auth.user_cache import user_cache
+
+DASHBOARD = [
+    "/api/v1/investments/assets",
+    "/api/v1/history/",
+    "/api/v1/investments/passivos",
+    "/api/v1/investments/transactions",
+]
+
+_SELECT_USERS = re.compile(r"^\s*SELECT\b.*\bFROM users\b", re.S | re.I)
+
+
+@pytest.fixture
+def consultas_users():
+    """Lista (atualizada ao vivo) dos SELECTs em users, nos engines síncrono e assíncrono."""
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if _SELECT_USERS.match(statement):
+            consultas.append(statement)
+
+    engines = [engine, get_async_engine().sync_engine]
+    for e in engines:
+        event.listen(e, "before_cursor_execute", capturar)
+    yield consultas
+    for e in engines:
+        event.remove(e, "before_cursor_execute", capturar)
+
+
+def _dashboard(client, headers):
+    for url in DASHBOARD:
+        resposta = client.get(url, headers=headers)
+        assert resposta.status_code == 200, (url, resposta.text)
+
+
+def test_dashboard_consulta_users_uma_vez(client, usuario, consultas_users):
+    _, headers = usuario
+
+    _dashboard(client, headers)
+    _dashboard(client, headers)
+
+    # Só a primeira request (cache vazio) vai ao banco
+    assert len(consultas_users) == 1
+
+
+def test_invalidate_volta_a_consultar_o_banco(client, usuario, consultas_users):
+    username, headers = usuario
+
+    _dashboard(client, headers)
+    antes = len(consultas_users)
+    user_cache.invalidate(username)
+    _dashboard(client, headers)
+
+    assert antes == 1
+    assert len(consultas_users) == antes + 1
+
+
+def test_usuario_alterado_no_orm_invalida_o_cache(client, db, usuario, consultas_users):
+    from app.modules.auth.models import User
+
+    username, headers = usuario
+    _dashboard(client, headers)
+    assert user_cache.get(username) is not None
+
+    db.get(User, username).is_admin = True
+    db.commit()
+
+    assert user_cache.get(username) is None
+    _dashboard(client, headers)
+    assert user_cache.get(username).is_admin is True